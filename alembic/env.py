@@ -3,7 +3,9 @@ from logging.config import fileConfig
 from sqlalchemy import engine_from_config, pool
 from alembic import context
 from app.database import Base
+import app.models  # noqa: F401  (registers every table on Base.metadata)
 from app.config import get_settings
+from app.utils.stock_move_partitions import DEFAULT_PARTITION, PARTITION_NAME
 
 config = context.config
 
@@ -15,6 +17,24 @@ if config.config_file_name is not None:
 target_metadata = Base.metadata
 
 
+def _is_stock_move_partition(name: str) -> bool:
+    return name == DEFAULT_PARTITION or PARTITION_NAME.match(name) is not None
+
+
+def include_object(object, name, type_, reflected, compare_to) -> bool:
+    """
+    Keep stock_moves partitions and their indexes out of autogenerate.
+
+    They are created by migration 0007 and `python -m app.cli maintain-partitions`,
+    not declared in the models, so autogenerate would otherwise drop them.
+    """
+    if type_ == "table":
+        return not _is_stock_move_partition(name)
+    if type_ in ("index", "unique_constraint", "foreign_key_constraint"):
+        return not _is_stock_move_partition(object.table.name)
+    return True
+
+
 def run_migrations_offline() -> None:
     """Run migrations in 'offline' mode."""
     configuration = config.get_section(config.config_ini_section)
@@ -25,6 +45,7 @@ def run_migrations_offline() -> None:
         target_metadata=target_metadata,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
+        include_object=include_object,
     )
 
     with context.begin_transaction():
@@ -43,7 +64,7 @@ def run_migrations_online() -> None:
     )
 
     with connectable.connect() as connection:
-        context.configure(connection=connection, target_metadata=target_metadata)
+        context.configure(connection=connection, target_metadata=target_metadata, include_object=include_object)
 
         with context.begin_transaction():
             context.run_migrations()
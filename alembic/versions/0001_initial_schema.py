@@ -0,0 +1,87 @@
+"""initial schema
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17 00:00:00
+
+Tables as created by Base.metadata.create_all before migrations existed.
+Databases that were bootstrapped that way can be marked with
+`alembic stamp 0001` and upgraded from there.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "users",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("email", sa.String(255), nullable=False),
+        sa.Column("hashed_password", sa.String(255), nullable=False),
+        sa.Column("role", sa.Enum("staff", "manager", "admin", name="userrole"), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    )
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+
+    op.create_table(
+        "products",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("name", sa.String(255), nullable=False),
+        sa.Column("sku", sa.String(100), nullable=False),
+        sa.Column("category", sa.String(100), nullable=True),
+        sa.Column("min_stock_level", sa.Integer(), nullable=True),
+        sa.Column("current_stock", sa.Integer(), nullable=True),
+        sa.Column("last_updated", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column("is_deleted", sa.Boolean(), nullable=True),
+    )
+    op.create_index("ix_products_name", "products", ["name"])
+    op.create_index("ix_products_sku", "products", ["sku"], unique=True)
+
+    op.create_table(
+        "operations",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("reference_code", sa.String(100), nullable=True),
+        sa.Column(
+            "type",
+            sa.Enum("receipt", "delivery", "internal", "adjustment", name="operationtype"),
+            nullable=False,
+        ),
+        sa.Column("status", sa.Enum("draft", "done", "synced", name="operationstatus"), nullable=True),
+        sa.Column("created_by", postgresql.UUID(as_uuid=True), sa.ForeignKey("users.id"), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column("last_updated", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    )
+    op.create_index("ix_operations_reference_code", "operations", ["reference_code"])
+
+    op.create_table(
+        "stock_moves",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column(
+            "operation_id",
+            postgresql.UUID(as_uuid=True),
+            sa.ForeignKey("operations.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column("product_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("products.id"), nullable=False),
+        sa.Column("quantity", sa.Integer(), nullable=False),
+        sa.Column("location_source", sa.String(100), nullable=True),
+        sa.Column("location_dest", sa.String(100), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("stock_moves")
+    op.drop_table("operations")
+    op.drop_table("products")
+    op.drop_table("users")
+    for name in ("operationstatus", "operationtype", "userrole"):
+        sa.Enum(name=name).drop(op.get_bind(), checkfirst=True)
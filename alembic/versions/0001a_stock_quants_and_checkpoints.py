@@ -0,0 +1,57 @@
+"""stock quants and checkpoints
+
+Revision ID: 0001a
+Revises: 0001
+Create Date: 2026-10-17 00:00:00
+
+Per-location stock balances (stock_quants) and point-in-time balance
+snapshots (stock_checkpoints), which create_all did not make: databases
+stamped at 0001 get them here. Quants are built from the existing stock
+moves; checkpoints start empty and are taken by `checkpoint-stock`.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '0001a'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "stock_quants",
+        sa.Column("product_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("products.id"), primary_key=True),
+        sa.Column("location", sa.String(100), primary_key=True),
+        sa.Column("quantity", sa.Integer(), nullable=False),
+        sa.Column("last_updated", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    )
+    op.create_index("ix_stock_quants_location_product_id", "stock_quants", ["location", "product_id"])
+    op.execute("""
+        INSERT INTO stock_quants (product_id, location, quantity)
+        SELECT product_id, location, sum(quantity)
+        FROM (
+            SELECT product_id, location_dest AS location, quantity FROM stock_moves WHERE location_dest IS NOT NULL
+            UNION ALL
+            SELECT product_id, location_source, -quantity FROM stock_moves WHERE location_source IS NOT NULL
+        ) AS ledger
+        GROUP BY product_id, location
+    """)
+
+    op.create_table(
+        "stock_checkpoints",
+        sa.Column("id", sa.BigInteger(), primary_key=True, autoincrement=True),
+        sa.Column("taken_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("product_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("products.id"), nullable=False),
+        sa.Column("location", sa.String(100), nullable=True),
+        sa.Column("quantity", sa.Integer(), nullable=False),
+    )
+    op.create_index("ix_stock_checkpoints_taken_at_product_id", "stock_checkpoints", ["taken_at", "product_id"])
+
+
+def downgrade() -> None:
+    op.drop_table("stock_checkpoints")
+    op.drop_table("stock_quants")
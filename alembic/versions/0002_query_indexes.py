@@ -0,0 +1,51 @@
+"""query indexes
+
+Revision ID: 0002
+Revises: 0001a
+Create Date: 2026-10-17 00:00:00
+
+Keyset indexes for sync pull and list sorting, foreign key indexes on
+stock_moves (per-product history, ON DELETE CASCADE from operations) and a
+partial index over active products. Built CONCURRENTLY so large tables stay
+writable during the upgrade.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001a'
+branch_labels = None
+depends_on = None
+
+# (name, table, columns, partial index predicate)
+INDEXES = (
+    ("ix_products_last_updated_id", "products", ["last_updated", "id"], None),
+    ("ix_products_active_name_id", "products", ["name", "id"], "is_deleted = false"),
+    ("ix_operations_created_at_id", "operations", ["created_at", "id"], None),
+    ("ix_operations_last_updated_id", "operations", ["last_updated", "id"], None),
+    ("ix_stock_moves_created_at_id", "stock_moves", ["created_at", "id"], None),
+    ("ix_stock_moves_product_id_created_at", "stock_moves", ["product_id", "created_at"], None),
+    ("ix_stock_moves_operation_id", "stock_moves", ["operation_id"], None),
+    ("ix_users_created_at_id", "users", ["created_at", "id"], None),
+)
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in INDEXES:
+            op.create_index(
+                name,
+                table,
+                columns,
+                postgresql_where=sa.text(where) if where else None,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,86 @@
+"""change log
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 00:00:00
+
+Change log for delta sync. Statement-level triggers with transition tables
+record every insert, update and delete of products, operations and stock
+moves (including cascaded deletes) as one row per entity with a NULL seq;
+the application's sequencer assigns sequence numbers after commit.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+SYNCED_TABLES = ("products", "operations", "stock_moves")
+
+# (trigger suffix, event, transition table)
+TRIGGER_EVENTS = (
+    ("insert", "INSERT", "NEW"),
+    ("update", "UPDATE", "NEW"),
+    ("delete", "DELETE", "OLD"),
+)
+
+
+def upgrade() -> None:
+    op.execute("CREATE SEQUENCE change_log_seq")
+    op.create_table(
+        "change_log",
+        sa.Column("id", sa.BigInteger(), primary_key=True, autoincrement=True),
+        sa.Column("seq", sa.BigInteger(), nullable=True),
+        sa.Column("entity", sa.String(50), nullable=False),
+        sa.Column("entity_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("deleted", sa.Boolean(), nullable=False),
+        sa.Column("changed_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.UniqueConstraint("entity", "entity_id", name="uq_change_log_entity_entity_id"),
+    )
+    op.create_index("ix_change_log_seq", "change_log", ["seq"], unique=True)
+    op.create_index("ix_change_log_pending", "change_log", ["id"], postgresql_where=sa.text("seq IS NULL"))
+
+    op.create_table(
+        "change_log_state",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("pruned_seq", sa.BigInteger(), nullable=False),
+    )
+    op.execute("INSERT INTO change_log_state (id, pruned_seq) VALUES (1, 0)")
+
+    op.execute("""
+        CREATE FUNCTION log_sync_changes() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            INSERT INTO change_log (entity, entity_id, deleted, changed_at)
+            SELECT DISTINCT TG_TABLE_NAME, id, TG_OP = 'DELETE', now() FROM changed_rows
+            ON CONFLICT (entity, entity_id) DO UPDATE
+                SET seq = NULL, deleted = excluded.deleted, changed_at = excluded.changed_at;
+            RETURN NULL;
+        END;
+        $$
+    """)
+    for table in SYNCED_TABLES:
+        for suffix, event, transition in TRIGGER_EVENTS:
+            op.execute(
+                f"CREATE TRIGGER {table}_change_log_{suffix} AFTER {event} ON {table} "
+                f"REFERENCING {transition} TABLE AS changed_rows "
+                f"FOR EACH STATEMENT EXECUTE FUNCTION log_sync_changes()"
+            )
+        # Existing rows enter the log unsequenced, so the first pull from 0 returns them.
+        op.execute(
+            f"INSERT INTO change_log (entity, entity_id, deleted) SELECT '{table}', id, false FROM {table}"
+        )
+
+
+def downgrade() -> None:
+    for table in SYNCED_TABLES:
+        for suffix, _, _ in TRIGGER_EVENTS:
+            op.execute(f"DROP TRIGGER {table}_change_log_{suffix} ON {table}")
+    op.execute("DROP FUNCTION log_sync_changes()")
+    op.drop_table("change_log_state")
+    op.drop_table("change_log")
+    op.execute("DROP SEQUENCE change_log_seq")
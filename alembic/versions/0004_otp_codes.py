@@ -0,0 +1,31 @@
+"""otp codes
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 00:00:00
+
+Pending OTPs for the database OTP store, shared by every worker.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "otp_codes",
+        sa.Column("email", sa.String(255), primary_key=True),
+        sa.Column("code", sa.String(12), nullable=False),
+        sa.Column("expires_at", sa.DateTime(timezone=True), nullable=False),
+    )
+    op.create_index("ix_otp_codes_expires_at", "otp_codes", ["expires_at"])
+
+
+def downgrade() -> None:
+    op.drop_table("otp_codes")
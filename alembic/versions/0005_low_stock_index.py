@@ -0,0 +1,41 @@
+"""low stock index
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17 00:00:00
+
+Partial index over active products below their minimum stock, for
+GET /products/low-stock. It only holds the products that need
+replenishing, so it stays small however large the catalog grows. Built
+CONCURRENTLY so products stay writable during the upgrade.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+LOW_STOCK = "is_deleted = false AND current_stock < min_stock_level"
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_products_low_stock_name_id",
+            "products",
+            ["name", "id"],
+            postgresql_where=sa.text(LOW_STOCK),
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_products_low_stock_name_id", table_name="products", postgresql_concurrently=True, if_exists=True
+        )
@@ -0,0 +1,169 @@
+"""stock move rollups
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17 00:00:00
+
+Daily stock move totals per product and operation type for the movement
+reports. Statement-level triggers with transition tables keep the rollups
+in step with every insert, update and delete of stock moves (including
+cascaded deletes) and with operation type changes, whichever code path
+writes them. Existing moves are rolled up once here; the backfill-rollups
+command rebuilds a day range later on.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+# Adds the signed move rows selected by `changes` to the
+# rollups in key order, so concurrent writers lock rollup rows in the same order.
+APPLY_CHANGES = """
+    INSERT INTO stock_move_rollups AS r (day, product_id, operation_type, quantity_in, quantity_out, moves)
+    SELECT (c.created_at AT TIME ZONE 'UTC')::date, c.product_id, c.operation_type,
+           sum(c.sign * greatest(c.quantity, 0)), sum(c.sign * greatest(-c.quantity, 0)), sum(c.sign)
+    FROM ({changes}) AS c (created_at, product_id, operation_type, quantity, sign)
+    WHERE c.created_at IS NOT NULL
+    GROUP BY 1, 2, 3
+    ORDER BY 1, 2, 3
+    ON CONFLICT (day, product_id, operation_type) DO UPDATE
+        SET quantity_in = r.quantity_in + excluded.quantity_in,
+            quantity_out = r.quantity_out + excluded.quantity_out,
+            moves = r.moves + excluded.moves;
+"""
+
+# After subtracting moves: drop rollup rows left without any, found through a partial index.
+DROP_EMPTY = "DELETE FROM stock_move_rollups WHERE moves = 0;"
+
+# Moves of a deleted operation are subtracted before the cascade deletes them (see below).
+MOVE_CHANGES = {
+    "insert": """
+        SELECT m.created_at, m.product_id, o.type, m.quantity, 1
+        FROM new_moves m JOIN operations o ON o.id = m.operation_id
+    """,
+    "update": """
+        SELECT m.created_at, m.product_id, o.type, m.quantity, 1
+        FROM new_moves m JOIN operations o ON o.id = m.operation_id
+        UNION ALL
+        SELECT m.created_at, m.product_id, o.type, m.quantity, -1
+        FROM old_moves m JOIN operations o ON o.id = m.operation_id
+    """,
+    "delete": """
+        SELECT m.created_at, m.product_id, o.type, m.quantity, -1
+        FROM old_moves m JOIN operations o ON o.id = m.operation_id
+    """,
+}
+
+# (trigger suffix, event, REFERENCING clause)
+MOVE_TRIGGERS = (
+    ("insert", "INSERT", "NEW TABLE AS new_moves"),
+    ("update", "UPDATE", "OLD TABLE AS old_moves NEW TABLE AS new_moves"),
+    ("delete", "DELETE", "OLD TABLE AS old_moves"),
+)
+
+OPERATION_TYPE_CHANGES = """
+    SELECT m.created_at, m.product_id, n.type, m.quantity, 1
+    FROM new_operations n JOIN old_operations o ON o.id = n.id AND o.type <> n.type
+    JOIN stock_moves m ON m.operation_id = n.id
+    UNION ALL
+    SELECT m.created_at, m.product_id, o.type, m.quantity, -1
+    FROM new_operations n JOIN old_operations o ON o.id = n.id AND o.type <> n.type
+    JOIN stock_moves m ON m.operation_id = n.id
+"""
+
+# The cascade from operations deletes moves after the operation row is gone, when their
+# type can no longer be looked up; so the operation subtracts its moves first and the
+# stock_moves delete trigger skips moves without an operation.
+OPERATION_DELETE_CHANGES = """
+    SELECT m.created_at, m.product_id, OLD.type, m.quantity, -1
+    FROM stock_moves m WHERE m.operation_id = OLD.id
+"""
+
+
+def _function(name: str, changes: str, subtracts: bool = True, result: str = "NULL") -> None:
+    op.execute(f"""
+        CREATE FUNCTION {name}() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            {APPLY_CHANGES.format(changes=changes)}
+            {DROP_EMPTY if subtracts else ""}
+            RETURN {result};
+        END;
+        $$
+    """)
+
+
+def upgrade() -> None:
+    op.create_table(
+        "stock_move_rollups",
+        sa.Column("day", sa.Date(), primary_key=True),
+        sa.Column("product_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("products.id"), primary_key=True),
+        sa.Column(
+            "operation_type",
+            postgresql.ENUM(name="operationtype", create_type=False),
+            primary_key=True,
+        ),
+        sa.Column("quantity_in", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("quantity_out", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("moves", sa.BigInteger(), nullable=False, server_default="0"),
+    )
+    op.create_index("ix_stock_move_rollups_product_id_day", "stock_move_rollups", ["product_id", "day"])
+    op.create_index("ix_stock_move_rollups_empty", "stock_move_rollups", ["day"], postgresql_where=sa.text("moves = 0"))
+
+    for suffix, event, referencing in MOVE_TRIGGERS:
+        _function(f"rollup_stock_moves_{suffix}", MOVE_CHANGES[suffix], subtracts=suffix != "insert")
+        op.execute(
+            f"CREATE TRIGGER stock_moves_rollup_{suffix} AFTER {event} ON stock_moves "
+            f"REFERENCING {referencing} FOR EACH STATEMENT EXECUTE FUNCTION rollup_stock_moves_{suffix}()"
+        )
+    _function("rollup_operation_type_change", OPERATION_TYPE_CHANGES)
+    op.execute(
+        "CREATE TRIGGER operations_rollup_update AFTER UPDATE ON operations "
+        "REFERENCING OLD TABLE AS old_operations NEW TABLE AS new_operations "
+        "FOR EACH STATEMENT EXECUTE FUNCTION rollup_operation_type_change()"
+    )
+    _function("rollup_operation_delete", OPERATION_DELETE_CHANGES, subtracts=False, result="OLD")
+    op.execute(
+        "CREATE TRIGGER operations_rollup_delete BEFORE DELETE ON operations "
+        "FOR EACH ROW EXECUTE FUNCTION rollup_operation_delete()"
+    )
+    # Empty rows are dropped once per statement, not once per deleted operation.
+    op.execute(f"""
+        CREATE FUNCTION rollup_drop_empty() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            {DROP_EMPTY}
+            RETURN NULL;
+        END;
+        $$
+    """)
+    op.execute(
+        "CREATE TRIGGER operations_rollup_drop_empty AFTER DELETE ON operations "
+        "FOR EACH STATEMENT EXECUTE FUNCTION rollup_drop_empty()"
+    )
+
+    op.execute("""
+        INSERT INTO stock_move_rollups (day, product_id, operation_type, quantity_in, quantity_out, moves)
+        SELECT (m.created_at AT TIME ZONE 'UTC')::date, m.product_id, o.type,
+               sum(greatest(m.quantity, 0)), sum(greatest(-m.quantity, 0)), count(*)
+        FROM stock_moves m JOIN operations o ON o.id = m.operation_id
+        WHERE m.created_at IS NOT NULL
+        GROUP BY 1, 2, 3
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER operations_rollup_drop_empty ON operations")
+    op.execute("DROP FUNCTION rollup_drop_empty()")
+    op.execute("DROP TRIGGER operations_rollup_delete ON operations")
+    op.execute("DROP FUNCTION rollup_operation_delete()")
+    op.execute("DROP TRIGGER operations_rollup_update ON operations")
+    op.execute("DROP FUNCTION rollup_operation_type_change()")
+    for suffix, _, _ in MOVE_TRIGGERS:
+        op.execute(f"DROP TRIGGER stock_moves_rollup_{suffix} ON stock_moves")
+        op.execute(f"DROP FUNCTION rollup_stock_moves_{suffix}()")
+    op.drop_table("stock_move_rollups")
@@ -0,0 +1,136 @@
+"""partition stock moves
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17 00:00:00
+
+Rebuilds stock_moves as a table range-partitioned by month on created_at
+(UTC), with one partition per month that has moves, partitions up to three
+months ahead and a default partition for anything else. The primary key
+becomes (id, created_at), since partitioned tables only enforce uniqueness
+together with the partition key; moves without created_at get their
+operation's. The change log and rollup triggers are recreated on the new
+table. Every move is copied under an exclusive lock, so plan downtime for
+large ledgers. `python -m app.cli maintain-partitions` keeps partitions
+ahead of time afterwards and records archived partitions in
+stock_move_archives.
+"""
+from datetime import date, datetime, timezone
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+MONTHS_AHEAD = 3
+
+COLUMNS = "id, operation_id, product_id, quantity, location_source, location_dest, created_at"
+
+INDEXES = (
+    ("ix_stock_moves_created_at_id", ["created_at", "id"]),
+    ("ix_stock_moves_product_id_created_at", ["product_id", "created_at"]),
+    ("ix_stock_moves_operation_id", ["operation_id"]),
+)
+
+# Statement-level triggers of the 0003 (change log) and 0006 (rollups) migrations:
+# (name, event, REFERENCING clause, function)
+TRIGGERS = (
+    ("stock_moves_change_log_insert", "INSERT", "NEW TABLE AS changed_rows", "log_sync_changes"),
+    ("stock_moves_change_log_update", "UPDATE", "NEW TABLE AS changed_rows", "log_sync_changes"),
+    ("stock_moves_change_log_delete", "DELETE", "OLD TABLE AS changed_rows", "log_sync_changes"),
+    ("stock_moves_rollup_insert", "INSERT", "NEW TABLE AS new_moves", "rollup_stock_moves_insert"),
+    ("stock_moves_rollup_update", "UPDATE", "OLD TABLE AS old_moves NEW TABLE AS new_moves", "rollup_stock_moves_update"),
+    ("stock_moves_rollup_delete", "DELETE", "OLD TABLE AS old_moves", "rollup_stock_moves_delete"),
+)
+
+
+def _add_months(month: date, count: int) -> date:
+    months = month.year * 12 + month.month - 1 + count
+    return date(months // 12, months % 12 + 1, 1)
+
+
+def _create_partitions() -> None:
+    now = datetime.now(timezone.utc)
+    current = date(now.year, now.month, 1)
+    months = {_add_months(current, ahead) for ahead in range(MONTHS_AHEAD + 1)}
+    months.update(op.get_bind().execute(sa.text(
+        "SELECT DISTINCT date_trunc('month', created_at AT TIME ZONE 'UTC')::date FROM stock_moves"
+    )).scalars())
+    for month in sorted(months):
+        op.execute(
+            f"CREATE TABLE stock_moves_p{month:%Y%m} PARTITION OF stock_moves_new "
+            f"FOR VALUES FROM ('{month} 00:00:00+00') TO ('{_add_months(month, 1)} 00:00:00+00')"
+        )
+    op.execute("CREATE TABLE stock_moves_default PARTITION OF stock_moves_new DEFAULT")
+
+
+def _replace_table(create_sql: str, primary_key: str, partitioned: bool) -> None:
+    """Copy stock_moves into the table created by create_sql (named stock_moves_new) and swap them."""
+    op.execute(create_sql)
+    if partitioned:
+        _create_partitions()
+    op.execute(f"INSERT INTO stock_moves_new ({COLUMNS}) SELECT {COLUMNS} FROM stock_moves")
+    op.execute("DROP TABLE stock_moves")
+    op.execute("ALTER TABLE stock_moves_new RENAME TO stock_moves")
+    op.execute(f"ALTER TABLE stock_moves ADD CONSTRAINT stock_moves_pkey PRIMARY KEY ({primary_key})")
+    op.create_foreign_key(
+        "stock_moves_operation_id_fkey", "stock_moves", "operations", ["operation_id"], ["id"], ondelete="CASCADE"
+    )
+    op.create_foreign_key("stock_moves_product_id_fkey", "stock_moves", "products", ["product_id"], ["id"])
+    for name, columns in INDEXES:
+        op.create_index(name, "stock_moves", columns)
+    for name, event, referencing, function in TRIGGERS:
+        op.execute(
+            f"CREATE TRIGGER {name} AFTER {event} ON stock_moves REFERENCING {referencing} "
+            f"FOR EACH STATEMENT EXECUTE FUNCTION {function}()"
+        )
+    op.execute("ANALYZE stock_moves")
+
+
+def upgrade() -> None:
+    op.execute("LOCK TABLE stock_moves IN ACCESS EXCLUSIVE MODE")
+    op.execute("""
+        UPDATE stock_moves m SET created_at = o.created_at
+        FROM operations o WHERE m.created_at IS NULL AND o.id = m.operation_id
+    """)
+    op.execute("UPDATE stock_moves SET created_at = now() WHERE created_at IS NULL")
+    _replace_table("""
+        CREATE TABLE stock_moves_new (
+            id uuid NOT NULL,
+            operation_id uuid NOT NULL,
+            product_id uuid NOT NULL,
+            quantity integer NOT NULL,
+            location_source varchar(100),
+            location_dest varchar(100),
+            created_at timestamptz NOT NULL DEFAULT now()
+        ) PARTITION BY RANGE (created_at)
+    """, "id, created_at", partitioned=True)
+    op.create_table(
+        "stock_move_archives",
+        sa.Column("partition_name", sa.String(63), primary_key=True),
+        sa.Column("range_start", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("range_end", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("path", sa.String(1024), nullable=False),
+        sa.Column("moves", sa.BigInteger(), nullable=False),
+        sa.Column("archived_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("stock_move_archives")
+    op.execute("LOCK TABLE stock_moves IN ACCESS EXCLUSIVE MODE")
+    _replace_table("""
+        CREATE TABLE stock_moves_new (
+            id uuid NOT NULL,
+            operation_id uuid NOT NULL,
+            product_id uuid NOT NULL,
+            quantity integer NOT NULL,
+            location_source varchar(100),
+            location_dest varchar(100),
+            created_at timestamptz DEFAULT now()
+        )
+    """, "id", partitioned=False)
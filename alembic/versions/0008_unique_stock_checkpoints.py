@@ -0,0 +1,73 @@
+"""unique stock checkpoints
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-17 00:00:00
+
+Stock moves written after a checkpoint was taken but dated before it
+(offline pushes, edits, imports) are now added to that checkpoint rather
+than dropping it. The upserts need one unique index per kind of row:
+(taken_at, product_id, location) for per-location balances, which also
+replaces the old (taken_at, product_id) index, and a partial one for the
+product totals, whose location is NULL. Built CONCURRENTLY so checkpoints
+stay writable during the upgrade.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_stock_checkpoints_taken_at_product_id_location",
+            "stock_checkpoints",
+            ["taken_at", "product_id", "location"],
+            unique=True,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            "ix_stock_checkpoints_taken_at_product_id_total",
+            "stock_checkpoints",
+            ["taken_at", "product_id"],
+            unique=True,
+            postgresql_where=sa.text("location IS NULL"),
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.drop_index(
+            "ix_stock_checkpoints_taken_at_product_id",
+            table_name="stock_checkpoints",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_stock_checkpoints_taken_at_product_id",
+            "stock_checkpoints",
+            ["taken_at", "product_id"],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.drop_index(
+            "ix_stock_checkpoints_taken_at_product_id_total",
+            table_name="stock_checkpoints",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+        op.drop_index(
+            "ix_stock_checkpoints_taken_at_product_id_location",
+            table_name="stock_checkpoints",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
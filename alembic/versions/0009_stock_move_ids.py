@@ -0,0 +1,63 @@
+"""stock move ids
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-17 00:00:00
+
+Since 0007 the stock_moves key is (id, created_at), so ON CONFLICT no longer
+catches a move resent without created_at. Sync pushes and imports instead
+claim the ids in stock_move_ids, whose primary key serializes concurrent
+claims of the same id. Statement-level triggers keep the table in step with
+every insert and delete of stock moves; archiving drops partitions without
+firing them, so the ids of archived moves stay claimed.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '0009'
+down_revision = '0008'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "stock_move_ids",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+    )
+    op.execute("INSERT INTO stock_move_ids (id) SELECT id FROM stock_moves ON CONFLICT DO NOTHING")
+    op.execute("""
+        CREATE FUNCTION claim_stock_move_ids() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            INSERT INTO stock_move_ids (id) SELECT id FROM new_moves ORDER BY id ON CONFLICT DO NOTHING;
+            RETURN NULL;
+        END
+        $$
+    """)
+    op.execute("""
+        CREATE FUNCTION release_stock_move_ids() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            DELETE FROM stock_move_ids i USING old_moves m WHERE i.id = m.id;
+            RETURN NULL;
+        END
+        $$
+    """)
+    op.execute("""
+        CREATE TRIGGER stock_moves_ids_insert AFTER INSERT ON stock_moves REFERENCING NEW TABLE AS new_moves
+        FOR EACH STATEMENT EXECUTE FUNCTION claim_stock_move_ids()
+    """)
+    op.execute("""
+        CREATE TRIGGER stock_moves_ids_delete AFTER DELETE ON stock_moves REFERENCING OLD TABLE AS old_moves
+        FOR EACH STATEMENT EXECUTE FUNCTION release_stock_move_ids()
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER stock_moves_ids_delete ON stock_moves")
+    op.execute("DROP TRIGGER stock_moves_ids_insert ON stock_moves")
+    op.execute("DROP FUNCTION release_stock_move_ids()")
+    op.execute("DROP FUNCTION claim_stock_move_ids()")
+    op.drop_table("stock_move_ids")
@@ -0,0 +1,235 @@
+"""
+StockMaster maintenance commands.
+
+    python -m app.cli rebuild-quants
+    python -m app.cli checkpoint-stock [--force]
+    python -m app.cli compact-change-log [--retention-days N]
+    python -m app.cli purge-otps
+    python -m app.cli backfill-rollups [--since DAY] [--until DAY] [--chunk-days N]
+    python -m app.cli maintain-partitions [--months-ahead N] [--retention-months N] [--archive-dir DIR]
+    python -m app.cli import-products FILE [--format csv|ndjson]
+    python -m app.cli import-stock-moves FILE [--format csv|ndjson]
+    python -m app.cli export-products [FILE] [--format csv|ndjson]
+    python -m app.cli export-stock-moves [FILE] [--format csv|ndjson] [--since T] [--until T]
+"""
+import argparse
+import gzip
+import json
+import sys
+from datetime import date, datetime, timedelta, timezone
+from fastapi import HTTPException
+from app.config import get_settings
+from app.database import SessionLocal
+from app.utils.bulk_io import BulkFormat, copy_out, detect_format, export_sql, import_products, import_stock_moves
+from app.utils.change_log import prune_change_log
+from app.utils.move_rollups import backfill_rollups, ledger_days
+from app.utils.otp import DatabaseOTPStore
+from app.utils.stock_checkpoints import create_checkpoint_if_due
+from app.utils.stock_move_partitions import add_months, archivable_partitions, archive_partition, ensure_partitions, month_of
+from app.utils.stock_quants import rebuild_stock_quants
+
+
+def rebuild_quants(args: argparse.Namespace) -> None:
+    """Regenerate stock_quants from the stock move ledger."""
+    db = SessionLocal()
+    try:
+        count = rebuild_stock_quants(db)
+        db.commit()
+        print(f"Rebuilt {count} stock quants")
+    finally:
+        db.close()
+
+
+def checkpoint_stock(args: argparse.Namespace) -> None:
+    """Snapshot stock balances if the configured checkpoint interval has elapsed."""
+    settings = get_settings()
+    db = SessionLocal()
+    try:
+        taken_at = create_checkpoint_if_due(
+            db,
+            interval=timedelta(hours=settings.stock_checkpoint_interval_hours),
+            lag=timedelta(seconds=settings.stock_checkpoint_lag_seconds),
+            force=args.force,
+        )
+        db.commit()
+        print(f"Checkpoint taken at {taken_at.isoformat()}" if taken_at else "No checkpoint due")
+    finally:
+        db.close()
+
+
+def compact_change_log(args: argparse.Namespace) -> None:
+    """Prune sync change log tombstones older than the retention period."""
+    retention_days = args.retention_days if args.retention_days is not None else get_settings().change_log_retention_days
+    db = SessionLocal()
+    try:
+        removed = prune_change_log(db, retention=timedelta(days=retention_days))
+        db.commit()
+        print(f"Removed {removed} tombstones older than {retention_days} days")
+    finally:
+        db.close()
+
+
+def purge_otps(args: argparse.Namespace) -> None:
+    """Delete expired OTPs from the database OTP store."""
+    db = SessionLocal()
+    try:
+        removed = DatabaseOTPStore().cleanup(db)
+        print(f"Removed {removed} expired OTPs")
+    finally:
+        db.close()
+
+
+def backfill_move_rollups(args: argparse.Namespace) -> None:
+    """Recompute the daily stock move rollups from the ledger, one chunk of days per transaction."""
+    db = SessionLocal()
+    try:
+        first, last = ledger_days(db)
+        since, until = args.since or first, args.until or last
+        db.rollback()
+        if since is None or until is None:
+            print("No stock moves to roll up")
+            return
+        total = 0
+        while since <= until:
+            chunk_end = min(since + timedelta(days=args.chunk_days - 1), until)
+            total += backfill_rollups(db, since, chunk_end)
+            db.commit()
+            since = chunk_end + timedelta(days=1)
+        print(f"Wrote {total} rollup rows")
+    finally:
+        db.close()
+
+
+def maintain_partitions(args: argparse.Namespace) -> None:
+    """Create upcoming monthly stock move partitions and archive those past the retention period."""
+    settings = get_settings()
+    months_ahead = args.months_ahead if args.months_ahead is not None else settings.stock_move_partitions_ahead
+    retention_months = (
+        args.retention_months if args.retention_months is not None else settings.stock_move_retention_months
+    )
+    db = SessionLocal()
+    try:
+        now = datetime.now(timezone.utc)
+        current = month_of(now)
+        first = add_months(current, -retention_months) if retention_months else current
+        for name in ensure_partitions(db, first, add_months(current, months_ahead)):
+            print(f"Created {name}")
+        db.commit()
+        if not retention_months:
+            return
+        for month in archivable_partitions(db, retention_months, now):
+            archive = archive_partition(db, month, args.archive_dir or settings.stock_move_archive_dir)
+            db.commit()
+            print(f"Archived {archive.moves} moves of {archive.partition_name} to {archive.path}")
+    except ValueError as error:
+        sys.exit(f"Partition maintenance failed: {error}")
+    finally:
+        db.close()
+
+
+def _open(path: str, mode: str):
+    return gzip.open(path, mode) if path.endswith(".gz") else open(path, mode)
+
+
+def _import(args: argparse.Namespace, import_rows) -> None:
+    file_format = BulkFormat(args.format) if args.format else detect_format(args.file)
+    db = SessionLocal()
+    try:
+        with _open(args.file, "rb") as file:
+            result = import_rows(db, file, file_format)
+        db.commit()
+    except HTTPException as error:
+        sys.exit(f"Import failed: {error.detail}")
+    finally:
+        db.close()
+    print(json.dumps(result, indent=2, default=str))
+
+
+def import_products_file(args: argparse.Namespace) -> None:
+    """Upsert products by SKU from a CSV or NDJSON file (optionally .gz) through COPY."""
+    _import(args, import_products)
+
+
+def import_stock_moves_file(args: argparse.Namespace) -> None:
+    """Append stock moves from a CSV or NDJSON file (optionally .gz) through COPY."""
+    _import(args, import_stock_moves)
+
+
+def _export(args: argparse.Namespace, sql: str) -> None:
+    db = SessionLocal()
+    try:
+        if args.file == "-":
+            for chunk in copy_out(db, sql):
+                sys.stdout.buffer.write(chunk)
+            return
+        with _open(args.file, "wb") as file:
+            for chunk in copy_out(db, sql):
+                file.write(chunk)
+    finally:
+        db.close()
+
+
+def export_products_file(args: argparse.Namespace) -> None:
+    """Write every active product as CSV or NDJSON (stdout, a file, or a .gz file)."""
+    file_format = BulkFormat(args.format) if args.format else detect_format(args.file)
+    _export(args, export_sql("products", file_format))
+
+
+def export_stock_moves_file(args: argparse.Namespace) -> None:
+    """Write stock moves, oldest first, as CSV or NDJSON (stdout, a file, or a .gz file)."""
+    file_format = BulkFormat(args.format) if args.format else detect_format(args.file)
+    _export(args, export_sql("stock_moves", file_format, args.since, args.until))
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="StockMaster maintenance commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    command = commands.add_parser("rebuild-quants", help=rebuild_quants.__doc__)
+    command.set_defaults(func=rebuild_quants)
+
+    command = commands.add_parser("checkpoint-stock", help=checkpoint_stock.__doc__)
+    command.add_argument("--force", action="store_true", help="Take a checkpoint even if one is not due")
+    command.set_defaults(func=checkpoint_stock)
+
+    command = commands.add_parser("compact-change-log", help=compact_change_log.__doc__)
+    command.add_argument("--retention-days", type=int, help="Override CHANGE_LOG_RETENTION_DAYS")
+    command.set_defaults(func=compact_change_log)
+
+    command = commands.add_parser("purge-otps", help=purge_otps.__doc__)
+    command.set_defaults(func=purge_otps)
+
+    command = commands.add_parser("backfill-rollups", help=backfill_move_rollups.__doc__)
+    command.add_argument("--since", type=date.fromisoformat, help="First UTC day (default: the first move)")
+    command.add_argument("--until", type=date.fromisoformat, help="Last UTC day (default: the last move)")
+    command.add_argument("--chunk-days", type=int, default=31, help="Days recomputed per transaction")
+    command.set_defaults(func=backfill_move_rollups)
+
+    command = commands.add_parser("maintain-partitions", help=maintain_partitions.__doc__)
+    command.add_argument("--months-ahead", type=int, help="Override STOCK_MOVE_PARTITIONS_AHEAD")
+    command.add_argument("--retention-months", type=int, help="Override STOCK_MOVE_RETENTION_MONTHS (0 keeps every month)")
+    command.add_argument("--archive-dir", help="Override STOCK_MOVE_ARCHIVE_DIR")
+    command.set_defaults(func=maintain_partitions)
+
+    formats = [file_format.value for file_format in BulkFormat]
+    for name, func in (("import-products", import_products_file), ("import-stock-moves", import_stock_moves_file)):
+        command = commands.add_parser(name, help=func.__doc__)
+        command.add_argument("file", help="CSV or NDJSON file; .gz files are decompressed")
+        command.add_argument("--format", choices=formats, help="Default: from the file extension")
+        command.set_defaults(func=func)
+
+    for name, func in (("export-products", export_products_file), ("export-stock-moves", export_stock_moves_file)):
+        command = commands.add_parser(name, help=func.__doc__)
+        command.add_argument("file", nargs="?", default="-", help="Output file (default: stdout)")
+        command.add_argument("--format", choices=formats, help="Default: from the file extension")
+        if func is export_stock_moves_file:
+            command.add_argument("--since", type=datetime.fromisoformat, help="Only moves created at or after")
+            command.add_argument("--until", type=datetime.fromisoformat, help="Only moves created before")
+        command.set_defaults(func=func)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,100 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+import ast
+from functools import lru_cache
+from pathlib import Path
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Connection, Engine, make_url
+from sqlalchemy.exc import ProgrammingError
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from starlette.concurrency import run_in_threadpool
 from app.config import get_settings
+from app.utils.pool_stats import PoolStats, instrument_engine, timed_pool_class
 
 settings = get_settings()
-engine = create_engine(settings.database_url, echo=False, pool_pre_ping=True)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+ALEMBIC_VERSIONS_DIR = Path(__file__).resolve().parent.parent / "alembic" / "versions"
+
+
+# Pool and statement counters per engine, reported by /internal/pool.
+pool_stats = {
+    "sync": PoolStats(settings.db_pool_slow_checkout_ms / 1000),
+    "async": PoolStats(settings.db_pool_slow_checkout_ms / 1000),
+}
+
+
+def _pool_options(pool_class) -> dict:
+    return {
+        "poolclass": pool_class,
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": settings.db_pool_pre_ping == "always",
+    }
+
+
+def _instrument(engine: Engine, stats: PoolStats) -> None:
+    session_settings = {}
+    if settings.db_statement_timeout_ms:
+        session_settings["statement_timeout"] = settings.db_statement_timeout_ms
+    if settings.db_idle_in_transaction_timeout_ms:
+        session_settings["idle_in_transaction_session_timeout"] = settings.db_idle_in_transaction_timeout_ms
+    instrument_engine(
+        engine,
+        stats,
+        pre_ping_idle_seconds=settings.db_pool_pre_ping_idle_seconds if settings.db_pool_pre_ping == "idle" else None,
+        session_settings=session_settings,
+    )
+
+
+@lru_cache()
+def get_engine() -> Engine:
+    """The sync engine, created on first use so importing the app never touches the database."""
+    engine = create_engine(
+        settings.database_url, echo=False, **_pool_options(timed_pool_class(QueuePool, pool_stats["sync"]))
+    )
+    _instrument(engine, pool_stats["sync"])
+    return engine
+
+
+class _LazySessionMaker(sessionmaker):
+    def __call__(self, **local_kw) -> Session:
+        local_kw.setdefault("bind", get_engine())
+        return super().__call__(**local_kw)
+
+
+SessionLocal = _LazySessionMaker(autocommit=False, autoflush=False)
+
+# The async engine only exists when DB_ASYNC is enabled, so the async driver
+# (asyncpg, greenlet) stays optional.
+AsyncSessionLocal = None
+DbSession = Session
+if settings.db_async:
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+    AsyncSessionLocal = async_sessionmaker(autoflush=False, expire_on_commit=False)
+    DbSession = AsyncSession
+
+
+@lru_cache()
+def get_async_engine():
+    async_url = settings.async_database_url or make_url(settings.database_url).set(drivername="postgresql+asyncpg")
+    engine = create_async_engine(
+        async_url, echo=False, **_pool_options(timed_pool_class(AsyncAdaptedQueuePool, pool_stats["async"]))
+    )
+    _instrument(engine.sync_engine, pool_stats["async"])
+    return engine
+
+
+def __getattr__(name: str):
+    # `engine` and `async_engine` stay importable, but are only built when first used.
+    if name == "engine":
+        return get_engine()
+    if name == "async_engine":
+        return get_async_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 def get_db():
     db = SessionLocal()
@@ -14,3 +102,107 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal(bind=get_async_engine()) as db:
+        yield db
+
+
+# Session dependency used by the routers; DB_ASYNC selects the async engine.
+get_session = get_async_db if settings.db_async else get_db
+
+
+async def run_db(db: DbSession, fn, *args, **kwargs):
+    """
+    Run ORM code written against a sync Session without blocking the event loop.
+
+    With an AsyncSession the function runs through run_sync on the async
+    driver; with a sync Session it runs in the threadpool.
+    """
+    if isinstance(db, Session):
+        return await run_in_threadpool(fn, db, *args, **kwargs)
+    return await db.run_sync(fn, *args, **kwargs)
+
+
+@lru_cache()
+def alembic_heads() -> frozenset:
+    """
+    Head revisions of the migration scripts.
+
+    The scripts' `revision` / `down_revision` assignments are parsed rather
+    than imported, which keeps alembic itself out of worker startup.
+    """
+    revisions, parents = set(), set()
+    for path in ALEMBIC_VERSIONS_DIR.glob("*.py"):
+        for node in ast.parse(path.read_text()).body:
+            if not (isinstance(node, ast.Assign) and isinstance(node.targets[0], ast.Name)):
+                continue
+            name = node.targets[0].id
+            if name == "revision":
+                revisions.add(ast.literal_eval(node.value))
+            elif name == "down_revision":
+                value = ast.literal_eval(node.value)  # None, a revision, or a tuple of them for merges
+                if isinstance(value, str):
+                    parents.add(value)
+                elif value:
+                    parents.update(value)
+    return frozenset(revisions - parents)
+
+
+def check_schema_version(connection: Connection) -> None:
+    """
+    Fail fast unless the database is migrated to the Alembic head.
+
+    The database side is a single query on alembic_version.
+    """
+    expected = alembic_heads()
+    try:
+        current = set(connection.execute(text("SELECT version_num FROM alembic_version")).scalars())
+    except ProgrammingError:  # no alembic_version table: never migrated
+        connection.rollback()
+        current = set()
+    if current != expected:
+        raise RuntimeError(
+            f"Database schema is at revision {', '.join(sorted(current)) or 'none'}, "
+            f"expected {', '.join(sorted(expected))}. Run `alembic upgrade head` first."
+        )
+    connection.rollback()
+
+
+def _startup_sync(pool_size: int) -> None:
+    engine = get_engine()
+    connections = [engine.connect()]
+    try:
+        check_schema_version(connections[0])
+        while len(connections) < pool_size:
+            connections.append(engine.connect())
+    finally:
+        for connection in connections:
+            connection.close()
+
+
+async def _startup_async(pool_size: int) -> None:
+    engine = get_async_engine()
+    connections = [await engine.connect()]
+    try:
+        await connections[0].run_sync(check_schema_version)
+        while len(connections) < pool_size:
+            connections.append(await engine.connect())
+    finally:
+        for connection in connections:
+            await connection.close()
+
+
+async def startup_database() -> None:
+    """
+    Check the schema version and open DB_POOL_WARM_SIZE connections ahead of the first request.
+
+    Connections are checked out together and then returned, so the pool
+    keeps them open (up to DB_POOL_SIZE; overflow connections would be closed).
+    """
+    pool_size = max(min(settings.db_pool_warm_size, settings.db_pool_size), 1)
+    if settings.db_async:
+        await _startup_async(pool_size)
+    else:
+        await run_in_threadpool(_startup_sync, pool_size)
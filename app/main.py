@@ -1,12 +1,31 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.database import Base, engine
-from app.routers import users, products, operations, stock_moves, sync, auth
+from app.config import get_settings
+from app.database import startup_database
+from app.routers import users, products, operations, stock_moves, stock_quants, sync, reports, auth, internal
+from app.utils.cache_bus import get_bus
+from app.utils.compression import CompressionMiddleware
+from app.utils.email import email_queue
+from app.utils.auth import signing_key
+from app.utils.metrics import MetricsMiddleware, metrics_response
+from app.utils.sql_profiler import SQLProfilerMiddleware
 
-# Create tables
-Base.metadata.create_all(bind=engine)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Refuse to issue or verify tokens with a missing or publicly known signing key
+    signing_key()
+    # Refuse to serve on an unmigrated database, and open pool connections up front
+    await startup_database()
+    # Listen for cache invalidations published by other workers
+    get_bus().start()
+    email_queue.start()
+    yield
+    email_queue.stop()
+    get_bus().stop()
 
-app = FastAPI(title="StockMaster API", version="1.0.0")
+
+app = FastAPI(title="StockMaster API", version="1.0.0", lifespan=lifespan)
 
 # CORS middleware
 app.add_middleware(
@@ -15,15 +34,33 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Total-Count-Estimate"],
 )
 
+# gzip/zstd response compression, negotiated through Accept-Encoding
+app.add_middleware(CompressionMiddleware, minimum_size=get_settings().compression_min_size)
+
+# Opt-in per-request query counts (X-DB-Queries, Server-Timing), N+1 warnings and slow query log
+if get_settings().sql_profiling:
+    app.add_middleware(
+        SQLProfilerMiddleware,
+        n_plus_one_threshold=get_settings().n_plus_one_threshold,
+        slow_query_ms=get_settings().slow_query_ms,
+    )
+
+# Request counts and latency per route; outermost, so compression time is included
+app.add_middleware(MetricsMiddleware)
+
 # Include routers
 app.include_router(auth.router)
 app.include_router(users.router)
 app.include_router(products.router)
 app.include_router(operations.router)
 app.include_router(stock_moves.router)
+app.include_router(stock_quants.router)
 app.include_router(sync.router)
+app.include_router(reports.router)
+app.include_router(internal.router)
 
 
 @app.get("/", tags=["root"])
@@ -38,6 +75,12 @@ def health_check():
     return {"status": "healthy"}
 
 
+@app.get("/metrics", tags=["health"])
+async def metrics():
+    """Prometheus metrics of this worker (async: read on the event loop that updates them)."""
+    return metrics_response()
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
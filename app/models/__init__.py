@@ -2,6 +2,13 @@ from app.models.user import User
 from app.models.product import Product
 from app.models.operation import Operation, OperationType, OperationStatus
 from app.models.stock_move import StockMove
+from app.models.stock_move_id import StockMoveId
+from app.models.stock_quant import StockQuant
+from app.models.stock_move_rollup import StockMoveRollup
+from app.models.stock_move_archive import StockMoveArchive
+from app.models.stock_checkpoint import StockCheckpoint
+from app.models.change_log import ChangeLog, ChangeLogState
+from app.models.otp_code import OTPCode
 
 __all__ = [
     "User",
@@ -10,4 +17,12 @@ __all__ = [
     "OperationType",
     "OperationStatus",
     "StockMove",
+    "StockMoveId",
+    "StockQuant",
+    "StockMoveRollup",
+    "StockMoveArchive",
+    "StockCheckpoint",
+    "ChangeLog",
+    "ChangeLogState",
+    "OTPCode",
 ]
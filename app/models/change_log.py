@@ -0,0 +1,35 @@
+from sqlalchemy import Column, BigInteger, Boolean, Integer, String, DateTime, Index, Sequence, UniqueConstraint, func, text
+from sqlalchemy.dialects.postgresql import UUID
+from app.database import Base
+
+# Sync sequence numbers; assigned by the change log sequencer, not on insert.
+change_log_seq = Sequence("change_log_seq", metadata=Base.metadata)
+
+
+class ChangeLog(Base):
+    """
+    Latest change of each synced row, kept up to date by database triggers.
+    `seq` stays NULL until the sequencer stamps the committed change; deleted rows
+    stay behind as tombstones until compaction.
+    """
+    __tablename__ = "change_log"
+    __table_args__ = (
+        UniqueConstraint("entity", "entity_id", name="uq_change_log_entity_entity_id"),
+        Index("ix_change_log_seq", "seq", unique=True),
+        Index("ix_change_log_pending", "id", postgresql_where=text("seq IS NULL")),
+    )
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    seq = Column(BigInteger, nullable=True)
+    entity = Column(String(50), nullable=False)
+    entity_id = Column(UUID(as_uuid=True), nullable=False)
+    deleted = Column(Boolean, nullable=False, default=False)
+    changed_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+
+class ChangeLogState(Base):
+    """Single-row table holding the highest sequence number removed by compaction."""
+    __tablename__ = "change_log_state"
+
+    id = Column(Integer, primary_key=True, default=1)
+    pruned_seq = Column(BigInteger, nullable=False, default=0)
@@ -1,6 +1,6 @@
 import uuid
 import enum
-from sqlalchemy import Column, String, DateTime, func, Enum as SQLEnum, ForeignKey
+from sqlalchemy import Column, String, DateTime, func, Enum as SQLEnum, ForeignKey, Index
 from sqlalchemy.dialects.postgresql import UUID
 from app.database import Base
 
@@ -20,6 +20,10 @@ class OperationStatus(str, enum.Enum):
 
 class Operation(Base):
     __tablename__ = "operations"
+    __table_args__ = (
+        Index("ix_operations_created_at_id", "created_at", "id"),
+        Index("ix_operations_last_updated_id", "last_updated", "id"),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     reference_code = Column(String(100), nullable=True, index=True)
@@ -0,0 +1,14 @@
+from sqlalchemy import Column, String, DateTime, Index
+from app.database import Base
+
+
+class OTPCode(Base):
+    """Pending one-time password of a login, used by the database OTP store."""
+    __tablename__ = "otp_codes"
+    __table_args__ = (
+        Index("ix_otp_codes_expires_at", "expires_at"),
+    )
+
+    email = Column(String(255), primary_key=True)
+    code = Column(String(12), nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False)
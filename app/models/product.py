@@ -1,11 +1,21 @@
 import uuid
-from sqlalchemy import Column, String, Integer, DateTime, Boolean, func
+from sqlalchemy import Column, String, Integer, DateTime, Boolean, func, Index, text
 from sqlalchemy.dialects.postgresql import UUID
 from app.database import Base
 
 
 class Product(Base):
     __tablename__ = "products"
+    __table_args__ = (
+        Index("ix_products_last_updated_id", "last_updated", "id"),
+        # Every product read filters on is_deleted = false.
+        Index("ix_products_active_name_id", "name", "id", postgresql_where=text("is_deleted = false")),
+        # GET /products/low-stock; holds only the products below their minimum.
+        Index(
+            "ix_products_low_stock_name_id", "name", "id",
+            postgresql_where=text("is_deleted = false AND current_stock < min_stock_level"),
+        ),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     name = Column(String(255), nullable=False, index=True)
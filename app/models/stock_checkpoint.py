@@ -0,0 +1,27 @@
+from sqlalchemy import Column, BigInteger, Integer, String, DateTime, ForeignKey, Index, text
+from sqlalchemy.dialects.postgresql import UUID
+from app.database import Base
+
+
+class StockCheckpoint(Base):
+    """
+    Ledger balance at a point in time.
+    Rows with a NULL location hold the product total; the others hold per-location balances.
+    """
+    __tablename__ = "stock_checkpoints"
+    __table_args__ = (
+        Index("ix_stock_checkpoints_taken_at_product_id_location", "taken_at", "product_id", "location", unique=True),
+        Index(
+            "ix_stock_checkpoints_taken_at_product_id_total",
+            "taken_at",
+            "product_id",
+            unique=True,
+            postgresql_where=text("location IS NULL"),
+        ),
+    )
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    taken_at = Column(DateTime(timezone=True), nullable=False)
+    product_id = Column(UUID(as_uuid=True), ForeignKey("products.id"), nullable=False)
+    location = Column(String(100), nullable=True)
+    quantity = Column(Integer, nullable=False)
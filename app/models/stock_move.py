@@ -1,11 +1,18 @@
 import uuid
-from sqlalchemy import Column, Integer, String, DateTime, func, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, func, ForeignKey, Index
 from sqlalchemy.dialects.postgresql import UUID
 from app.database import Base
 
 
 class StockMove(Base):
+    """Stock move ledger, range-partitioned by month on created_at (see app.utils.stock_move_partitions)."""
     __tablename__ = "stock_moves"
+    __table_args__ = (
+        Index("ix_stock_moves_created_at_id", "created_at", "id"),
+        Index("ix_stock_moves_product_id_created_at", "product_id", "created_at"),
+        Index("ix_stock_moves_operation_id", "operation_id"),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     operation_id = Column(UUID(as_uuid=True), ForeignKey("operations.id", ondelete="CASCADE"), nullable=False)
@@ -13,4 +20,5 @@ class StockMove(Base):
     quantity = Column(Integer, nullable=False)
     location_source = Column(String(100), default="partner")
     location_dest = Column(String(100), default="warehouse")
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Part of the primary key: a partitioned table only enforces uniqueness together with its partition key.
+    created_at = Column(DateTime(timezone=True), primary_key=True, server_default=func.now())
@@ -0,0 +1,14 @@
+from sqlalchemy import Column, BigInteger, String, DateTime, func
+from app.database import Base
+
+
+class StockMoveArchive(Base):
+    """A monthly stock move partition that was exported to a compressed file and dropped."""
+    __tablename__ = "stock_move_archives"
+
+    partition_name = Column(String(63), primary_key=True)
+    range_start = Column(DateTime(timezone=True), nullable=False)
+    range_end = Column(DateTime(timezone=True), nullable=False)
+    path = Column(String(1024), nullable=False)
+    moves = Column(BigInteger, nullable=False)
+    archived_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
@@ -0,0 +1,14 @@
+from sqlalchemy import Column
+from sqlalchemy.dialects.postgresql import UUID
+from app.database import Base
+
+
+class StockMoveId(Base):
+    """
+    Id of every stock move ever stored. Partitioned stock_moves can only enforce
+    (id, created_at) as its key, so resent moves claim their id here first.
+    Triggers on stock_moves add and remove ids; ids of archived moves are kept.
+    """
+    __tablename__ = "stock_move_ids"
+
+    id = Column(UUID(as_uuid=True), primary_key=True)
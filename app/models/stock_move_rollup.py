@@ -0,0 +1,25 @@
+from sqlalchemy import Column, BigInteger, Date, Enum as SQLEnum, ForeignKey, Index, text
+from sqlalchemy.dialects.postgresql import UUID
+from app.database import Base
+from app.models.operation import OperationType
+
+
+class StockMoveRollup(Base):
+    """
+    Stock moves summed per UTC day, product and operation type, kept up to date by
+    database triggers on stock_moves and operations. Positive and negative
+    quantities are summed separately (quantity_in, quantity_out >= 0).
+    """
+    __tablename__ = "stock_move_rollups"
+    __table_args__ = (
+        Index("ix_stock_move_rollups_product_id_day", "product_id", "day"),
+        # Rows whose moves were all deleted, until the trigger removes them.
+        Index("ix_stock_move_rollups_empty", "day", postgresql_where=text("moves = 0")),
+    )
+
+    day = Column(Date, primary_key=True)
+    product_id = Column(UUID(as_uuid=True), ForeignKey("products.id"), primary_key=True)
+    operation_type = Column(SQLEnum(OperationType, name="operationtype"), primary_key=True)
+    quantity_in = Column(BigInteger, nullable=False, default=0)
+    quantity_out = Column(BigInteger, nullable=False, default=0)
+    moves = Column(BigInteger, nullable=False, default=0)
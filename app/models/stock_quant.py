@@ -0,0 +1,16 @@
+from sqlalchemy import Column, Integer, String, DateTime, func, ForeignKey, Index
+from sqlalchemy.dialects.postgresql import UUID
+from app.database import Base
+
+
+class StockQuant(Base):
+    """On-hand quantity of a product at one location, maintained from stock moves."""
+    __tablename__ = "stock_quants"
+    __table_args__ = (
+        Index("ix_stock_quants_location_product_id", "location", "product_id"),
+    )
+
+    product_id = Column(UUID(as_uuid=True), ForeignKey("products.id"), primary_key=True)
+    location = Column(String(100), primary_key=True)
+    quantity = Column(Integer, nullable=False, default=0)
+    last_updated = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
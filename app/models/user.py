@@ -1,5 +1,5 @@
 import uuid
-from sqlalchemy import Column, String, DateTime, func, Enum as SQLEnum
+from sqlalchemy import Column, String, DateTime, func, Enum as SQLEnum, Index
 from sqlalchemy.dialects.postgresql import UUID
 from app.database import Base
 import enum
@@ -13,6 +13,9 @@ class UserRole(str, enum.Enum):
 
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        Index("ix_users_created_at_id", "created_at", "id"),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     email = Column(String(255), unique=True, nullable=False, index=True)
@@ -1,23 +1,35 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
-from app.database import get_db
+from app.database import DbSession, get_session, run_db
 from app.models.user import User
-from app.schemas.otp import OTPRequest, OTPVerify, OTPResponse, LoginResponse
+from app.schemas.otp import (
+    OTPRequest, OTPVerify, OTPResponse, LoginResponse, TokenRefresh, TokenResponse, LogoutRequest, CurrentUser
+)
 from app.utils.otp import generate_otp, save_otp_temp, verify_otp_temp
-from app.utils.auth import hash_password
+from app.utils.auth import (
+    REFRESH, TokenUser, create_tokens, decode_token, get_current_user, hash_password, revoke_tokens
+)
 from app.utils.email import send_otp_email
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
 
+def _get_user_by_email(db: Session, email: str) -> User | None:
+    return db.query(User).filter(User.email == email).first()
+
+
+def _get_user_by_id(db: Session, user_id: str) -> User | None:
+    return db.query(User).filter(User.id == user_id).first()
+
+
 @router.post("/login", response_model=OTPResponse)
-def login(email: str, password: str, db: Session = Depends(get_db)):
+async def login(email: str, password: str, db: DbSession = Depends(get_session)):
     """
     Step 1: Login with email and password.
     If credentials are correct, generate and send OTP via email (valid for 10 minutes).
     """
     # Check if user exists
-    user = db.query(User).filter(User.email == email).first()
+    user = await run_db(db, _get_user_by_email, email)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -36,9 +48,9 @@ def login(email: str, password: str, db: Session = Depends(get_db)):
 
     # Password correct! Generate OTP
     otp = generate_otp()
-    save_otp_temp(email, otp, expires_in_minutes=10)
+    await run_db(db, save_otp_temp, email, otp, 10)
 
-    # Send OTP via email
+    # Queue the OTP email; delivery happens in the background
     email_sent = send_otp_email(email, otp)
     
     if email_sent:
@@ -55,44 +67,84 @@ def login(email: str, password: str, db: Session = Depends(get_db)):
 
 
 @router.post("/verify-otp", response_model=LoginResponse)
-def verify_otp(request: OTPVerify, db: Session = Depends(get_db)):
+async def verify_otp(request: OTPVerify, db: DbSession = Depends(get_session)):
     """
     Step 2: Verify OTP to complete 2FA login.
     """
     # Verify OTP
-    if not verify_otp_temp(request.email, request.otp):
+    if not await run_db(db, verify_otp_temp, request.email, request.otp):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid or expired OTP. Please login again."
         )
 
     # Get user
-    user = db.query(User).filter(User.email == request.email).first()
+    user = await run_db(db, _get_user_by_email, request.email)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found."
         )
 
-    # In production, generate JWT token here
-    # token = create_access_token(user.id)
-    
     return LoginResponse(
         message="2FA verified! Login successful!",
         user_id=str(user.id),
         email=str(user.email),
-        role=user.role.value
+        role=user.role.value,
+        **create_tokens(user)
     )
 
 
+@router.post("/refresh", response_model=TokenResponse)
+async def refresh_tokens(request: TokenRefresh, db: DbSession = Depends(get_session)):
+    """
+    Exchange a refresh token for a new access/refresh pair.
+    The user is re-read so role changes apply; the old refresh token is revoked.
+    """
+    claims = decode_token(request.refresh_token, REFRESH)
+    user = await run_db(db, _get_user_by_id, claims["sub"])
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired token.",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    tokens = create_tokens(user)
+    await run_db(db, revoke_tokens, [claims])
+    return TokenResponse(**tokens)
+
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(
+    request: LogoutRequest | None = None,
+    user: TokenUser = Depends(get_current_user),
+    db: DbSession = Depends(get_session),
+):
+    """
+    Revoke the current access token, and the refresh token if one is given.
+    """
+    revoked = [{"jti": user.token_id, "exp": user.expires_at}]
+    if request is not None and request.refresh_token:
+        revoked.append(decode_token(request.refresh_token, REFRESH))
+    await run_db(db, revoke_tokens, revoked)
+
+
+@router.get("/me", response_model=CurrentUser)
+async def me(user: TokenUser = Depends(get_current_user)):
+    """
+    The user of the bearer access token (no database lookup).
+    """
+    return CurrentUser(user_id=str(user.id), email=user.email, role=user.role.value)
+
+
 @router.post("/request-otp", response_model=OTPResponse)
-def request_otp(request: OTPRequest, db: Session = Depends(get_db)):
+async def request_otp(request: OTPRequest, db: DbSession = Depends(get_session)):
     """
     Alternative: Request OTP directly (without password).
     Check if user exists, send OTP via email.
     """
     # Check if user exists
-    user = db.query(User).filter(User.email == request.email).first()
+    user = await run_db(db, _get_user_by_email, request.email)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -101,9 +153,9 @@ def request_otp(request: OTPRequest, db: Session = Depends(get_db)):
 
     # Generate OTP
     otp = generate_otp()
-    save_otp_temp(request.email, otp, expires_in_minutes=10)
+    await run_db(db, save_otp_temp, request.email, otp, 10)
 
-    # Send OTP via email
+    # Queue the OTP email; delivery happens in the background
     email_sent = send_otp_email(request.email, otp)
     
     if email_sent:
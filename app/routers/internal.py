@@ -0,0 +1,38 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from app.database import DbSession, get_async_engine, get_engine, get_session, pool_stats, run_db, settings
+from app.models.user import UserRole
+from app.utils.auth import require_role
+from app.utils.pool_stats import pool_status
+
+router = APIRouter(prefix="/internal", tags=["internal"], dependencies=[Depends(require_role(UserRole.admin))])
+
+
+def _server_connections(db: Session) -> dict:
+    row = db.execute(text(
+        "SELECT current_setting('max_connections')::int AS max_connections, "
+        "count(*) AS connections, "
+        "count(*) FILTER (WHERE state = 'active') AS active, "
+        "count(*) FILTER (WHERE state LIKE 'idle in transaction%') AS idle_in_transaction "
+        "FROM pg_stat_activity WHERE backend_type = 'client backend'"
+    )).mappings().one()
+    return dict(row)
+
+
+@router.get("/pool")
+async def pool(database: bool = False, db: DbSession = Depends(get_session)):
+    """
+    Connection pool occupancy, checkout waits and timeouts, and statement counts.
+
+    With `database=true` the server's max_connections and current client
+    connections are included too; that query needs a pooled connection, so
+    leave it off while diagnosing an exhausted pool.
+    """
+    engines = {"sync": get_engine()}
+    if settings.db_async:
+        engines["async"] = get_async_engine().sync_engine
+    report = {name: pool_status(engine, pool_stats[name]) for name, engine in engines.items()}
+    if database:
+        report["server"] = await run_db(db, _server_connections)
+    return report
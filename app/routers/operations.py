@@ -1,16 +1,31 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from uuid import UUID
-from app.database import get_db
-from app.models.operation import Operation
+from typing import Optional
+from app.database import DbSession, get_session, run_db
+from app.models.operation import Operation, OperationType, OperationStatus
+from app.models.stock_move import StockMove
 from app.schemas.operation import OperationCreate, OperationResponse, OperationUpdate
+from app.utils.pagination import PageParams, paginate
+from app.utils.stock_checkpoints import adjust_checkpoints_from
+from app.utils.stock_update import apply_stock_moves
 
 router = APIRouter(prefix="/operations", tags=["operations"])
 
+OPERATION_SORTS = {
+    "created_at": (Operation.created_at, Operation.id),
+    "last_updated": (Operation.last_updated, Operation.id),
+}
+
 
 @router.post("/", response_model=OperationResponse, status_code=status.HTTP_201_CREATED)
-def create_operation(operation: OperationCreate, db: Session = Depends(get_db)):
+async def create_operation(operation: OperationCreate, db: DbSession = Depends(get_session)):
     """Create a new operation."""
+    return await run_db(db, _create_operation, operation)
+
+
+def _create_operation(db: Session, operation: OperationCreate) -> Operation:
     db_operation = Operation(
         type=operation.type,
         reference_code=operation.reference_code,
@@ -23,8 +38,12 @@ def create_operation(operation: OperationCreate, db: Session = Depends(get_db)):
 
 
 @router.get("/{operation_id}", response_model=OperationResponse)
-def get_operation(operation_id: UUID, db: Session = Depends(get_db)):
+async def get_operation(operation_id: UUID, db: DbSession = Depends(get_session)):
     """Get an operation by ID."""
+    return await run_db(db, _get_operation, operation_id)
+
+
+def _get_operation(db: Session, operation_id: UUID) -> Operation:
     operation = db.query(Operation).filter(Operation.id == operation_id).first()
     if not operation:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Operation not found")
@@ -32,14 +51,42 @@ def get_operation(operation_id: UUID, db: Session = Depends(get_db)):
 
 
 @router.get("/", response_model=list[OperationResponse])
-def list_operations(db: Session = Depends(get_db)):
-    """List all operations."""
-    return db.query(Operation).all()
+async def list_operations(
+    response: Response,
+    operation_type: Optional[OperationType] = Query(None, alias="type"),
+    operation_status: Optional[OperationStatus] = Query(None, alias="status"),
+    created_by: Optional[UUID] = None,
+    sort: str = "-created_at",
+    page: PageParams = Depends(),
+    db: DbSession = Depends(get_session),
+):
+    """List operations, one keyset page at a time (next page cursor in X-Next-Cursor)."""
+    filters = []
+    if operation_type is not None:
+        filters.append(Operation.type == operation_type)
+    if operation_status is not None:
+        filters.append(Operation.status == operation_status)
+    if created_by is not None:
+        filters.append(Operation.created_by == created_by)
+    return await run_db(db, _list_operations, filters, sort, page, response)
+
+
+def _list_operations(db: Session, filters: list, sort: str, page: PageParams, response: Response) -> list:
+    query = db.query(Operation).filter(*filters)
+    return paginate(db, query, OPERATION_SORTS, sort, page, response)
 
 
 @router.put("/{operation_id}", response_model=OperationResponse)
-def update_operation(operation_id: UUID, operation_update: OperationUpdate, db: Session = Depends(get_db)):
+async def update_operation(
+    operation_id: UUID,
+    operation_update: OperationUpdate,
+    db: DbSession = Depends(get_session),
+):
     """Update an operation."""
+    return await run_db(db, _update_operation, operation_id, operation_update)
+
+
+def _update_operation(db: Session, operation_id: UUID, operation_update: OperationUpdate) -> Operation:
     db_operation = db.query(Operation).filter(Operation.id == operation_id).first()
     if not db_operation:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Operation not found")
@@ -54,11 +101,31 @@ def update_operation(operation_id: UUID, operation_update: OperationUpdate, db:
 
 
 @router.delete("/{operation_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_operation(operation_id: UUID, db: Session = Depends(get_db)):
-    """Delete an operation."""
-    db_operation = db.query(Operation).filter(Operation.id == operation_id).first()
+async def delete_operation(operation_id: UUID, db: DbSession = Depends(get_session)):
+    """Delete an operation and reverse the stock effect of its cascaded stock moves."""
+    await run_db(db, _delete_operation, operation_id)
+
+
+def _delete_operation(db: Session, operation_id: UUID) -> None:
+    db_operation = db.query(Operation).filter(Operation.id == operation_id).with_for_update().first()
     if not db_operation:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Operation not found")
 
+    totals = (
+        db.query(
+            StockMove.product_id,
+            StockMove.location_source,
+            StockMove.location_dest,
+            func.sum(StockMove.quantity).label("quantity"),
+        )
+        .filter(StockMove.operation_id == operation_id)
+        .group_by(StockMove.product_id, StockMove.location_source, StockMove.location_dest)
+        .all()
+    )
+    apply_stock_moves(db, removed=totals)
+    if totals:
+        moves = db.query(StockMove).filter(StockMove.operation_id == operation_id).subquery()
+        adjust_checkpoints_from(db, moves, sign=-1)
+
     db.delete(db_operation)
     db.commit()
@@ -1,18 +1,52 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from uuid import UUID
-from app.database import get_db
+from datetime import datetime, timezone
+from typing import Optional
+from app.config import get_settings
+from app.database import DbSession, SessionLocal, get_session, run_db
 from app.models.product import Product
+from app.schemas.bulk_import import ProductImportResult
 from app.schemas.product import ProductCreate, ProductResponse, ProductUpdate
+from app.schemas.stock_checkpoint import StockAsOfResponse
+from app.utils.bulk_io import (
+    MEDIA_TYPES, BulkFormat, copy_out, export_sql, import_products, request_format, spool_request_body,
+)
+from app.utils.catalog import catalog_etag, catalog_snapshot, etag_matches, mark_catalog_changed
+from app.utils.compression import accepted_encoding
+from app.utils.pagination import PageParams, paginate
+from app.utils.product_cache import invalidate_products, product_cache
+from app.utils.stock_checkpoints import balances_as_of
 
 router = APIRouter(prefix="/products", tags=["products"])
+settings = get_settings()
+
+PRODUCT_SORTS = {
+    "name": (Product.name, Product.id),
+    "sku": (Product.sku,),
+    "last_updated": (Product.last_updated, Product.id),
+}
+LOW_STOCK_SORTS = {
+    "name": (Product.name, Product.id),
+    "sku": (Product.sku,),
+}
 
 
 @router.post("/", response_model=ProductResponse, status_code=status.HTTP_201_CREATED)
-def create_product(product: ProductCreate, db: Session = Depends(get_db)):
+async def create_product(product: ProductCreate, db: DbSession = Depends(get_session)):
     """Create a new product."""
+    return await run_db(db, _create_product, product)
+
+
+def _create_product(db: Session, product: ProductCreate) -> Product:
+    if product_cache.get_by_sku(product.sku) is not None:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="SKU already exists")
+    token = product_cache.fill_token()
     existing_product = db.query(Product).filter(Product.sku == product.sku).first()
     if existing_product:
+        product_cache.put(ProductResponse.model_validate(existing_product), token)
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="SKU already exists")
 
     db_product = Product(
@@ -22,29 +56,191 @@ def create_product(product: ProductCreate, db: Session = Depends(get_db)):
         min_stock_level=product.min_stock_level,
     )
     db.add(db_product)
+    mark_catalog_changed(db)
     db.commit()
     db.refresh(db_product)
     return db_product
 
 
+@router.get("/catalog", response_model=list[ProductResponse])
+async def get_catalog(request: Request, db: DbSession = Depends(get_session)):
+    """
+    Every active product, served from an in-memory snapshot that is rebuilt
+    on the first read after a product or stock change. Send the ETag back in
+    If-None-Match to get 304 Not Modified without a database query.
+    """
+    etag = catalog_etag()
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    snapshot = await run_db(db, catalog_snapshot)
+    headers["ETag"] = snapshot.etag
+    encoding = accepted_encoding(request.headers.get("accept-encoding", ""))
+    if encoding in snapshot.bodies:
+        headers["Content-Encoding"] = encoding
+    return Response(snapshot.bodies[encoding or "identity"], media_type="application/json", headers=headers)
+
+
+@router.post("/import", response_model=ProductImportResult)
+async def import_products_file(request: Request):
+    """
+    Bulk upsert products by SKU from a streamed CSV (text/csv, header row with
+    sku, name and optionally category, min_stock_level) or NDJSON
+    (application/x-ndjson) body, optionally gzip or zstd compressed.
+    The body goes through COPY into a staging table and is validated and
+    deduplicated in SQL; rejected rows are counted and the first ones listed.
+    """
+    file_format = request_format(request)
+    upload = await spool_request_body(request)
+    try:
+        return await run_in_threadpool(_import_products, upload, file_format)
+    finally:
+        upload.close()
+
+
+def _import_products(upload, file_format: BulkFormat) -> dict:
+    db = SessionLocal()
+    try:
+        result = import_products(db, upload, file_format)
+        db.commit()
+        return result
+    finally:
+        db.close()
+
+
+@router.get("/export")
+def export_products(file_format: BulkFormat = Query(BulkFormat.csv, alias="format")):
+    """Stream every active product as CSV or NDJSON straight from COPY, in the import's column layout."""
+    def generate():
+        db = SessionLocal()
+        try:
+            yield from copy_out(db, export_sql("products", file_format))
+        finally:
+            db.close()
+
+    return StreamingResponse(
+        generate(),
+        media_type=MEDIA_TYPES[file_format],
+        headers={"Content-Disposition": f'attachment; filename="products.{file_format.value}"'},
+    )
+
+
+@router.get("/low-stock", response_model=list[ProductResponse])
+async def list_low_stock_products(
+    request: Request,
+    response: Response,
+    category: Optional[list[str]] = Query(None),
+    sort: str = "name",
+    page: PageParams = Depends(),
+    db: DbSession = Depends(get_session),
+):
+    """
+    Active products whose current_stock is below min_stock_level, optionally in
+    some categories, paginated like the product list. Served from a partial
+    index holding only those products; pages carry the catalog ETag.
+    """
+    etag = catalog_etag(str(request.query_params))
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+
+    filters = [Product.is_deleted == False, Product.current_stock < Product.min_stock_level]
+    if category:
+        filters.append(Product.category.in_(category))
+    return await run_db(db, _list_low_stock_products, filters, sort, page, response)
+
+
+def _list_low_stock_products(db: Session, filters: list, sort: str, page: PageParams, response: Response) -> list:
+    query = db.query(Product).filter(*filters)
+    return paginate(db, query, LOW_STOCK_SORTS, sort, page, response)
+
+
+@router.get("/stock", response_model=list[StockAsOfResponse])
+async def get_products_stock_as_of(
+    product_ids: list[UUID] = Query(..., max_length=settings.list_max_page_size),
+    as_of: Optional[datetime] = None,
+    db: DbSession = Depends(get_session),
+):
+    """Ledger stock of several products at a point in time (default: now)."""
+    as_of = as_of or datetime.now(timezone.utc)
+    balances = await run_db(db, balances_as_of, as_of, product_ids)
+    return [
+        StockAsOfResponse(product_id=product_id, as_of=as_of, **balances.get(product_id, {}))
+        for product_id in product_ids
+    ]
+
+
+@router.get("/{product_id}/stock", response_model=StockAsOfResponse)
+async def get_product_stock_as_of(
+    product_id: UUID,
+    as_of: Optional[datetime] = None,
+    db: DbSession = Depends(get_session),
+):
+    """
+    Ledger stock of a product, total and per location, at a point in time (default: now).
+    Starts from the nearest earlier checkpoint and replays only the moves after it.
+    """
+    as_of = as_of or datetime.now(timezone.utc)
+    balances = await run_db(db, balances_as_of, as_of, [product_id])
+    return StockAsOfResponse(product_id=product_id, as_of=as_of, **balances.get(product_id, {}))
+
+
 @router.get("/{product_id}", response_model=ProductResponse)
-def get_product(product_id: UUID, db: Session = Depends(get_db)):
+async def get_product(product_id: UUID, db: DbSession = Depends(get_session)):
     """Get a product by ID."""
-    product = db.query(Product).filter(Product.id == product_id, Product.is_deleted == False).first()
-    if not product:
+    return await run_db(db, _get_product, product_id)
+
+
+def _get_product(db: Session, product_id: UUID) -> ProductResponse:
+    product = product_cache.get(product_id)
+    if product is None:
+        token = product_cache.fill_token()
+        db_product = db.query(Product).filter(Product.id == product_id).first()
+        if db_product is not None:
+            product = ProductResponse.model_validate(db_product)
+            product_cache.put(product, token)
+    if product is None or product.is_deleted:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Product not found")
     return product
 
 
 @router.get("/", response_model=list[ProductResponse])
-def list_products(db: Session = Depends(get_db)):
-    """List all active products."""
-    return db.query(Product).filter(Product.is_deleted == False).all()
+async def list_products(
+    request: Request,
+    response: Response,
+    category: Optional[str] = None,
+    sort: str = "name",
+    page: PageParams = Depends(),
+    db: DbSession = Depends(get_session),
+):
+    """
+    List active products, one keyset page at a time (next page cursor in X-Next-Cursor).
+    Pages carry a catalog-version ETag; a matching If-None-Match gets 304 without a query.
+    """
+    etag = catalog_etag(str(request.query_params))
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+
+    filters = [Product.is_deleted == False]
+    if category is not None:
+        filters.append(Product.category == category)
+    return await run_db(db, _list_products, filters, sort, page, response)
+
+
+def _list_products(db: Session, filters: list, sort: str, page: PageParams, response: Response) -> list:
+    query = db.query(Product).filter(*filters)
+    return paginate(db, query, PRODUCT_SORTS, sort, page, response)
 
 
 @router.put("/{product_id}", response_model=ProductResponse)
-def update_product(product_id: UUID, product_update: ProductUpdate, db: Session = Depends(get_db)):
+async def update_product(product_id: UUID, product_update: ProductUpdate, db: DbSession = Depends(get_session)):
     """Update a product."""
+    return await run_db(db, _update_product, product_id, product_update)
+
+
+def _update_product(db: Session, product_id: UUID, product_update: ProductUpdate) -> Product:
     db_product = db.query(Product).filter(Product.id == product_id).first()
     if not db_product:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Product not found")
@@ -53,17 +249,25 @@ def update_product(product_id: UUID, product_update: ProductUpdate, db: Session
     for field, value in update_data.items():
         setattr(db_product, field, value)
 
+    mark_catalog_changed(db)
+    invalidate_products(db, [product_id])
     db.commit()
     db.refresh(db_product)
     return db_product
 
 
 @router.delete("/{product_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_product(product_id: UUID, db: Session = Depends(get_db)):
+async def delete_product(product_id: UUID, db: DbSession = Depends(get_session)):
     """Soft delete a product."""
+    await run_db(db, _delete_product, product_id)
+
+
+def _delete_product(db: Session, product_id: UUID) -> None:
     db_product = db.query(Product).filter(Product.id == product_id).first()
     if not db_product:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Product not found")
 
     db_product.is_deleted = True
+    mark_catalog_changed(db)
+    invalidate_products(db, [product_id])
     db.commit()
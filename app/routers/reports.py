@@ -0,0 +1,84 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from uuid import UUID
+from datetime import date, datetime, timedelta, timezone
+from typing import Optional
+from app.config import get_settings
+from app.database import DbSession, get_session, run_db
+from app.models.operation import OperationType
+from app.models.product import Product
+from app.models.stock_move_rollup import StockMoveRollup
+from app.schemas.report import CategoryMovementResponse, ProductMovementResponse
+from app.utils.move_rollups import category_report
+from app.utils.pagination import PageParams, paginate
+
+router = APIRouter(prefix="/reports", tags=["reports"])
+settings = get_settings()
+
+MOVEMENT_SORTS = {
+    "day": (StockMoveRollup.day, StockMoveRollup.product_id, StockMoveRollup.operation_type),
+}
+
+
+class ReportPeriod:
+    """Inclusive UTC day range of a report (default: the last REPORT_DEFAULT_DAYS days)."""
+
+    def __init__(self, date_from: Optional[date] = None, date_to: Optional[date] = None):
+        self.date_to = date_to or datetime.now(timezone.utc).date()
+        self.date_from = date_from or self.date_to - timedelta(days=settings.report_default_days - 1)
+        if self.date_from > self.date_to:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="date_from is after date_to")
+        if (self.date_to - self.date_from).days >= settings.report_max_days:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Reports cover at most {settings.report_max_days} days",
+            )
+
+
+def _filters(operation_type: Optional[list[OperationType]], category: Optional[list[str]]) -> list:
+    filters = []
+    if operation_type:
+        filters.append(StockMoveRollup.operation_type.in_(operation_type))
+    if category:
+        filters.append(StockMoveRollup.product_id.in_(select(Product.id).where(Product.category.in_(category))))
+    return filters
+
+
+@router.get("/movements", response_model=list[ProductMovementResponse])
+async def product_movements(
+    response: Response,
+    period: ReportPeriod = Depends(),
+    product_id: Optional[UUID] = None,
+    operation_type: Optional[list[OperationType]] = Query(None),
+    category: Optional[list[str]] = Query(None),
+    sort: str = "day",
+    page: PageParams = Depends(),
+    db: DbSession = Depends(get_session),
+):
+    """
+    Daily received/delivered/adjusted quantities per product and operation type,
+    from the stock move rollups (next page cursor in X-Next-Cursor).
+    """
+    filters = [StockMoveRollup.day >= period.date_from, StockMoveRollup.day <= period.date_to]
+    filters.extend(_filters(operation_type, category))
+    if product_id is not None:
+        filters.append(StockMoveRollup.product_id == product_id)
+    return await run_db(db, _product_movements, filters, sort, page, response)
+
+
+def _product_movements(db: Session, filters: list, sort: str, page: PageParams, response: Response) -> list:
+    query = db.query(StockMoveRollup).filter(*filters)
+    return paginate(db, query, MOVEMENT_SORTS, sort, page, response)
+
+
+@router.get("/movements/categories", response_model=list[CategoryMovementResponse])
+async def category_movements(
+    period: ReportPeriod = Depends(),
+    operation_type: Optional[list[OperationType]] = Query(None),
+    category: Optional[list[str]] = Query(None),
+    db: DbSession = Depends(get_session),
+):
+    """Daily quantities per product category and operation type, from the stock move rollups."""
+    filters = _filters(operation_type, category)
+    return await run_db(db, category_report, period.date_from, period.date_to, filters)
@@ -1,17 +1,41 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 from uuid import UUID
-from app.database import get_db
+from datetime import datetime
+from typing import Optional
+from app.config import get_settings
+from app.database import DbSession, SessionLocal, get_session, run_db
 from app.models.stock_move import StockMove
+from app.schemas.bulk_import import StockMoveImportResult
 from app.schemas.stock_move import StockMoveCreate, StockMoveResponse, StockMoveUpdate
-from app.utils.stock_update import update_stock_levels
+from app.utils.bulk_io import (
+    MEDIA_TYPES, BulkFormat, copy_out, export_sql, import_stock_moves, request_format, spool_request_body,
+)
+from app.utils.pagination import PageParams, paginate
+from app.utils.stock_checkpoints import adjust_checkpoints
+from app.utils.stock_update import apply_stock_moves
 
 router = APIRouter(prefix="/stock-moves", tags=["stock-moves"])
+settings = get_settings()
+
+STOCK_MOVE_SORTS = {
+    "created_at": (StockMove.created_at, StockMove.id),
+}
 
 
 @router.post("/", response_model=StockMoveResponse, status_code=status.HTTP_201_CREATED)
-def create_stock_move(stock_move: StockMoveCreate, db: Session = Depends(get_db)):
-    """Create a new stock move and update product stock levels."""
+async def create_stock_move(stock_move: StockMoveCreate, db: DbSession = Depends(get_session)):
+    """Create a new stock move and update product stock levels in the same transaction."""
+    return await run_db(db, _create_stock_move, stock_move)
+
+
+def _create_stock_move(db: Session, stock_move: StockMoveCreate) -> StockMove:
+    if stock_move.product_id not in apply_stock_moves(db, added=[stock_move]):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Product not found")
+
     db_stock_move = StockMove(
         operation_id=stock_move.operation_id,
         product_id=stock_move.product_id,
@@ -20,19 +44,98 @@ def create_stock_move(stock_move: StockMoveCreate, db: Session = Depends(get_db)
         location_dest=stock_move.location_dest,
     )
     db.add(db_stock_move)
-    db.flush()
-
-    # Update stock levels
-    update_stock_levels(db, stock_move.product_id, stock_move.quantity)
-    
     db.commit()
     db.refresh(db_stock_move)
     return db_stock_move
 
 
+@router.post("/bulk", response_model=list[StockMoveResponse], status_code=status.HTTP_201_CREATED)
+async def create_stock_moves_bulk(stock_moves: list[StockMoveCreate], db: DbSession = Depends(get_session)):
+    """
+    Create many stock moves in one transaction.
+    Quantities are summed per product and each product's net delta is applied once.
+    """
+    if len(stock_moves) > settings.stock_move_bulk_max_rows:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {settings.stock_move_bulk_max_rows} stock moves per request",
+        )
+    if not stock_moves:
+        return []
+    return await run_db(db, _create_stock_moves_bulk, stock_moves)
+
+
+def _create_stock_moves_bulk(db: Session, stock_moves: list[StockMoveCreate]) -> list[StockMoveResponse]:
+    updated = apply_stock_moves(db, added=stock_moves)
+    missing = sorted({str(stock_move.product_id) for stock_move in stock_moves if stock_move.product_id not in updated})
+    if missing:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Products not found: {', '.join(missing)}")
+
+    created = db.scalars(
+        insert(StockMove).returning(StockMove),
+        [stock_move.model_dump() for stock_move in stock_moves],
+    ).all()
+    response = [StockMoveResponse.model_validate(stock_move) for stock_move in created]
+    db.commit()
+    return response
+
+
+@router.post("/import", response_model=StockMoveImportResult)
+async def import_stock_moves_file(request: Request):
+    """
+    Bulk append stock moves from a streamed CSV (text/csv) or NDJSON
+    (application/x-ndjson) body, optionally gzip or zstd compressed.
+    Columns: quantity, sku or product_id, and optionally id, operation_id,
+    location_source, location_dest, created_at. Rows without operation_id go
+    to one adjustment operation created for the import; rows whose id exists
+    are skipped. Stock levels and quants are adjusted in one pass.
+    """
+    file_format = request_format(request)
+    upload = await spool_request_body(request)
+    try:
+        return await run_in_threadpool(_import_stock_moves, upload, file_format)
+    finally:
+        upload.close()
+
+
+def _import_stock_moves(upload, file_format: BulkFormat) -> dict:
+    db = SessionLocal()
+    try:
+        result = import_stock_moves(db, upload, file_format)
+        db.commit()
+        return result
+    finally:
+        db.close()
+
+
+@router.get("/export")
+def export_stock_moves(
+    file_format: BulkFormat = Query(BulkFormat.csv, alias="format"),
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+):
+    """Stream stock moves created in [since, until) as CSV or NDJSON straight from COPY, oldest first."""
+    def generate():
+        db = SessionLocal()
+        try:
+            yield from copy_out(db, export_sql("stock_moves", file_format, since, until))
+        finally:
+            db.close()
+
+    return StreamingResponse(
+        generate(),
+        media_type=MEDIA_TYPES[file_format],
+        headers={"Content-Disposition": f'attachment; filename="stock_moves.{file_format.value}"'},
+    )
+
+
 @router.get("/{stock_move_id}", response_model=StockMoveResponse)
-def get_stock_move(stock_move_id: UUID, db: Session = Depends(get_db)):
+async def get_stock_move(stock_move_id: UUID, db: DbSession = Depends(get_session)):
     """Get a stock move by ID."""
+    return await run_db(db, _get_stock_move, stock_move_id)
+
+
+def _get_stock_move(db: Session, stock_move_id: UUID) -> StockMove:
     stock_move = db.query(StockMove).filter(StockMove.id == stock_move_id).first()
     if not stock_move:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Stock move not found")
@@ -40,19 +143,54 @@ def get_stock_move(stock_move_id: UUID, db: Session = Depends(get_db)):
 
 
 @router.get("/", response_model=list[StockMoveResponse])
-def list_stock_moves(db: Session = Depends(get_db)):
-    """List all stock moves."""
-    return db.query(StockMove).all()
+async def list_stock_moves(
+    response: Response,
+    product_id: Optional[UUID] = None,
+    operation_id: Optional[UUID] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    sort: str = "-created_at",
+    page: PageParams = Depends(),
+    db: DbSession = Depends(get_session),
+):
+    """List stock moves, one keyset page at a time (next page cursor in X-Next-Cursor)."""
+    filters = []
+    if product_id is not None:
+        filters.append(StockMove.product_id == product_id)
+    if operation_id is not None:
+        filters.append(StockMove.operation_id == operation_id)
+    if created_from is not None:
+        filters.append(StockMove.created_at >= created_from)
+    if created_to is not None:
+        filters.append(StockMove.created_at < created_to)
+    return await run_db(db, _list_stock_moves, filters, sort, page, response)
+
+
+def _list_stock_moves(db: Session, filters: list, sort: str, page: PageParams, response: Response) -> list:
+    query = db.query(StockMove).filter(*filters)
+    return paginate(db, query, STOCK_MOVE_SORTS, sort, page, response)
 
 
 @router.put("/{stock_move_id}", response_model=StockMoveResponse)
-def update_stock_move(stock_move_id: UUID, stock_move_update: StockMoveUpdate, db: Session = Depends(get_db)):
-    """Update a stock move."""
-    db_stock_move = db.query(StockMove).filter(StockMove.id == stock_move_id).first()
+async def update_stock_move(
+    stock_move_id: UUID,
+    stock_move_update: StockMoveUpdate,
+    db: DbSession = Depends(get_session),
+):
+    """Update a stock move, applying the quantity difference to product stock."""
+    return await run_db(db, _update_stock_move, stock_move_id, stock_move_update)
+
+
+def _update_stock_move(db: Session, stock_move_id: UUID, stock_move_update: StockMoveUpdate) -> StockMove:
+    db_stock_move = db.query(StockMove).filter(StockMove.id == stock_move_id).with_for_update().first()
     if not db_stock_move:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Stock move not found")
 
     update_data = stock_move_update.model_dump(exclude_unset=True)
+    before = StockMoveResponse.model_validate(db_stock_move)
+    after = before.model_copy(update=update_data)
+    apply_stock_moves(db, added=[after], removed=[before])
+    adjust_checkpoints(db, added=[after], removed=[before])
     for field, value in update_data.items():
         setattr(db_stock_move, field, value)
 
@@ -62,11 +200,17 @@ def update_stock_move(stock_move_id: UUID, stock_move_update: StockMoveUpdate, d
 
 
 @router.delete("/{stock_move_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_stock_move(stock_move_id: UUID, db: Session = Depends(get_db)):
-    """Delete a stock move."""
-    db_stock_move = db.query(StockMove).filter(StockMove.id == stock_move_id).first()
+async def delete_stock_move(stock_move_id: UUID, db: DbSession = Depends(get_session)):
+    """Delete a stock move and reverse its effect on product stock."""
+    await run_db(db, _delete_stock_move, stock_move_id)
+
+
+def _delete_stock_move(db: Session, stock_move_id: UUID) -> None:
+    db_stock_move = db.query(StockMove).filter(StockMove.id == stock_move_id).with_for_update().first()
     if not db_stock_move:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Stock move not found")
 
+    apply_stock_moves(db, removed=[db_stock_move])
+    adjust_checkpoints(db, removed=[db_stock_move])
     db.delete(db_stock_move)
     db.commit()
@@ -0,0 +1,42 @@
+from fastapi import APIRouter, Depends, Response
+from sqlalchemy.orm import Session
+from uuid import UUID
+from typing import Optional
+from app.database import DbSession, get_session, run_db
+from app.models.stock_quant import StockQuant
+from app.schemas.stock_quant import StockQuantResponse
+from app.utils.pagination import PageParams, paginate
+
+router = APIRouter(prefix="/stock-quants", tags=["stock-quants"])
+
+STOCK_QUANT_SORTS = {
+    "product": (StockQuant.product_id, StockQuant.location),
+    "location": (StockQuant.location, StockQuant.product_id),
+}
+
+
+@router.get("/", response_model=list[StockQuantResponse])
+async def list_stock_quants(
+    response: Response,
+    product_id: Optional[UUID] = None,
+    location: Optional[str] = None,
+    sort: str = "location",
+    page: PageParams = Depends(),
+    db: DbSession = Depends(get_session),
+):
+    """
+    List per-location stock balances (next page cursor in X-Next-Cursor).
+    Filter by product_id for every location of a product, by location for
+    everything stored there, or both for a single balance.
+    """
+    filters = []
+    if product_id is not None:
+        filters.append(StockQuant.product_id == product_id)
+    if location is not None:
+        filters.append(StockQuant.location == location)
+    return await run_db(db, _list_stock_quants, filters, sort, page, response)
+
+
+def _list_stock_quants(db: Session, filters: list, sort: str, page: PageParams, response: Response) -> list:
+    query = db.query(StockQuant).filter(*filters)
+    return paginate(db, query, STOCK_QUANT_SORTS, sort, page, response)
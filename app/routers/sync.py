@@ -1,19 +1,35 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import json
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
-from pydantic import BaseModel
-from uuid import UUID
+from pydantic import BaseModel, ValidationError
 from datetime import datetime
 from typing import Optional
-from app.database import get_db
+from uuid import UUID
+from app.config import get_settings
+from app.database import DbSession, SessionLocal, get_session, run_db
 from app.models.product import Product
 from app.models.operation import Operation
 from app.models.stock_move import StockMove
 from app.schemas.product import ProductResponse
 from app.schemas.operation import OperationResponse
 from app.schemas.stock_move import StockMoveResponse
+from app.utils.change_log import changes_since, pruned_seq, sequence_changes
+from app.utils.metrics import record_sync
+from app.utils.pagination import encode_cursor, decode_cursor, keyset_position, keyset_after
+from app.utils.sync_ingest import ConflictPolicy, ingest_payload
+from app.utils.wire_format import COLUMNAR, JSON, MSGPACK, negotiate, read_payload, wire_response
 
 router = APIRouter(prefix="/sync", tags=["sync"])
+settings = get_settings()
+
+# (name, model, keyset timestamp column, response schema) for each pulled entity.
+PULL_ENTITIES = (
+    ("products", Product, Product.last_updated, ProductResponse),
+    ("operations", Operation, Operation.last_updated, OperationResponse),
+    ("stock_moves", StockMove, StockMove.created_at, StockMoveResponse),
+)
 
 
 class SyncPushPayload(BaseModel):
@@ -23,79 +39,232 @@ class SyncPushPayload(BaseModel):
     stock_moves: Optional[list[dict]] = None
 
 
+class SyncTombstone(BaseModel):
+    """A row deleted since the client's last sync."""
+    entity: str
+    id: UUID
+
+
 class SyncPullResponse(BaseModel):
     """Response containing synced data."""
     products: list[ProductResponse] = []
     operations: list[OperationResponse] = []
     stock_moves: list[StockMoveResponse] = []
+    deleted: list[SyncTombstone] = []
+    next_cursor: Optional[str] = None
+    next_seq: Optional[int] = None
+    has_more: bool = False
 
 
-@router.post("/push")
-def sync_push(payload: SyncPushPayload, db: Session = Depends(get_db)):
+@router.post(
+    "/push",
+    openapi_extra={"requestBody": {"required": True, "content": {
+        JSON: {"schema": SyncPushPayload.model_json_schema()},
+        MSGPACK: {"schema": {"type": "string", "format": "binary"}},
+        COLUMNAR: {"schema": {"type": "string", "format": "binary"}},
+    }}},
+)
+async def sync_push(
+    request: Request,
+    conflict_policy: ConflictPolicy = ConflictPolicy.skip,
+    db: DbSession = Depends(get_session),
+):
     """
     Push offline-generated data to server.
     Frontend sends UUID objects that were created offline.
+    Rows are upserted in batches (products, then operations, then stock moves);
+    existing rows are skipped or overwritten when the pushed last_updated is newer.
+    The body may be JSON, msgpack or columnar msgpack (Content-Type), optionally
+    gzip or zstd compressed (Content-Encoding).
     """
-    synced_ids = {
-        "products": [],
-        "operations": [],
-        "stock_moves": [],
-    }
-
-    # Handle products
-    if payload.products:
-        for product_data in payload.products:
-            product_id = product_data.get("id")
-            existing = db.query(Product).filter(Product.id == product_id).first()
-            if not existing:
-                product = Product(**product_data)
-                db.add(product)
-                synced_ids["products"].append(str(product_id))
-
-    # Handle operations
-    if payload.operations:
-        for operation_data in payload.operations:
-            operation_id = operation_data.get("id")
-            existing = db.query(Operation).filter(Operation.id == operation_id).first()
-            if not existing:
-                operation = Operation(**operation_data)
-                db.add(operation)
-                synced_ids["operations"].append(str(operation_id))
-
-    # Handle stock moves
-    if payload.stock_moves:
-        for stock_move_data in payload.stock_moves:
-            stock_move_id = stock_move_data.get("id")
-            existing = db.query(StockMove).filter(StockMove.id == stock_move_id).first()
-            if not existing:
-                stock_move = StockMove(**stock_move_data)
-                db.add(stock_move)
-                synced_ids["stock_moves"].append(str(stock_move_id))
-
-    db.commit()
+    data, body_size = await read_payload(request)
+    try:
+        payload = SyncPushPayload.model_validate(data)
+    except ValidationError as exc:
+        raise RequestValidationError(exc.errors())
+    synced_ids = await run_db(db, _sync_push, payload.model_dump(), conflict_policy)
+    record_sync(
+        "push",
+        {name: len(getattr(payload, name) or ()) for name in ("products", "operations", "stock_moves")},
+        body_size,
+    )
     return {
         "status": "success",
         "synced": synced_ids,
     }
 
 
+def _sync_push(db: Session, payload: dict, conflict_policy: ConflictPolicy) -> dict:
+    synced_ids = ingest_payload(
+        db,
+        payload,
+        policy=conflict_policy,
+        batch_size=settings.sync_batch_size,
+    )
+    db.commit()
+    return synced_ids
+
+
+def _pull_state(since: Optional[datetime], cursor: Optional[str]) -> dict:
+    """Starting keyset positions, taken from the cursor or from `since`."""
+    if cursor:
+        return decode_cursor(cursor)
+    return {"since": since.isoformat() if since else None}
+
+
+def _begin_snapshot(db: Session) -> None:
+    """Run every query of this session inside one REPEATABLE READ snapshot."""
+    db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+
+
+def _pull_query(db: Session, model, order_column, state: dict, name: str):
+    keyset = (order_column, model.id)
+    query = db.query(model)
+    if model is Product:
+        query = query.filter(Product.is_deleted == False)
+    if state.get(name):
+        query = query.filter(keyset_after(keyset, keyset_position(keyset, state[name])))
+    elif state.get("since"):
+        query = query.filter(order_column >= keyset_position((order_column,), [state["since"]])[0])
+    return query.order_by(*keyset)
+
+
 @router.get("/pull", response_model=SyncPullResponse)
-def sync_pull(since: Optional[datetime] = None, db: Session = Depends(get_db)):
+async def sync_pull(
+    request: Request,
+    since: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    since_seq: Optional[int] = Query(None, ge=0),
+    limit: int = Query(settings.sync_pull_page_size, ge=1, le=settings.sync_pull_max_page_size),
+    db: DbSession = Depends(get_session),
+):
     """
-    Pull updated rows from server.
-    Returns all rows updated since the provided timestamp (or all if no timestamp).
+    Pull updated rows from server, one keyset page at a time.
+    Returns up to `limit` rows per entity updated since the provided timestamp
+    (or all if no timestamp). Pass `next_cursor` back to get the next page; the
+    cursor of the last page can be kept as the starting point of the next sync.
+
+    With `since_seq` the change log is used instead: up to `limit` rows changed
+    after that sequence number, with deletions listed in `deleted`. Keep
+    `next_seq` for the next pull; 410 means the position was compacted away and
+    the client must resync from 0. A resync still below the compaction horizon
+    keeps `next_seq` at 0 and returns `next_cursor`, to pass back with it.
+
+    The response is JSON, msgpack or columnar msgpack, as negotiated through Accept.
     """
+    media_type = negotiate(request)
+    if since_seq is not None:
+        pull = await run_db(db, _sync_pull_changes, since_seq, cursor, limit)
+    else:
+        pull = await run_db(db, _sync_pull, _pull_state(since, cursor), limit)
+    response = wire_response(pull, media_type)
+    record_sync(
+        "pull",
+        {name: len(getattr(pull, name)) for name in ("products", "operations", "stock_moves", "deleted")},
+        len(response.body),
+    )
+    return response
+
+
+def _sync_pull(db: Session, state: dict, limit: int) -> SyncPullResponse:
+    _begin_snapshot(db)
+
     response = SyncPullResponse()
+    for name, model, order_column, schema in PULL_ENTITIES:
+        rows = []
+        for row in _pull_query(db, model, order_column, state, name).limit(limit + 1).yield_per(limit + 1):
+            rows.append(schema.model_validate(row))
+        if len(rows) > limit:
+            rows = rows[:limit]
+            response.has_more = True
+        if rows:
+            last = rows[-1]
+            state[name] = [getattr(last, order_column.key), last.id]
+        setattr(response, name, rows)
 
-    if since:
-        response.products = db.query(Product).filter(
-            and_(Product.last_updated >= since, Product.is_deleted == False)
-        ).all()
-        response.operations = db.query(Operation).filter(Operation.last_updated >= since).all()
-        response.stock_moves = db.query(StockMove).filter(StockMove.created_at >= since).all()
-    else:
-        response.products = db.query(Product).filter(Product.is_deleted == False).all()
-        response.operations = db.query(Operation).all()
-        response.stock_moves = db.query(StockMove).all()
+    response.next_cursor = encode_cursor(state)
+    return response
+
+
+def _sync_pull_changes(db: Session, since_seq: int, cursor: Optional[str], limit: int) -> SyncPullResponse:
+    """
+    Positions below the compaction horizon are refused: tombstones after them
+    are gone. A resync from 0 pages through them with a cursor instead, which
+    records the horizon it started under and is refused once compaction moves it.
+    """
+    sequence_changes(db)
+    db.commit()
+    _begin_snapshot(db)
+    horizon = pruned_seq(db)
+    position = since_seq
+    if cursor is not None and since_seq == 0:
+        resync = decode_cursor(cursor)
+        if resync.get("pruned_seq") != horizon:
+            raise HTTPException(
+                status_code=status.HTTP_410_GONE,
+                detail="The change log was compacted during the resync, resync from 0",
+            )
+        position = resync.get("seq")
+        if not isinstance(position, int):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    elif 0 < since_seq < horizon:
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE,
+            detail="since_seq is older than the change log retention, resync from 0",
+        )
+
+    changes = changes_since(db, position, limit + 1)
+    response = SyncPullResponse(has_more=len(changes) > limit, next_seq=since_seq)
+    changes = changes[:limit]
+    if changes and response.has_more and changes[-1].seq < horizon:
+        response.next_cursor = encode_cursor({"seq": changes[-1].seq, "pruned_seq": horizon})
+    elif changes:
+        # Nothing is sequenced below the horizon any more, so a resync that ran out of changes can resume from it.
+        response.next_seq = max(changes[-1].seq, horizon)
 
+    changed_ids = {}
+    for change in changes:
+        if change.deleted:
+            response.deleted.append(SyncTombstone(entity=change.entity, id=change.entity_id))
+        else:
+            changed_ids.setdefault(change.entity, []).append(change.entity_id)
+
+    for name, model, _, schema in PULL_ENTITIES:
+        if name not in changed_ids:
+            continue
+        rows = []
+        for row in db.query(model).filter(model.id.in_(changed_ids[name])):
+            if model is Product and row.is_deleted:
+                response.deleted.append(SyncTombstone(entity=name, id=row.id))
+            else:
+                rows.append(schema.model_validate(row))
+        setattr(response, name, rows)
     return response
+
+
+@router.get("/pull/stream")
+def sync_pull_stream(since: Optional[datetime] = None, cursor: Optional[str] = None):
+    """
+    Stream every updated row as NDJSON from a single REPEATABLE READ snapshot.
+    Each line is {"entity": ..., "data": {...}}; the final line carries the
+    cursor to use for the next incremental pull.
+    """
+    state = _pull_state(since, cursor)
+
+    def generate():
+        db = SessionLocal()
+        try:
+            _begin_snapshot(db)
+            for name, model, order_column, schema in PULL_ENTITIES:
+                last = None
+                query = _pull_query(db, model, order_column, state, name)
+                for row in query.yield_per(settings.sync_batch_size):
+                    last = schema.model_validate(row)
+                    yield f'{{"entity":"{name}","data":{last.model_dump_json()}}}\n'
+                if last is not None:
+                    state[name] = [getattr(last, order_column.key), last.id]
+            yield json.dumps({"entity": "cursor", "next_cursor": encode_cursor(state)}) + "\n"
+        finally:
+            db.close()
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
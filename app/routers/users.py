@@ -1,17 +1,28 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.orm import Session
 from uuid import UUID
-from app.database import get_db
-from app.models.user import User
+from typing import Optional
+from app.database import DbSession, get_session, run_db
+from app.models.user import User, UserRole
 from app.schemas.user import UserCreate, UserResponse, UserUpdate
 from app.utils.auth import hash_password
+from app.utils.pagination import PageParams, paginate
 
 router = APIRouter(prefix="/users", tags=["users"])
 
+USER_SORTS = {
+    "email": (User.email,),
+    "created_at": (User.created_at, User.id),
+}
+
 
 @router.post("/", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-def create_user(user: UserCreate, db: Session = Depends(get_db)):
+async def create_user(user: UserCreate, db: DbSession = Depends(get_session)):
     """Create a new user."""
+    return await run_db(db, _create_user, user)
+
+
+def _create_user(db: Session, user: UserCreate) -> User:
     existing_user = db.query(User).filter(User.email == user.email).first()
     if existing_user:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email already registered")
@@ -28,8 +39,12 @@ def create_user(user: UserCreate, db: Session = Depends(get_db)):
 
 
 @router.get("/{user_id}", response_model=UserResponse)
-def get_user(user_id: UUID, db: Session = Depends(get_db)):
+async def get_user(user_id: UUID, db: DbSession = Depends(get_session)):
     """Get a user by ID."""
+    return await run_db(db, _get_user, user_id)
+
+
+def _get_user(db: Session, user_id: UUID) -> User:
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
@@ -37,14 +52,32 @@ def get_user(user_id: UUID, db: Session = Depends(get_db)):
 
 
 @router.get("/", response_model=list[UserResponse])
-def list_users(db: Session = Depends(get_db)):
-    """List all users."""
-    return db.query(User).all()
+async def list_users(
+    response: Response,
+    role: Optional[UserRole] = None,
+    sort: str = "email",
+    page: PageParams = Depends(),
+    db: DbSession = Depends(get_session),
+):
+    """List users, one keyset page at a time (next page cursor in X-Next-Cursor)."""
+    filters = []
+    if role is not None:
+        filters.append(User.role == role)
+    return await run_db(db, _list_users, filters, sort, page, response)
+
+
+def _list_users(db: Session, filters: list, sort: str, page: PageParams, response: Response) -> list:
+    query = db.query(User).filter(*filters)
+    return paginate(db, query, USER_SORTS, sort, page, response)
 
 
 @router.put("/{user_id}", response_model=UserResponse)
-def update_user(user_id: UUID, user_update: UserUpdate, db: Session = Depends(get_db)):
+async def update_user(user_id: UUID, user_update: UserUpdate, db: DbSession = Depends(get_session)):
     """Update a user."""
+    return await run_db(db, _update_user, user_id, user_update)
+
+
+def _update_user(db: Session, user_id: UUID, user_update: UserUpdate) -> User:
     db_user = db.query(User).filter(User.id == user_id).first()
     if not db_user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
@@ -59,8 +92,12 @@ def update_user(user_id: UUID, user_update: UserUpdate, db: Session = Depends(ge
 
 
 @router.delete("/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_user(user_id: UUID, db: Session = Depends(get_db)):
+async def delete_user(user_id: UUID, db: DbSession = Depends(get_session)):
     """Delete a user."""
+    await run_db(db, _delete_user, user_id)
+
+
+def _delete_user(db: Session, user_id: UUID) -> None:
     db_user = db.query(User).filter(User.id == user_id).first()
     if not db_user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
@@ -0,0 +1,29 @@
+from pydantic import BaseModel
+from uuid import UUID
+from typing import Optional
+
+
+class ImportRowError(BaseModel):
+    """A rejected row: its number in the file (data rows for CSV, lines for NDJSON) and why."""
+    row: int
+    error: str
+
+
+class ProductImportResult(BaseModel):
+    rows: int
+    inserted: int
+    updated: int
+    unchanged: int
+    duplicates: int
+    rejected: int
+    errors: list[ImportRowError] = []
+
+
+class StockMoveImportResult(BaseModel):
+    rows: int
+    inserted: int
+    skipped: int
+    duplicates: int
+    rejected: int
+    operation_id: Optional[UUID] = None
+    errors: list[ImportRowError] = []
@@ -26,3 +26,32 @@ class LoginResponse(BaseModel):
     user_id: str
     email: str
     role: str
+    access_token: str
+    refresh_token: str
+    token_type: str = "bearer"
+    expires_in: int  # seconds, of the access token
+
+
+class TokenRefresh(BaseModel):
+    """Exchange a refresh token for a new token pair."""
+    refresh_token: str
+
+
+class TokenResponse(BaseModel):
+    """New access and refresh tokens."""
+    access_token: str
+    refresh_token: str
+    token_type: str = "bearer"
+    expires_in: int  # seconds, of the access token
+
+
+class LogoutRequest(BaseModel):
+    """Refresh token to revoke along with the current access token."""
+    refresh_token: str | None = None
+
+
+class CurrentUser(BaseModel):
+    """The user of the presented access token."""
+    user_id: str
+    email: str
+    role: str
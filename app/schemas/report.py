@@ -0,0 +1,29 @@
+from pydantic import BaseModel, ConfigDict
+from uuid import UUID
+from datetime import date
+from typing import Optional
+from app.models.operation import OperationType
+
+
+class ProductMovementResponse(BaseModel):
+    """Stock moves of one product and operation type on one UTC day (quantities split by sign)."""
+    day: date
+    product_id: UUID
+    operation_type: OperationType
+    quantity_in: int
+    quantity_out: int
+    moves: int
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class CategoryMovementResponse(BaseModel):
+    """Stock moves of one product category and operation type on one UTC day."""
+    day: date
+    category: Optional[str] = None
+    operation_type: OperationType
+    quantity_in: int
+    quantity_out: int
+    moves: int
+
+    model_config = ConfigDict(from_attributes=True)
@@ -0,0 +1,11 @@
+from pydantic import BaseModel
+from uuid import UUID
+from datetime import datetime
+
+
+class StockAsOfResponse(BaseModel):
+    """Ledger balance of a product at a point in time."""
+    product_id: UUID
+    as_of: datetime
+    quantity: int = 0
+    locations: dict[str, int] = {}
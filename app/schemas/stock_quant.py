@@ -0,0 +1,12 @@
+from pydantic import BaseModel, ConfigDict
+from uuid import UUID
+from datetime import datetime
+
+
+class StockQuantResponse(BaseModel):
+    product_id: UUID
+    location: str
+    quantity: int
+    last_updated: datetime
+
+    model_config = ConfigDict(from_attributes=True)
@@ -1,5 +1,17 @@
 import hashlib
+import heapq
+import threading
+import time
 import uuid
+from dataclasses import dataclass
+from uuid import UUID
+from fastapi import Depends, HTTPException, status
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from jose import JWTError, jwt
+from sqlalchemy.orm import Session
+from app.config import get_settings
+from app.models.user import User, UserRole
+from app.utils import cache_bus
 
 
 def hash_password(password: str) -> str:
@@ -10,3 +22,184 @@ def hash_password(password: str) -> str:
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash."""
     return hash_password(plain_password) == hashed_password
+
+
+ACCESS = "access"
+REFRESH = "refresh"
+
+# Unset, or the placeholder older configs copied from the docs: anyone could sign admin tokens.
+_INSECURE_SECRETS = {"", "your_jwt_secret_key_here"}
+
+
+def signing_key() -> str:
+    """JWT_SECRET_KEY; raises RuntimeError while it is unset or the public placeholder."""
+    key = get_settings().jwt_secret_key
+    if key in _INSECURE_SECRETS:
+        raise RuntimeError("JWT_SECRET_KEY must be set to a private random value")
+    return key
+
+
+@dataclass(frozen=True)
+class TokenUser:
+    """The authenticated user, taken from the access token's claims."""
+    id: UUID
+    email: str
+    role: UserRole
+    token_id: str
+    expires_at: int
+
+
+def _encode(user: User, token_type: str, lifetime_seconds: int) -> str:
+    settings = get_settings()
+    now = int(time.time())
+    claims = {
+        "sub": str(user.id),
+        "email": user.email,
+        "role": user.role.value,
+        "type": token_type,
+        "jti": uuid.uuid4().hex,
+        "iat": now,
+        "exp": now + lifetime_seconds,
+    }
+    return jwt.encode(claims, signing_key(), algorithm=settings.jwt_algorithm)
+
+
+def create_tokens(user: User) -> dict:
+    """
+    Issue a short-lived access token and a longer-lived refresh token.
+
+    Args:
+        user: The authenticated user
+
+    Returns:
+        access_token, refresh_token, token_type and expires_in (seconds, of the access token)
+    """
+    settings = get_settings()
+    access_seconds = settings.access_token_expire_minutes * 60
+    return {
+        "access_token": _encode(user, ACCESS, access_seconds),
+        "refresh_token": _encode(user, REFRESH, settings.refresh_token_expire_days * 86400),
+        "token_type": "bearer",
+        "expires_in": access_seconds,
+    }
+
+
+def decode_token(token: str, token_type: str = ACCESS) -> dict:
+    """
+    Verify a token's signature, expiry, type and revocation, without touching the database.
+
+    Args:
+        token: The encoded token
+        token_type: "access" or "refresh"
+
+    Returns:
+        The token's claims; raises 401 if the token is not valid
+    """
+    settings = get_settings()
+    try:
+        claims = jwt.decode(token, signing_key(), algorithms=[settings.jwt_algorithm])
+    except JWTError:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired token.",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    if claims.get("type") != token_type or token_denylist.contains(claims.get("jti")):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired token.",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return claims
+
+
+class TokenDenylist:
+    """
+    Ids of revoked tokens that have not expired yet.
+
+    Entries only need to live until the token's own expiry, so the list stays
+    small; expired ids are swept from a min-heap whenever one is added.
+    """
+
+    def __init__(self):
+        self._entries = {}  # token id -> expires_at (unix time)
+        self._expiry_heap = []
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, token_id: str, expires_at: float) -> None:
+        now = time.time()
+        with self._lock:
+            while self._expiry_heap and self._expiry_heap[0][0] <= now:
+                _, expired_id = heapq.heappop(self._expiry_heap)
+                self._entries.pop(expired_id, None)
+            if expires_at > now and token_id not in self._entries:
+                self._entries[token_id] = expires_at
+                heapq.heappush(self._expiry_heap, (expires_at, token_id))
+
+    def contains(self, token_id: str | None) -> bool:
+        return token_id in self._entries
+
+
+token_denylist = TokenDenylist()
+
+
+def revoke_tokens(db: Session, claims_list: list[dict]) -> None:
+    """
+    Revoke tokens in this worker now, and in every other worker through the cache bus.
+
+    Args:
+        db: Database session; its transaction is committed to publish the revocation
+        claims_list: Claims of the tokens to revoke
+    """
+    revoked = {claims["jti"]: claims["exp"] for claims in claims_list}
+    for token_id, expires_at in revoked.items():
+        token_denylist.add(token_id, expires_at)
+    if not db.in_transaction():
+        db.begin()
+    cache_bus.queue_invalidation(db, revoked_tokens=revoked)
+    db.commit()
+
+
+def _on_invalidation(message: dict) -> None:
+    for token_id, expires_at in (message.get("revoked_tokens") or {}).items():
+        token_denylist.add(token_id, expires_at)
+
+
+cache_bus.subscribe(_on_invalidation)
+
+_bearer = HTTPBearer(auto_error=False)
+
+
+async def get_current_user(credentials: HTTPAuthorizationCredentials | None = Depends(_bearer)) -> TokenUser:
+    """Dependency: the user of the bearer access token, validated without a database lookup."""
+    if credentials is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated.",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    claims = decode_token(credentials.credentials, ACCESS)
+    return TokenUser(
+        id=UUID(claims["sub"]),
+        email=claims["email"],
+        role=UserRole(claims["role"]),
+        token_id=claims["jti"],
+        expires_at=claims["exp"],
+    )
+
+
+def require_role(*roles: UserRole):
+    """Dependency factory: the current user, if their token carries one of the given roles."""
+
+    async def dependency(user: TokenUser = Depends(get_current_user)) -> TokenUser:
+        if user.role not in roles:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Insufficient role."
+            )
+        return user
+
+    return dependency
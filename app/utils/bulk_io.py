@@ -0,0 +1,495 @@
+import csv
+import enum
+import queue
+import tempfile
+import threading
+from datetime import datetime, timezone
+from fastapi import HTTPException, Request, status
+from sqlalchemy import DateTime, Integer, String, column, exc, table, text
+from sqlalchemy.dialects.postgresql import UUID as PGUUID
+from sqlalchemy.orm import Session
+from app.config import get_settings
+from app.models.operation import Operation, OperationStatus, OperationType
+from app.utils.catalog import mark_catalog_changed
+from app.utils.compression import BodyDecoder
+from app.utils.product_cache import invalidate_products
+from app.utils.stock_checkpoints import adjust_checkpoints_from
+from app.utils.stock_update import apply_stock_moves
+
+
+class BulkFormat(str, enum.Enum):
+    csv = "csv"  # with a header row
+    ndjson = "ndjson"  # one JSON object per line
+
+
+MEDIA_TYPES = {BulkFormat.csv: "text/csv", BulkFormat.ndjson: "application/x-ndjson"}
+_CONTENT_TYPES = {
+    "text/csv": BulkFormat.csv,
+    "application/csv": BulkFormat.csv,
+    "application/x-ndjson": BulkFormat.ndjson,
+    "application/jsonl": BulkFormat.ndjson,
+}
+
+# Bytes handed to or taken from COPY at a time.
+COPY_CHUNK = 64 * 1024
+# Uploads are kept in memory up to this size, then spooled to disk.
+SPOOL_MAX_SIZE = 16 * 1024 * 1024
+# Rejected rows listed in an import result; the rest are only counted.
+MAX_REPORTED_ERRORS = 20
+
+# COPY options that read or write one JSON document per line: the quote and
+# delimiter are control characters JSON never contains unescaped, so each
+# line is a single field.
+JSON_LINES = "FORMAT csv, QUOTE E'\\x01', DELIMITER E'\\x02'"
+
+PRODUCT_COLUMNS = ("sku", "name", "category", "min_stock_level")
+# Columns of the product export that an import accepts and ignores, so exports load back as they are.
+PRODUCT_IGNORED_COLUMNS = ("id", "current_stock", "last_updated")
+STOCK_MOVE_COLUMNS = (
+    "id", "sku", "product_id", "operation_id", "quantity", "location_source", "location_dest", "created_at",
+)
+# Moves written by a stock move import, in a temporary table dropped at commit.
+IMPORTED_MOVES = table(
+    "stock_move_imported",
+    column("product_id", PGUUID(as_uuid=True)),
+    column("quantity", Integer),
+    column("location_source", String),
+    column("location_dest", String),
+    column("created_at", DateTime(timezone=True)),
+)
+
+_UUID = "'^[0-9a-f]{8}-?[0-9a-f]{4}-?[0-9a-f]{4}-?[0-9a-f]{4}-?[0-9a-f]{12}$'"
+_INTEGER = "'^[+-]?[0-9]{1,9}$'"
+# Catches malformed values row by row; an impossible date such as Feb 30 still fails the whole import.
+_TIMESTAMP = (
+    r"'^\d{4}-(0[1-9]|1[0-2])-(0[1-9]|[12]\d|3[01])"
+    r"([ T]([01]\d|2[0-3]):[0-5]\d(:[0-5]\d(\.\d+)?)?)?\s*(Z|[+-]\d{2}(:?\d{2})?)?$'"
+)
+
+PRODUCT_EXPORT = """
+    SELECT id, sku, name, category, min_stock_level, current_stock, last_updated
+    FROM products WHERE is_deleted = false ORDER BY sku
+"""
+STOCK_MOVE_EXPORT = """
+    SELECT m.id, p.sku, m.product_id, m.operation_id, m.quantity, m.location_source, m.location_dest, m.created_at
+    FROM stock_moves m JOIN products p ON p.id = m.product_id
+    WHERE {where} ORDER BY m.created_at, m.id
+"""
+
+
+def _invalid(detail: str) -> HTTPException:
+    return HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=detail)
+
+
+def _driver_errors(db: Session) -> tuple:
+    dbapi = db.get_bind().dialect.loaded_dbapi
+    return exc.DataError, dbapi.DataError
+
+
+def copy_in(db: Session, sql: str, file) -> None:
+    """Run COPY ... FROM STDIN on the session's connection, reading a binary file in chunks."""
+    cursor = db.connection().connection.cursor()
+    try:
+        if hasattr(cursor, "copy"):  # psycopg 3
+            with cursor.copy(sql) as copy:
+                while chunk := file.read(COPY_CHUNK):
+                    copy.write(chunk)
+        else:  # psycopg2
+            cursor.copy_expert(sql, file, size=COPY_CHUNK)
+    finally:
+        cursor.close()
+
+
+class _QueueWriter:
+    """File object for psycopg2's copy_expert that hands COPY output to another thread."""
+
+    def __init__(self, chunks: queue.Queue, cancelled: threading.Event):
+        self.chunks = chunks
+        self.cancelled = cancelled
+        self.buffer = bytearray()
+
+    def put(self, item) -> None:
+        while True:
+            if self.cancelled.is_set():
+                raise RuntimeError("COPY output abandoned by the reader")
+            try:
+                self.chunks.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def write(self, data: bytes) -> None:
+        self.buffer += data
+        if len(self.buffer) >= COPY_CHUNK:
+            self.flush()
+
+    def flush(self) -> None:
+        if self.buffer:
+            self.put(bytes(self.buffer))
+            self.buffer.clear()
+
+
+def copy_out(db: Session, sql: str):
+    """
+    Run COPY ... TO STDOUT on the session's connection and yield the output in chunks.
+
+    psycopg2 only writes COPY output to a file object, so there the COPY runs
+    in a helper thread feeding a bounded queue; an abandoned generator stops it.
+    """
+    cursor = db.connection().connection.cursor()
+    if hasattr(cursor, "copy"):  # psycopg 3
+        try:
+            with cursor.copy(sql) as copy:
+                for data in copy:
+                    yield bytes(data)
+        finally:
+            cursor.close()
+        return
+
+    chunks = queue.Queue(maxsize=16)
+    cancelled = threading.Event()
+    done = object()
+
+    def run():
+        writer = _QueueWriter(chunks, cancelled)
+        try:
+            cursor.copy_expert(sql, writer, size=COPY_CHUNK)
+            writer.flush()
+            writer.put(done)
+        except BaseException as error:
+            if not cancelled.is_set():
+                writer.put(error)
+
+    thread = threading.Thread(target=run, name="copy-out", daemon=True)
+    thread.start()
+    try:
+        while (item := chunks.get()) is not done:
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        cancelled.set()
+        thread.join()
+        cursor.close()
+
+
+def detect_format(filename: str) -> BulkFormat:
+    """ndjson for .ndjson / .jsonl files (optionally .gz), csv otherwise."""
+    name = filename.lower().removesuffix(".gz")
+    return BulkFormat.ndjson if name.endswith((".ndjson", ".jsonl")) else BulkFormat.csv
+
+
+def request_format(request: Request) -> BulkFormat:
+    """The import format named by the request's Content-Type (text/csv or application/x-ndjson)."""
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type not in _CONTENT_TYPES:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Send text/csv or application/x-ndjson",
+        )
+    return _CONTENT_TYPES[content_type]
+
+
+async def spool_request_body(request: Request):
+    """
+    Copy a streamed request body, decoded per Content-Encoding, into a temporary
+    file: kept in memory up to SPOOL_MAX_SIZE, on disk beyond. The caller closes it.
+    Bodies larger than BULK_IMPORT_MAX_BODY_BYTES once decoded are refused with 413.
+    """
+    spooled = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    try:
+        decoder = BodyDecoder(
+            request.headers.get("content-encoding"), get_settings().bulk_import_max_body_bytes, spooled.write
+        )
+        async for chunk in request.stream():
+            decoder.write(chunk)
+        decoder.close()
+    except BaseException:
+        spooled.close()
+        raise
+    spooled.seek(0)
+    return spooled
+
+
+def _csv_header(file, columns: tuple, ignored: tuple) -> list[str]:
+    first = file.readline()
+    file.seek(0)
+    names = [name.strip().lower() for name in next(csv.reader([first.decode("utf-8-sig", "replace")]), [])]
+    unknown = [name for name in names if name not in columns + ignored]
+    if not names or unknown or len(set(names)) != len(names):
+        raise _invalid(
+            f"CSV header must name distinct columns out of {', '.join(columns)}"
+            + (f"; unknown: {', '.join(unknown)}" if unknown else "")
+        )
+    return names
+
+
+def _load(db: Session, file, file_format: BulkFormat, table: str, columns: tuple, ignored: tuple = ()) -> int:
+    """COPY the file into a staging table with one text column per field; returns rows loaded."""
+    if file_format == BulkFormat.csv:
+        header = _csv_header(file, columns, ignored)
+        copy_in(db, f"COPY {table} ({', '.join(header)}) FROM STDIN WITH (FORMAT csv, HEADER true)", file)
+    else:
+        db.execute(text(
+            "CREATE TEMP TABLE import_lines (line bigint GENERATED ALWAYS AS IDENTITY, doc text) ON COMMIT DROP"
+        ))
+        copy_in(db, f"COPY import_lines (doc) FROM STDIN WITH ({JSON_LINES})", file)
+        fields = ", ".join(f"doc ->> '{column}'" for column in columns)
+        db.execute(text(f"""
+            INSERT INTO {table} (line, {', '.join(columns)})
+            SELECT line, {fields}
+            FROM (SELECT line, doc::jsonb AS doc FROM import_lines WHERE btrim(coalesce(doc, '')) <> '') lines
+        """))
+    db.execute(text(f"UPDATE {table} SET " + ", ".join(f"{column} = nullif(btrim({column}), '')" for column in columns)))
+    db.execute(text(f"ANALYZE {table}"))
+    return db.execute(text(f"SELECT count(*) FROM {table}")).scalar()
+
+
+def _reject(db: Session, table: str, checks: str) -> tuple[int, list[dict]]:
+    """Set `error` from the CASE branches in `checks`; returns the rejected count and the first errors."""
+    db.execute(text(f"UPDATE {table} SET error = CASE {checks} END"))
+    rejected = db.execute(text(f"SELECT count(*) FROM {table} WHERE error IS NOT NULL")).scalar()
+    errors = db.execute(text(
+        f"SELECT line AS row, error FROM {table} WHERE error IS NOT NULL ORDER BY line LIMIT {MAX_REPORTED_ERRORS}"
+    )).mappings().all()
+    db.execute(text(f"DELETE FROM {table} WHERE error IS NOT NULL"))
+    return rejected, [dict(error) for error in errors]
+
+
+def _run_import(db: Session, load):
+    data_errors = _driver_errors(db)
+    try:
+        return load()
+    except data_errors as error:
+        message = str(getattr(error, "orig", None) or error).strip()
+        raise _invalid(f"Malformed import file: {message.splitlines()[0] if message else 'invalid data'}")
+
+
+def import_products(db: Session, file, file_format: BulkFormat = BulkFormat.csv) -> dict:
+    """
+    Upsert products by SKU from a CSV or NDJSON file, through COPY into a staging table.
+
+    Rows are validated and deduplicated in SQL (the last row of a SKU wins).
+    Existing SKUs get the new name and, when given, category and
+    min_stock_level, and are undeleted; unchanged rows are not rewritten.
+    Stock levels are never imported: they follow from stock moves (the
+    export's id, current_stock and last_updated columns are ignored). The file
+    is streamed, so its size is bounded by disk, not memory. Runs in the
+    caller's transaction (one import per transaction); the caller commits.
+
+    Args:
+        db: Database session
+        file: Binary file object positioned at the start
+        file_format: "csv" (with a header row) or "ndjson"
+
+    Returns:
+        Counts of rows, inserted, updated, unchanged, duplicates and rejected, plus the first errors
+    """
+    def load():
+        db.execute(text("""
+            CREATE TEMP TABLE product_import (
+                line bigint GENERATED BY DEFAULT AS IDENTITY,
+                sku text, name text, category text, min_stock_level text, error text,
+                id text, current_stock text, last_updated text
+            ) ON COMMIT DROP
+        """))
+        rows = _load(db, file, file_format, "product_import", PRODUCT_COLUMNS, PRODUCT_IGNORED_COLUMNS)
+        rejected, errors = _reject(db, "product_import", f"""
+            WHEN sku IS NULL THEN 'sku is required'
+            WHEN length(sku) > 100 THEN 'sku is longer than 100 characters'
+            WHEN name IS NULL THEN 'name is required'
+            WHEN length(name) > 255 THEN 'name is longer than 255 characters'
+            WHEN length(category) > 100 THEN 'category is longer than 100 characters'
+            WHEN min_stock_level !~ {_INTEGER} THEN 'min_stock_level must be an integer'
+        """)
+        duplicates = db.execute(text("""
+            DELETE FROM product_import a USING product_import b WHERE a.sku = b.sku AND a.line < b.line
+        """)).rowcount
+        updated = db.execute(text("""
+            UPDATE products p SET
+                name = i.name,
+                category = coalesce(i.category, p.category),
+                min_stock_level = coalesce(i.min_stock_level::int, p.min_stock_level),
+                is_deleted = false,
+                last_updated = now()
+            FROM product_import i
+            WHERE p.sku = i.sku
+              AND (p.name, p.category, p.min_stock_level, p.is_deleted)
+                  IS DISTINCT FROM (i.name, coalesce(i.category, p.category),
+                                    coalesce(i.min_stock_level::int, p.min_stock_level), false)
+        """)).rowcount
+        inserted = db.execute(text("""
+            INSERT INTO products (id, sku, name, category, min_stock_level, current_stock, is_deleted, last_updated)
+            SELECT gen_random_uuid(), i.sku, i.name, i.category, coalesce(i.min_stock_level::int, 0), 0, false, now()
+            FROM product_import i
+            WHERE NOT EXISTS (SELECT 1 FROM products p WHERE p.sku = i.sku)
+            ORDER BY i.line
+            ON CONFLICT (sku) DO NOTHING
+        """)).rowcount
+        if inserted or updated:
+            mark_catalog_changed(db)
+            invalidate_products(db, None)
+        return {
+            "rows": rows,
+            "inserted": inserted,
+            "updated": updated,
+            "unchanged": rows - rejected - duplicates - inserted - updated,
+            "duplicates": duplicates,
+            "rejected": rejected,
+            "errors": errors,
+        }
+
+    return _run_import(db, load)
+
+
+def import_stock_moves(db: Session, file, file_format: BulkFormat = BulkFormat.csv) -> dict:
+    """
+    Append stock moves from a CSV or NDJSON file, through COPY into a staging table.
+
+    Products are resolved by sku (or product_id when sku is empty). Rows
+    without operation_id are attached to one adjustment operation created for
+    the import. Rows whose id already exists are skipped, so re-importing a
+    file is harmless. current_stock and stock_quants are adjusted once per
+    product and location through apply_stock_moves, and threshold crossings
+    queue stock alerts. Runs in the caller's transaction; the caller commits.
+
+    Args:
+        db: Database session
+        file: Binary file object positioned at the start
+        file_format: "csv" (with a header row) or "ndjson"
+
+    Returns:
+        Counts of rows, inserted, skipped, duplicates and rejected, the import operation id and the first errors
+    """
+    def load():
+        db.execute(text("""
+            CREATE TEMP TABLE stock_move_import (
+                line bigint GENERATED BY DEFAULT AS IDENTITY,
+                id text, sku text, product_id text, operation_id text, quantity text,
+                location_source text, location_dest text, created_at text,
+                product uuid, operation uuid, error text
+            ) ON COMMIT DROP
+        """))
+        rows = _load(db, file, file_format, "stock_move_import", STOCK_MOVE_COLUMNS)
+        db.execute(text("""
+            UPDATE stock_move_import i SET product = p.id
+            FROM products p
+            WHERE i.sku IS NOT NULL AND p.sku = i.sku AND p.is_deleted = false
+        """))
+        db.execute(text(f"""
+            UPDATE stock_move_import i SET product = p.id
+            FROM products p
+            WHERE i.sku IS NULL AND p.is_deleted = false
+              AND p.id = CASE WHEN lower(i.product_id) ~ {_UUID} THEN i.product_id::uuid END
+        """))
+        db.execute(text(f"""
+            UPDATE stock_move_import i SET operation = o.id
+            FROM operations o
+            WHERE o.id = CASE WHEN lower(i.operation_id) ~ {_UUID} THEN i.operation_id::uuid END
+        """))
+        rejected, errors = _reject(db, "stock_move_import", f"""
+            WHEN lower(id) !~ {_UUID} THEN 'id is not a UUID'
+            WHEN sku IS NULL AND product_id IS NULL THEN 'sku or product_id is required'
+            WHEN product IS NULL THEN 'unknown product'
+            WHEN operation_id IS NOT NULL AND operation IS NULL THEN 'unknown operation'
+            WHEN quantity IS NULL THEN 'quantity is required'
+            WHEN quantity !~ {_INTEGER} THEN 'quantity must be an integer'
+            WHEN length(location_source) > 100 THEN 'location_source is longer than 100 characters'
+            WHEN length(location_dest) > 100 THEN 'location_dest is longer than 100 characters'
+            WHEN created_at !~ {_TIMESTAMP} THEN 'created_at must be an ISO 8601 timestamp'
+        """)
+        duplicates = db.execute(text("""
+            DELETE FROM stock_move_import a USING stock_move_import b
+            WHERE a.id IS NOT NULL AND lower(a.id) = lower(b.id) AND a.line < b.line
+        """)).rowcount
+        # Products are locked before the moves are written, in the same order as the other stock write paths.
+        db.execute(text("""
+            SELECT id FROM products WHERE id IN (SELECT product FROM stock_move_import) ORDER BY id FOR UPDATE
+        """))
+        # Rows imported before are dropped up front, so a repeated file creates no empty operation.
+        # Claiming the ids is atomic, unlike looking them up in the partitioned stock_moves.
+        db.execute(text("""
+            WITH claimed AS (
+                INSERT INTO stock_move_ids (id)
+                SELECT id::uuid FROM stock_move_import WHERE id IS NOT NULL ORDER BY 1
+                ON CONFLICT DO NOTHING
+                RETURNING id
+            )
+            DELETE FROM stock_move_import i
+            WHERE i.id IS NOT NULL AND NOT EXISTS (SELECT 1 FROM claimed c WHERE c.id = i.id::uuid)
+        """))
+
+        operation_id = None
+        if db.execute(text("SELECT EXISTS (SELECT 1 FROM stock_move_import WHERE operation IS NULL)")).scalar():
+            operation = Operation(
+                type=OperationType.adjustment,
+                status=OperationStatus.done,
+                reference_code=f"IMPORT/{datetime.now(timezone.utc):%Y%m%d-%H%M%S}",
+            )
+            db.add(operation)
+            db.flush()
+            operation_id = operation.id
+            db.execute(
+                text("UPDATE stock_move_import SET operation = :operation WHERE operation IS NULL"),
+                {"operation": operation_id},
+            )
+
+        db.execute(text("""
+            CREATE TEMP TABLE stock_move_imported (
+                product_id uuid, quantity int, location_source text, location_dest text, created_at timestamptz
+            ) ON COMMIT DROP
+        """))
+        inserted = db.execute(text("""
+            WITH inserted AS (
+                INSERT INTO stock_moves (id, operation_id, product_id, quantity, location_source, location_dest, created_at)
+                SELECT coalesce(id::uuid, gen_random_uuid()), operation, product, quantity::int,
+                       coalesce(location_source, 'partner'), coalesce(location_dest, 'warehouse'),
+                       coalesce(created_at::timestamptz, now())
+                FROM stock_move_import
+                ORDER BY line
+                ON CONFLICT DO NOTHING
+                RETURNING product_id, quantity, location_source, location_dest, created_at
+            )
+            INSERT INTO stock_move_imported SELECT * FROM inserted
+        """)).rowcount
+
+        if inserted:
+            totals = db.execute(text("""
+                SELECT product_id, location_source, location_dest, sum(quantity) AS quantity
+                FROM stock_move_imported
+                GROUP BY product_id, location_source, location_dest
+            """)).all()
+            apply_stock_moves(db, added=totals)
+            adjust_checkpoints_from(db, IMPORTED_MOVES)
+        return {
+            "rows": rows,
+            "inserted": inserted,
+            "skipped": rows - rejected - duplicates - inserted,
+            "duplicates": duplicates,
+            "rejected": rejected,
+            "operation_id": operation_id,
+            "errors": errors,
+        }
+
+    return _run_import(db, load)
+
+
+def export_sql(entity: str, file_format: BulkFormat, since: datetime | None = None, until: datetime | None = None) -> str:
+    """
+    The COPY ... TO STDOUT statement exporting active products or stock moves.
+
+    Stock moves can be limited to created_at in [since, until). The columns
+    match those accepted by the imports.
+    """
+    if entity == "products":
+        query = PRODUCT_EXPORT
+    else:
+        conditions = ["true"]
+        if since is not None:
+            conditions.append(f"m.created_at >= '{since.isoformat()}'::timestamptz")
+        if until is not None:
+            conditions.append(f"m.created_at < '{until.isoformat()}'::timestamptz")
+        query = STOCK_MOVE_EXPORT.format(where=" AND ".join(conditions))
+    if file_format == BulkFormat.ndjson:
+        return f"COPY (SELECT row_to_json(t) FROM ({query}) t) TO STDOUT WITH ({JSON_LINES})"
+    return f"COPY ({query}) TO STDOUT WITH (FORMAT csv, HEADER true)"
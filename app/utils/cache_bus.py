@@ -0,0 +1,163 @@
+import json
+import logging
+import select
+import threading
+import uuid
+from sqlalchemy import event, func
+from sqlalchemy import select as sql_select
+from sqlalchemy.orm import Session
+from app.config import get_settings
+from app.database import get_engine
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "stockmaster_cache"
+# NOTIFY payloads must stay under 8000 bytes; larger invalidations flush everything.
+MAX_PAYLOAD = 7900
+
+# Identifies this process, so it can ignore its own notifications.
+_sender = uuid.uuid4().hex
+_handlers = []
+
+
+def subscribe(handler) -> None:
+    """Register a handler called with every invalidation message, local or remote."""
+    _handlers.append(handler)
+
+
+def dispatch(message: dict) -> None:
+    for handler in _handlers:
+        handler(message)
+
+
+def queue_invalidation(db: Session, product_ids=(), catalog: bool = False, revoked_tokens=None) -> None:
+    """
+    Queue an invalidation that is published when the session's transaction commits.
+
+    Messages carry `product_ids` (a list, or None meaning "all products"), a
+    `catalog` flag and `revoked_tokens` (token id -> expiry timestamp). They
+    are dropped on rollback.
+    """
+    pending = db.info.setdefault("cache_invalidation", {"product_ids": set(), "catalog": False, "revoked_tokens": {}})
+    if product_ids is None or pending["product_ids"] is None:
+        pending["product_ids"] = None
+    else:
+        pending["product_ids"].update(product_ids)
+    pending["catalog"] = pending["catalog"] or catalog
+    pending["revoked_tokens"].update(revoked_tokens or {})
+
+
+def _message(pending: dict) -> dict:
+    product_ids = pending["product_ids"]
+    return {
+        "product_ids": None if product_ids is None else [str(product_id) for product_id in product_ids],
+        "catalog": pending["catalog"],
+        "revoked_tokens": pending["revoked_tokens"],
+    }
+
+
+class LocalBus:
+    """Invalidations stay inside this process."""
+
+    def publish(self, db: Session, message: dict) -> None:
+        pass
+
+    def start(self) -> None:
+        pass
+
+    def stop(self) -> None:
+        pass
+
+
+class PostgresBus:
+    """
+    Invalidations are shared by every worker through Postgres LISTEN/NOTIFY.
+
+    NOTIFY is sent inside the writing transaction, so other workers only hear
+    about committed changes. A background thread LISTENs on a dedicated
+    connection and dispatches messages from other processes; after a
+    reconnect everything is flushed, since notifications may have been missed.
+    """
+
+    def __init__(self, engine=None, poll_interval: float = 1.0):
+        self.engine = engine
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def publish(self, db: Session, message: dict) -> None:
+        payload = json.dumps({**message, "sender": _sender})
+        if len(payload) > MAX_PAYLOAD:
+            payload = json.dumps({**message, "product_ids": None, "sender": _sender})
+        db.execute(sql_select(func.pg_notify(CHANNEL, payload)))
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="cache-bus-listener", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.poll_interval * 2)
+            self._thread = None
+
+    def _receive(self, payload: str) -> None:
+        message = json.loads(payload)
+        if message.pop("sender", None) != _sender:
+            dispatch(message)
+
+    def _listen(self) -> None:
+        raw = (self.engine or get_engine()).raw_connection()
+        connection = raw.driver_connection
+        raw.detach()
+        try:
+            connection.autocommit = True
+            connection.cursor().execute(f"LISTEN {CHANNEL}")
+            dispatch({"product_ids": None, "catalog": True})
+            while not self._stop.is_set():
+                if callable(getattr(connection, "notifies", None)):  # psycopg 3
+                    for notify in connection.notifies(timeout=self.poll_interval, stop_after=1):
+                        self._receive(notify.payload)
+                elif select.select([connection], [], [], self.poll_interval)[0]:  # psycopg2
+                    connection.poll()
+                    while connection.notifies:
+                        self._receive(connection.notifies.pop(0).payload)
+        finally:
+            connection.close()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self._listen()
+            except Exception:
+                logger.exception("Cache invalidation listener failed, reconnecting")
+                self._stop.wait(self.poll_interval)
+
+
+# CACHE_INVALIDATION_BACKEND: "local" (single worker) or "postgres" (LISTEN/NOTIFY).
+_bus = PostgresBus() if get_settings().cache_invalidation_backend == "postgres" else LocalBus()
+
+
+def get_bus():
+    return _bus
+
+
+@event.listens_for(Session, "before_commit")
+def _publish_before_commit(session: Session) -> None:
+    pending = session.info.get("cache_invalidation")
+    if pending:
+        _bus.publish(session, _message(pending))
+
+
+@event.listens_for(Session, "after_commit")
+def _dispatch_after_commit(session: Session) -> None:
+    pending = session.info.pop("cache_invalidation", None)
+    if pending:
+        dispatch(_message(pending))
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_after_rollback(session: Session) -> None:
+    session.info.pop("cache_invalidation", None)
@@ -0,0 +1,88 @@
+import gzip
+import threading
+import uuid
+from dataclasses import dataclass
+from pydantic import TypeAdapter
+from sqlalchemy.orm import Session
+from app.models.product import Product
+from app.schemas.product import ProductResponse
+from app.utils import cache_bus
+from app.utils.compression import zstandard
+
+_products_adapter = TypeAdapter(list[ProductResponse])
+
+# Distinguishes ETags of this process from those handed out before a restart.
+_boot_id = uuid.uuid4().hex[:12]
+_lock = threading.Lock()
+_version = 0
+_snapshot = None
+
+
+@dataclass(frozen=True)
+class CatalogSnapshot:
+    version: int
+    etag: str
+    bodies: dict  # content encoding -> pre-serialized JSON body
+
+
+def _etag(version: int, variant: str = "") -> str:
+    suffix = f"-{uuid.uuid5(uuid.NAMESPACE_URL, variant).hex[:12]}" if variant else ""
+    return f'W/"catalog-{_boot_id}-{version}{suffix}"'
+
+
+def catalog_etag(variant: str = "") -> str:
+    """Weak ETag of the current catalog version, optionally for a variant (e.g. a query string)."""
+    return _etag(_version, variant)
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Whether an If-None-Match header matches etag (weak comparison)."""
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or any(candidate.removeprefix("W/") == etag.removeprefix("W/") for candidate in candidates)
+
+
+def bump_catalog_version() -> None:
+    global _version
+    with _lock:
+        _version += 1
+
+
+def mark_catalog_changed(db: Session) -> None:
+    """Bump the catalog version (in every worker) once the session's current transaction commits."""
+    cache_bus.queue_invalidation(db, catalog=True)
+
+
+def _on_invalidation(message: dict) -> None:
+    if message["catalog"]:
+        bump_catalog_version()
+
+
+cache_bus.subscribe(_on_invalidation)
+
+
+def catalog_snapshot(db: Session) -> CatalogSnapshot:
+    """
+    The serialized catalog of active products, rebuilt on the first read after a write.
+
+    The version is read before querying, so a write that commits during the
+    rebuild leaves the snapshot outdated and it is rebuilt on the next read.
+    """
+    global _snapshot
+    snapshot = _snapshot
+    if snapshot is not None and snapshot.version == _version:
+        return snapshot
+
+    version = _version
+    products = db.query(Product).filter(Product.is_deleted == False).order_by(Product.name, Product.id).all()
+    body = _products_adapter.dump_json(_products_adapter.validate_python(products, from_attributes=True))
+    bodies = {"identity": body, "gzip": gzip.compress(body)}
+    if zstandard is not None:
+        bodies["zstd"] = zstandard.ZstdCompressor(level=3).compress(body)
+
+    snapshot = CatalogSnapshot(version=version, etag=_etag(version), bodies=bodies)
+    with _lock:
+        if _snapshot is None or _snapshot.version < version:
+            _snapshot = snapshot
+    return snapshot
@@ -0,0 +1,85 @@
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from app.models.change_log import ChangeLog, ChangeLogState, change_log_seq
+
+# pg_advisory_xact_lock key serializing the sequencer.
+SEQUENCER_LOCK_KEY = 0x53594E43
+
+
+def sequence_changes(db: Session) -> int:
+    """
+    Stamp committed, unsequenced changes with the next sequence numbers.
+
+    Runs under a transaction-level advisory lock, so a change that commits
+    late always receives a higher number than every change a client may
+    already have seen. Rows still locked by an open writer are skipped and
+    picked up by a later run. The caller must commit.
+
+    Returns:
+        Number of changes sequenced
+    """
+    db.execute(select(func.pg_advisory_xact_lock(SEQUENCER_LOCK_KEY)))
+    pending = (
+        select(ChangeLog.id)
+        .where(ChangeLog.seq.is_(None))
+        .order_by(ChangeLog.id)
+        .with_for_update(skip_locked=True)
+    )
+    result = db.execute(
+        update(ChangeLog)
+        .where(ChangeLog.id.in_(pending))
+        .values(seq=change_log_seq.next_value())
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+
+def pruned_seq(db: Session) -> int:
+    """Highest sequence number removed by compaction (0 if never compacted)."""
+    return db.query(ChangeLogState.pruned_seq).filter(ChangeLogState.id == 1).scalar() or 0
+
+
+def changes_since(db: Session, since_seq: int, limit: int) -> list:
+    """Up to `limit` sequenced changes after since_seq, in sequence order."""
+    return (
+        db.query(ChangeLog)
+        .filter(ChangeLog.seq > since_seq)
+        .order_by(ChangeLog.seq)
+        .limit(limit)
+        .all()
+    )
+
+
+def prune_change_log(db: Session, retention: timedelta) -> int:
+    """
+    Remove tombstones older than the retention period.
+
+    Everything at or below the newest pruned sequence number is dropped and
+    that number is recorded, so clients syncing from an older position can be
+    told to start over. Live changes below it keep their sequence numbers:
+    clients past it do not download them again. The caller must commit.
+
+    Returns:
+        Number of tombstones removed
+    """
+    cutoff = datetime.now(timezone.utc) - retention
+    horizon = db.query(func.max(ChangeLog.seq)).filter(
+        ChangeLog.deleted == True,
+        ChangeLog.changed_at < cutoff,
+    ).scalar()
+    if horizon is None:
+        return 0
+
+    removed = db.query(ChangeLog).filter(
+        ChangeLog.deleted == True,
+        ChangeLog.seq <= horizon,
+    ).delete(synchronize_session=False)
+
+    stmt = insert(ChangeLogState).values(id=1, pruned_seq=horizon)
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[ChangeLogState.id],
+        set_={"pruned_seq": func.greatest(ChangeLogState.pruned_seq, stmt.excluded.pruned_seq)},
+    ))
+    return removed
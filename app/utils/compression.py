@@ -0,0 +1,183 @@
+import zlib
+from fastapi import HTTPException, Request, status
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import zstandard
+except ImportError:  # zstd is optional; gzip is always available
+    zstandard = None
+
+DECOMPRESSION_ERRORS = (OSError, EOFError, zlib.error) + ((zstandard.ZstdError,) if zstandard else ())
+# Largest piece of a request body decoded at once.
+DECODE_CHUNK = 64 * 1024
+
+
+def accepted_encoding(accept_encoding: str) -> str | None:
+    """Preferred supported encoding of an Accept-Encoding header: zstd, then gzip."""
+    offered = {}
+    for part in accept_encoding.split(","):
+        name, *params = part.strip().split(";")
+        q = 1.0
+        for param in params:
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        offered[name.strip().lower()] = q
+    if zstandard is not None and offered.get("zstd", 0) > 0:
+        return "zstd"
+    if offered.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+
+class _Compressor:
+    """Incremental compressor that can flush after every chunk of a streamed body."""
+
+    def __init__(self, encoding: str, gzip_level: int, zstd_level: int):
+        if encoding == "zstd":
+            self._stream = zstandard.ZstdCompressor(level=zstd_level).compressobj()
+            self._sync_flush = zstandard.COMPRESSOBJ_FLUSH_BLOCK
+        else:
+            self._stream = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+            self._sync_flush = zlib.Z_SYNC_FLUSH
+
+    def compress(self, chunk: bytes, final: bool) -> bytes:
+        data = self._stream.compress(chunk)
+        return data + (self._stream.flush() if final else self._stream.flush(self._sync_flush))
+
+
+class CompressionMiddleware:
+    """
+    Compress responses with zstd or gzip, as negotiated through Accept-Encoding.
+
+    Bodies sent in one piece are left alone below `minimum_size`; streamed
+    bodies are always compressed and flushed chunk by chunk.
+    """
+
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6, zstd_level: int = 3):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.zstd_level = zstd_level
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = accepted_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        compressor = None
+
+        async def send_compressed(message):
+            nonlocal start, compressor
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if start is not None:
+                headers = MutableHeaders(scope=start)
+                if "content-encoding" not in headers and (more_body or len(body) >= self.minimum_size):
+                    compressor = _Compressor(encoding, self.gzip_level, self.zstd_level)
+                    headers["Content-Encoding"] = encoding
+                    headers.add_vary_header("Accept-Encoding")
+                    del headers["Content-Length"]
+                    body = compressor.compress(body, final=not more_body)
+                    if not more_body:
+                        headers["Content-Length"] = str(len(body))
+                await send(start)
+                start = None
+            elif compressor is not None:
+                body = compressor.compress(body, final=not more_body)
+            await send({"type": "http.response.body", "body": body, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
+
+
+class _LimitedSink:
+    """Forward decoded bytes to write, refusing more than max_size in total."""
+
+    def __init__(self, write, max_size: int):
+        self._write = write
+        self.max_size = max_size
+        self.size = 0
+
+    def write(self, data: bytes) -> int:
+        self.size += len(data)
+        if self.size > self.max_size:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"Request body exceeds {self.max_size} bytes once decoded",
+            )
+        if data:
+            self._write(data)
+        return len(data)
+
+
+class BodyDecoder:
+    """
+    Incremental decoder of a request body per its Content-Encoding (identity,
+    gzip or zstd). Decoded bytes go to `write` at most DECODE_CHUNK at a time
+    and past `max_size` of them the request fails with 413, so a small
+    compressed body cannot expand without bound. Malformed bodies fail with 400.
+    """
+
+    def __init__(self, content_encoding: str | None, max_size: int, write):
+        encoding = (content_encoding or "identity").strip().lower()
+        self._sink = _LimitedSink(write, max_size)
+        self._gzip = None
+        self._zstd = None
+        if encoding == "gzip":
+            self._gzip = zlib.decompressobj(31)
+        elif encoding == "zstd" and zstandard is not None:
+            self._zstd = zstandard.ZstdDecompressor().stream_writer(self._sink, write_size=DECODE_CHUNK, closefd=False)
+        elif encoding != "identity":
+            raise HTTPException(
+                status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail=f"Unsupported content encoding {encoding}"
+            )
+
+    def write(self, chunk: bytes) -> None:
+        try:
+            if self._gzip is not None:
+                while chunk:
+                    self._sink.write(self._gzip.decompress(chunk, DECODE_CHUNK))
+                    chunk = self._gzip.unconsumed_tail
+            elif self._zstd is not None:
+                self._zstd.write(chunk)
+            else:
+                self._sink.write(chunk)
+        except DECOMPRESSION_ERRORS:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Malformed compressed body")
+
+    def close(self) -> None:
+        """Write what is left of the body; a truncated gzip stream is malformed."""
+        try:
+            if self._gzip is not None:
+                self._sink.write(self._gzip.flush())
+                if not self._gzip.eof:
+                    raise EOFError("Compressed body ended early")
+            elif self._zstd is not None:
+                self._zstd.flush()
+        except DECOMPRESSION_ERRORS:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Malformed compressed body")
+
+
+async def read_body(request: Request, max_size: int) -> bytes:
+    """The request body decoded per its Content-Encoding, at most max_size bytes of it."""
+    parts = []
+    decoder = BodyDecoder(request.headers.get("content-encoding"), max_size, parts.append)
+    async for chunk in request.stream():
+        decoder.write(chunk)
+    decoder.close()
+    return b"".join(parts)
@@ -1,52 +1,273 @@
-from sendgrid import SendGridAPIClient
-from sendgrid.helpers.mail import Mail
+import http.client
+import json
+import logging
+import queue
+import random
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from fastapi import HTTPException, status
 from app.config import get_settings
 
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class EmailMessage:
+    to: str
+    subject: str
+    html: str
+    attempts: int = 0
+    last_error: str | None = None
+    queued_at: float = field(default_factory=time.monotonic)
+
+
+class EmailDeliveryError(Exception):
+    """A failed delivery; retryable errors are attempted again with backoff."""
+
+    def __init__(self, message: str, retryable: bool = True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class SendGridProvider:
+    """
+    SendGrid v3 mail/send over a kept-alive HTTPS connection.
+    Each queue worker owns one provider, so connections are never shared between threads.
+    """
+
+    host = "api.sendgrid.com"
+
+    def __init__(self, api_key: str, from_email: str, timeout: float = 10):
+        self.api_key = api_key
+        self.from_email = from_email
+        self.timeout = timeout
+        self._connection = None
+
+    def send(self, message: EmailMessage) -> None:
+        body = json.dumps({
+            "personalizations": [{"to": [{"email": message.to}]}],
+            "from": {"email": self.from_email},
+            "subject": message.subject,
+            "content": [{"type": "text/html", "value": message.html}],
+        })
+        headers = {"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"}
+        try:
+            if self._connection is None:
+                self._connection = http.client.HTTPSConnection(self.host, timeout=self.timeout)
+            self._connection.request("POST", "/v3/mail/send", body=body, headers=headers)
+            response = self._connection.getresponse()
+            detail = response.read()
+        except (OSError, http.client.HTTPException) as exc:
+            self.close()
+            raise EmailDeliveryError(f"SendGrid request failed: {exc}")
+        if response.will_close:
+            self.close()
+        if response.status != 202:
+            retryable = response.status == 429 or response.status >= 500
+            raise EmailDeliveryError(f"SendGrid returned {response.status}: {detail[:200]!r}", retryable=retryable)
+
+    def close(self) -> None:
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+
+class FakeEmailProvider:
+    """Keeps sent messages in memory, for tests and benchmarks without network access."""
+
+    sent = deque(maxlen=10000)
+
+    def __init__(self, latency: float = 0.0, failure_rate: float = 0.0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+
+    def send(self, message: EmailMessage) -> None:
+        if self.latency:
+            time.sleep(self.latency)
+        if self.failure_rate and random.random() < self.failure_rate:
+            raise EmailDeliveryError("Simulated provider failure")
+        self.sent.append(message)
+
+    def close(self) -> None:
+        pass
+
+
+class EmailQueue:
+    """
+    Bounded outbound email queue drained by a fixed pool of worker threads.
+
+    Retryable failures are attempted again with exponential backoff and
+    jitter, up to max_attempts; messages that still fail land in a bounded
+    dead-letter list.
+    """
+
+    def __init__(
+        self,
+        provider_factory,
+        workers: int = 4,
+        max_size: int = 1000,
+        max_attempts: int = 5,
+        retry_base_seconds: float = 0.5,
+        retry_max_seconds: float = 30,
+        dead_letter_size: int = 1000,
+    ):
+        self.provider_factory = provider_factory
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.retry_base_seconds = retry_base_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self.dead_letters = deque(maxlen=dead_letter_size)
+        self._queue = queue.Queue(maxsize=max_size)
+        self._threads = []
+        self._lock = threading.Lock()
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+
+    def start(self) -> None:
+        with self._lock:
+            if self._threads:
+                return
+            for number in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f"email-worker-{number}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def stop(self, timeout: float = 5) -> None:
+        """Deliver what is queued (within timeout), then stop the workers."""
+        with self._lock:
+            threads, self._threads = self._threads, []
+        for _ in threads:
+            try:
+                self._queue.put(None, timeout=timeout)
+            except queue.Full:
+                break
+        for thread in threads:
+            thread.join(timeout=timeout)
+
+    def enqueue(self, message: EmailMessage) -> bool:
+        """Queue a message without blocking; False if the queue is full."""
+        self.start()
+        try:
+            self._queue.put_nowait(message)
+            return True
+        except queue.Full:
+            return False
+
+    def qsize(self) -> int:
+        return self._queue.qsize()
+
+    def join(self) -> None:
+        """Block until every queued message was delivered or dead-lettered."""
+        self._queue.join()
+
+    def _work(self) -> None:
+        provider = self.provider_factory()
+        try:
+            while True:
+                message = self._queue.get()
+                try:
+                    if message is None:
+                        return
+                    self._deliver(provider, message)
+                finally:
+                    self._queue.task_done()
+        finally:
+            provider.close()
+
+    def _deliver(self, provider, message: EmailMessage) -> None:
+        while True:
+            message.attempts += 1
+            try:
+                provider.send(message)
+                self.sent += 1
+                return
+            except Exception as exc:
+                retryable = getattr(exc, "retryable", True)
+                message.last_error = str(exc)
+            if not retryable or message.attempts >= self.max_attempts:
+                self.failed += 1
+                self.dead_letters.append(message)
+                logger.error("Giving up on email to %s after %d attempts: %s", message.to, message.attempts, message.last_error)
+                return
+            self.retried += 1
+            delay = min(self.retry_base_seconds * 2 ** (message.attempts - 1), self.retry_max_seconds)
+            time.sleep(delay * random.uniform(0.5, 1.0))
+
+    def stats(self) -> dict:
+        return {
+            "queued": self.qsize(),
+            "sent": self.sent,
+            "retried": self.retried,
+            "failed": self.failed,
+            "dead_letters": len(self.dead_letters),
+        }
+
+
+def _provider_factory():
+    settings = get_settings()
+    if settings.email_provider == "fake":
+        return FakeEmailProvider
+    return lambda: SendGridProvider(settings.sendgrid_api_key, settings.sendgrid_from_email)
+
+
+def _email_configured() -> bool:
+    settings = get_settings()
+    if settings.email_provider == "fake":
+        return True
+    return bool(settings.sendgrid_api_key) and settings.sendgrid_api_key != "your_sendgrid_api_key_here"
+
+
+settings = get_settings()
+email_queue = EmailQueue(
+    _provider_factory(),
+    workers=settings.email_workers,
+    max_size=settings.email_queue_size,
+    max_attempts=settings.email_max_attempts,
+    retry_base_seconds=settings.email_retry_base_seconds,
+    dead_letter_size=settings.email_dead_letter_size,
+)
+
 
 def send_otp_email(recipient_email: str, otp: str) -> bool:
     """
-    Send OTP via email using SendGrid.
-    
+    Queue the OTP email for background delivery.
+
     Args:
         recipient_email: Email to send OTP to
         otp: The OTP code
-    
+
     Returns:
-        True if sent successfully, False otherwise
+        True if the email was queued, False if no email provider is configured
     """
-    try:
-        settings = get_settings()
-        
-        # Check if API key is configured
-        if not settings.sendgrid_api_key or settings.sendgrid_api_key == "your_sendgrid_api_key_here":
-            print(f"⚠️  SendGrid not configured. OTP for {recipient_email}: {otp}")
-            return False
-        
-        message = Mail(
-            from_email=settings.sendgrid_from_email,
-            to_emails=recipient_email,
-            subject="StockMaster 2FA OTP Code",
-            html_content=f"""
-            <html>
-                <body style="font-family: Arial, sans-serif;">
-                    <h2>Your 2FA OTP Code</h2>
-                    <p>Hello,</p>
-                    <p>Your one-time password (OTP) for StockMaster login is:</p>
-                    <h1 style="color: #007bff; letter-spacing: 5px;">{otp}</h1>
-                    <p>This code is valid for <strong>10 minutes</strong>.</p>
-                    <p>If you didn't request this, please ignore this email.</p>
-                    <hr>
-                    <p style="color: #999; font-size: 12px;">StockMaster - Inventory Management System</p>
-                </body>
-            </html>
-            """
-        )
-        
-        sg = SendGridAPIClient(settings.sendgrid_api_key)
-        response = sg.send(message)
-        
-        return response.status_code == 202
-    
-    except Exception as e:
-        print(f"❌ Error sending email: {str(e)}")
+    if not _email_configured():
+        print(f"⚠️  SendGrid not configured. OTP for {recipient_email}: {otp}")
         return False
+
+    message = EmailMessage(
+        to=recipient_email,
+        subject="StockMaster 2FA OTP Code",
+        html=f"""
+        <html>
+            <body style="font-family: Arial, sans-serif;">
+                <h2>Your 2FA OTP Code</h2>
+                <p>Hello,</p>
+                <p>Your one-time password (OTP) for StockMaster login is:</p>
+                <h1 style="color: #007bff; letter-spacing: 5px;">{otp}</h1>
+                <p>This code is valid for <strong>10 minutes</strong>.</p>
+                <p>If you didn't request this, please ignore this email.</p>
+                <hr>
+                <p style="color: #999; font-size: 12px;">StockMaster - Inventory Management System</p>
+            </body>
+        </html>
+        """,
+    )
+    if not email_queue.enqueue(message):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Email delivery is backed up, please try again shortly",
+            headers={"Retry-After": "5"},
+        )
+    return True
@@ -0,0 +1,170 @@
+import time
+from bisect import bisect_left
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Histogram, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, HistogramMetricFamily
+from starlette.responses import Response
+from app.database import get_async_engine, get_engine, pool_stats, settings
+from app.utils.email import email_queue
+from app.utils.otp import MemoryOTPStore, get_otp_store
+from app.utils.pool_stats import pool_status
+from app.utils.product_cache import product_cache
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# HTTP figures are plain counters updated on the event loop and turned into
+# Prometheus metrics at scrape time; prometheus_client's locked metrics would
+# cost several microseconds per request.
+_requests = {}  # (method, route, status) -> [count per latency bucket, then +Inf, then the sum]
+_in_progress = {}  # method -> requests being served
+
+SYNC_ROWS = Counter(
+    "stockmaster_sync_rows_total",
+    "Rows received by /sync/push and sent by /sync/pull, by entity.",
+    ["direction", "entity"],
+)
+SYNC_PAYLOAD_BYTES = Histogram(
+    "stockmaster_sync_payload_bytes",
+    "Encoded sync body sizes before compression (push: request, pull: response).",
+    ["direction"],
+    buckets=tuple(1024 * 4**i for i in range(10)),  # 1 KiB .. 256 MiB
+)
+
+# Requests that matched no route share one label, so unknown paths cannot blow up cardinality.
+UNMATCHED_ROUTE = "unmatched"
+
+
+class MetricsMiddleware:
+    """
+    Count requests and time them per route template and status code.
+
+    A request costs two clock reads, a few dict lookups and a bisect into the
+    latency buckets. Must run on the event loop (as ASGI middleware does).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        _in_progress[method] = _in_progress.get(method, 0) + 1
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            _in_progress[method] -= 1
+            route = scope.get("route")
+            key = (method, route.path if route is not None else UNMATCHED_ROUTE, status_code)
+            observations = _requests.get(key)
+            if observations is None:
+                observations = _requests[key] = [0] * (len(LATENCY_BUCKETS) + 1) + [0.0]
+            observations[bisect_left(LATENCY_BUCKETS, elapsed)] += 1
+            observations[-1] += elapsed
+
+
+def record_sync(direction: str, rows: dict, payload_bytes: int) -> None:
+    """
+    Record a sync push or pull.
+
+    Args:
+        direction: "push" or "pull"
+        rows: Row count per entity
+        payload_bytes: Size of the encoded body, before compression
+    """
+    for entity, count in rows.items():
+        if count:
+            SYNC_ROWS.labels(direction, entity).inc(count)
+    SYNC_PAYLOAD_BYTES.labels(direction).observe(payload_bytes)
+
+
+def _http_metrics():
+    requests = CounterMetricFamily(
+        "stockmaster_http_requests", "HTTP requests by method, route template and status code.",
+        labels=["method", "route", "status"],
+    )
+    durations = HistogramMetricFamily(
+        "stockmaster_http_request_duration_seconds", "HTTP request latency by method, route template and status code.",
+        labels=["method", "route", "status"],
+    )
+    for (method, route, status), observations in list(_requests.items()):
+        labels = [method, route, str(status)]
+        buckets, count = [], 0
+        for bound, observed in zip(LATENCY_BUCKETS + (float("inf"),), observations):
+            count += observed
+            buckets.append(("+Inf" if bound == float("inf") else str(bound), count))
+        requests.add_metric(labels, count)
+        durations.add_metric(labels, buckets, sum_value=observations[-1])
+    in_progress = GaugeMetricFamily(
+        "stockmaster_http_requests_in_progress", "HTTP requests being served, by method.", labels=["method"]
+    )
+    for method, count in list(_in_progress.items()):
+        in_progress.add_metric([method], count)
+    return [requests, durations, in_progress]
+
+
+class AppStateCollector:
+    """HTTP, queue, cache and pool figures, read from their owners at scrape time."""
+
+    def collect(self):
+        yield from _http_metrics()
+
+        email = email_queue.stats()
+        yield GaugeMetricFamily("stockmaster_email_queue_depth", "Emails waiting for delivery.", value=email["queued"])
+        yield GaugeMetricFamily(
+            "stockmaster_email_dead_letters", "Emails kept in the dead-letter list.", value=email["dead_letters"]
+        )
+        deliveries = CounterMetricFamily(
+            "stockmaster_email_deliveries", "Email delivery outcomes.", labels=["outcome"]
+        )
+        for outcome in ("sent", "retried", "failed"):
+            deliveries.add_metric([outcome], email[outcome])
+        yield deliveries
+
+        otp_store = get_otp_store()
+        if isinstance(otp_store, MemoryOTPStore):
+            yield GaugeMetricFamily("stockmaster_otp_pending", "OTPs waiting to be verified.", value=len(otp_store))
+
+        cache = product_cache.stats()
+        yield GaugeMetricFamily("stockmaster_product_cache_entries", "Cached products.", value=cache["entries"])
+        lookups = CounterMetricFamily(
+            "stockmaster_product_cache_lookups", "Product cache lookups.", labels=["result"]
+        )
+        lookups.add_metric(["hit"], cache["hits"])
+        lookups.add_metric(["miss"], cache["misses"])
+        yield lookups
+
+        engines = {"sync": get_engine()}
+        if settings.db_async:
+            engines["async"] = get_async_engine().sync_engine
+        checked_out = GaugeMetricFamily(
+            "stockmaster_db_pool_checked_out", "Connections checked out of the pool.", labels=["engine"]
+        )
+        timeouts = CounterMetricFamily(
+            "stockmaster_db_pool_timeouts", "Checkouts that gave up waiting for a connection.", labels=["engine"]
+        )
+        for name, engine in engines.items():
+            status = pool_status(engine, pool_stats[name])
+            checked_out.add_metric([name], status.get("checked_out", 0))
+            timeouts.add_metric([name], status["timeouts"])
+        yield checked_out
+        yield timeouts
+
+
+REGISTRY.register(AppStateCollector())
+
+
+def metrics_response() -> Response:
+    """The Prometheus text exposition of every metric of this process."""
+    return Response(generate_latest(REGISTRY), media_type=CONTENT_TYPE_LATEST)
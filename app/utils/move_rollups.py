@@ -0,0 +1,88 @@
+from datetime import date, datetime, time, timedelta, timezone
+from sqlalchemy import delete, func, insert, select, text
+from sqlalchemy.orm import Session
+from app.models.operation import Operation
+from app.models.product import Product
+from app.models.stock_move import StockMove
+from app.models.stock_move_rollup import StockMoveRollup
+from app.utils.stock_checkpoints import archive_horizon
+
+# Rollup days are UTC days, like the triggers that maintain them.
+MOVE_DAY = func.date(func.timezone("UTC", StockMove.created_at))
+
+
+def _day_start(day: date) -> datetime:
+    return datetime.combine(day, time.min, tzinfo=timezone.utc)
+
+
+def ledger_days(db: Session) -> tuple[date | None, date | None]:
+    """First and last UTC day with stock moves."""
+    first, last = db.execute(select(func.min(StockMove.created_at), func.max(StockMove.created_at))).one()
+    return tuple(moment and moment.astimezone(timezone.utc).date() for moment in (first, last))
+
+
+def backfill_rollups(db: Session, since: date | None = None, until: date | None = None) -> int:
+    """
+    Recompute the stock move rollups of the days in [since, until] from the ledger.
+
+    The rollup table is locked against the maintenance triggers for the rest
+    of the caller's transaction, so moves written meanwhile add their own
+    deltas after the commit instead of being counted twice. Backfill long
+    histories in chunks of days to keep that lock short. Days before the
+    archive horizon are left alone, their rollups are all that remains of them.
+
+    Args:
+        db: Database session
+        since: First day to recompute (default: the first move)
+        until: Last day to recompute, inclusive (default: the last move)
+
+    Returns:
+        Number of rollup rows written
+    """
+    horizon = archive_horizon(db)
+    if horizon is not None:
+        first_day = horizon.astimezone(timezone.utc).date()
+        since = max(since or first_day, first_day)
+        if until is not None and until < since:
+            return 0
+    db.execute(text("LOCK TABLE stock_move_rollups IN EXCLUSIVE MODE"))
+    stale = delete(StockMoveRollup)
+    moves = select(
+        MOVE_DAY,
+        StockMove.product_id,
+        Operation.type,
+        func.sum(func.greatest(StockMove.quantity, 0)),
+        func.sum(func.greatest(-StockMove.quantity, 0)),
+        func.count(),
+    ).join(Operation, Operation.id == StockMove.operation_id).where(StockMove.created_at.is_not(None))
+    if since is not None:
+        stale = stale.where(StockMoveRollup.day >= since)
+        moves = moves.where(StockMove.created_at >= _day_start(since))
+    if until is not None:
+        stale = stale.where(StockMoveRollup.day <= until)
+        moves = moves.where(StockMove.created_at < _day_start(until + timedelta(days=1)))
+    db.execute(stale)
+    return db.execute(
+        insert(StockMoveRollup).from_select(
+            ["day", "product_id", "operation_type", "quantity_in", "quantity_out", "moves"],
+            moves.group_by(MOVE_DAY, StockMove.product_id, Operation.type),
+        )
+    ).rowcount
+
+
+def category_report(db: Session, date_from: date, date_to: date, filters: list) -> list:
+    """Daily totals per product category and operation type from the rollups, oldest day first."""
+    keys = (StockMoveRollup.day, Product.category, StockMoveRollup.operation_type)
+    statement = (
+        select(
+            *keys,
+            func.sum(StockMoveRollup.quantity_in).label("quantity_in"),
+            func.sum(StockMoveRollup.quantity_out).label("quantity_out"),
+            func.sum(StockMoveRollup.moves).label("moves"),
+        )
+        .join(Product, Product.id == StockMoveRollup.product_id)
+        .where(StockMoveRollup.day >= date_from, StockMoveRollup.day <= date_to, *filters)
+        .group_by(*keys)
+        .order_by(*keys)
+    )
+    return db.execute(statement).all()
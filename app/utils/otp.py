@@ -1,7 +1,17 @@
+import heapq
+import hmac
 import random
 import string
-from datetime import datetime, timedelta
+import threading
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from sqlalchemy import delete
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import Session
+from app.config import get_settings
+from app.models.otp_code import OTPCode
 from app.models.user import User
 
 
@@ -32,41 +42,155 @@ def verify_otp(stored_otp_data: dict, provided_otp: str) -> bool:
     return stored_otp_data["otp"] == provided_otp
 
 
-# In-memory OTP storage (replace with Redis in production)
-otp_storage = {}
-
-
-def save_otp_temp(user_email: str, otp: str, expires_in_minutes: int = 10):
-    """Save OTP temporarily in memory."""
-    otp_storage[user_email] = {
-        "otp": otp,
-        "expires_at": datetime.utcnow() + timedelta(minutes=expires_in_minutes)
-    }
-
-
-def get_otp_temp(user_email: str) -> dict | None:
-    """Retrieve OTP from temporary storage."""
-    return otp_storage.get(user_email)
-
-
-def verify_otp_temp(user_email: str, provided_otp: str) -> bool:
-    """Verify OTP from temporary storage."""
-    otp_data = otp_storage.get(user_email)
-    if not otp_data:
-        return False
-    
-    if datetime.utcnow() > otp_data["expires_at"]:
-        del otp_storage[user_email]
-        return False
-    
-    if otp_data["otp"] == provided_otp:
-        del otp_storage[user_email]
-        return True
-    
-    return False
-
-
-def delete_otp_temp(user_email: str):
-    """Delete OTP from temporary storage."""
-    if user_email in otp_storage:
-        del otp_storage[user_email]
+class OTPStore(ABC):
+    """
+    Where pending OTPs live between login and verification.
+
+    Methods take the request's database session; backends that keep OTPs
+    elsewhere ignore it. An OTP can be verified at most once.
+    """
+
+    @abstractmethod
+    def save(self, db: Session, email: str, otp: str, expires_in_minutes: float = 10) -> None:
+        ...
+
+    @abstractmethod
+    def verify(self, db: Session, email: str, otp: str) -> bool:
+        ...
+
+    @abstractmethod
+    def delete(self, db: Session, email: str) -> None:
+        ...
+
+    @abstractmethod
+    def cleanup(self, db: Session) -> int:
+        """Remove expired OTPs and return how many were removed."""
+
+
+class MemoryOTPStore(OTPStore):
+    """
+    Per-process OTP store with a hard cap on entries.
+
+    Expiry times sit in a min-heap that is swept on every call, so expired
+    OTPs are dropped even for emails that never verify. When the cap is
+    reached the OTP closest to expiry is evicted. Only usable with a single worker.
+    """
+
+    def __init__(self, max_entries: int = 100000):
+        self.max_entries = max_entries
+        self._entries = {}  # email -> (otp, expires_at)
+        self._expiry_heap = []  # (expires_at, email); stale items are skipped
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _sweep(self, now: float) -> int:
+        removed = 0
+        while self._expiry_heap and self._expiry_heap[0][0] <= now:
+            expires_at, email = heapq.heappop(self._expiry_heap)
+            entry = self._entries.get(email)
+            if entry is not None and entry[1] == expires_at:
+                del self._entries[email]
+                removed += 1
+        return removed
+
+    def _evict_one(self) -> None:
+        while self._expiry_heap:
+            expires_at, email = heapq.heappop(self._expiry_heap)
+            entry = self._entries.get(email)
+            if entry is not None and entry[1] == expires_at:
+                del self._entries[email]
+                return
+
+    def save(self, db: Session, email: str, otp: str, expires_in_minutes: float = 10) -> None:
+        now = time.monotonic()
+        expires_at = now + expires_in_minutes * 60
+        with self._lock:
+            self._sweep(now)
+            if email not in self._entries and len(self._entries) >= self.max_entries:
+                self._evict_one()
+            self._entries[email] = (otp, expires_at)
+            heapq.heappush(self._expiry_heap, (expires_at, email))
+            # Re-sent OTPs leave stale heap items behind; rebuild before they pile up.
+            if len(self._expiry_heap) > 2 * self.max_entries:
+                self._expiry_heap = [(entry[1], key) for key, entry in self._entries.items()]
+                heapq.heapify(self._expiry_heap)
+
+    def verify(self, db: Session, email: str, otp: str) -> bool:
+        with self._lock:
+            self._sweep(time.monotonic())
+            entry = self._entries.get(email)
+            if entry is None or not hmac.compare_digest(entry[0], otp):
+                return False
+            del self._entries[email]
+            return True
+
+    def delete(self, db: Session, email: str) -> None:
+        with self._lock:
+            self._entries.pop(email, None)
+
+    def cleanup(self, db: Session) -> int:
+        with self._lock:
+            return self._sweep(time.monotonic())
+
+
+class DatabaseOTPStore(OTPStore):
+    """
+    OTPs in the otp_codes table, shared by every worker.
+
+    Verification is a single DELETE ... RETURNING, so a code is consumed
+    exactly once even when two workers race. Expired rows are removed by
+    cleanup() (python -m app.cli purge-otps). Writes commit immediately.
+    """
+
+    def save(self, db: Session, email: str, otp: str, expires_in_minutes: float = 10) -> None:
+        expires_at = datetime.now(timezone.utc) + timedelta(minutes=expires_in_minutes)
+        stmt = insert(OTPCode).values(email=email, code=otp, expires_at=expires_at)
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=[OTPCode.email],
+            set_={"code": stmt.excluded.code, "expires_at": stmt.excluded.expires_at},
+        ))
+        db.commit()
+
+    def verify(self, db: Session, email: str, otp: str) -> bool:
+        consumed = db.execute(
+            delete(OTPCode)
+            .where(OTPCode.email == email, OTPCode.code == otp, OTPCode.expires_at > datetime.now(timezone.utc))
+            .returning(OTPCode.email)
+        ).first()
+        db.commit()
+        return consumed is not None
+
+    def delete(self, db: Session, email: str) -> None:
+        db.execute(delete(OTPCode).where(OTPCode.email == email))
+        db.commit()
+
+    def cleanup(self, db: Session) -> int:
+        removed = db.execute(delete(OTPCode).where(OTPCode.expires_at <= datetime.now(timezone.utc))).rowcount
+        db.commit()
+        return removed
+
+
+@lru_cache()
+def get_otp_store() -> OTPStore:
+    """The OTP store selected by OTP_STORE_BACKEND ("memory" or "database")."""
+    settings = get_settings()
+    if settings.otp_store_backend == "database":
+        return DatabaseOTPStore()
+    return MemoryOTPStore(max_entries=settings.otp_store_max_entries)
+
+
+def save_otp_temp(db: Session, user_email: str, otp: str, expires_in_minutes: int = 10):
+    """Save an OTP in the configured store."""
+    get_otp_store().save(db, user_email, otp, expires_in_minutes)
+
+
+def verify_otp_temp(db: Session, user_email: str, provided_otp: str) -> bool:
+    """Verify and consume an OTP from the configured store."""
+    return get_otp_store().verify(db, user_email, provided_otp)
+
+
+def delete_otp_temp(db: Session, user_email: str):
+    """Delete a pending OTP from the configured store."""
+    get_otp_store().delete(db, user_email)
@@ -0,0 +1,138 @@
+import base64
+import enum
+import json
+from datetime import date, datetime
+from typing import Optional
+from uuid import UUID
+from fastapi import HTTPException, Query, Response, status
+from sqlalchemy import text, tuple_
+from sqlalchemy.orm import Session
+from app.config import get_settings
+
+settings = get_settings()
+
+
+def encode_cursor(payload: dict) -> str:
+    """Encode a cursor payload as an opaque URL-safe token."""
+    raw = json.dumps(payload, default=str, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> dict:
+    """Decode a token produced by encode_cursor, rejecting anything malformed."""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError:
+        payload = None
+    if not isinstance(payload, dict):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    return payload
+
+
+def _coerce(column, value):
+    if value is None:
+        return None
+    python_type = column.type.python_type
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    if python_type is date:
+        return date.fromisoformat(value)
+    if python_type is UUID:
+        return UUID(value)
+    if issubclass(python_type, enum.Enum):
+        return python_type(value)
+    return value
+
+
+def keyset_position(columns, values) -> list:
+    """Convert JSON cursor values back to the Python types of the keyset columns."""
+    if not isinstance(values, list) or len(values) != len(columns):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    try:
+        return [_coerce(column, value) for column, value in zip(columns, values)]
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+def keyset_after(columns, values, descending: bool = False):
+    """Row-value comparison selecting rows strictly after a keyset position."""
+    if descending:
+        return tuple_(*columns) < tuple_(*values)
+    return tuple_(*columns) > tuple_(*values)
+
+
+class PageParams:
+    """Common query parameters of keyset-paginated list endpoints."""
+
+    def __init__(
+        self,
+        cursor: Optional[str] = None,
+        limit: int = Query(settings.list_page_size, ge=1, le=settings.list_max_page_size),
+        with_estimate: bool = False,
+    ):
+        self.cursor = cursor
+        self.limit = limit
+        self.with_estimate = with_estimate
+
+
+def resolve_sort(sort: str, sort_options: dict) -> tuple[tuple, bool]:
+    """Map a whitelisted sort name (prefix with '-' for descending) to its keyset columns."""
+    descending = sort.startswith("-")
+    key = sort[1:] if descending else sort
+    if key not in sort_options:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported sort '{key}'. Use one of: {', '.join(sort_options)}",
+        )
+    return sort_options[key], descending
+
+
+def estimate_count(db: Session, query) -> int:
+    """
+    Estimated row count of a query from the planner statistics, without COUNT(*).
+
+    Unfiltered queries read pg_class.reltuples; filtered ones use the row
+    estimate of the top plan node.
+    """
+    statement = query.order_by(None).statement
+    if statement.whereclause is None:
+        table = statement.get_final_froms()[0]
+        return int(db.execute(
+            text("SELECT GREATEST(reltuples, 0)::bigint FROM pg_class WHERE oid = CAST(:name AS regclass)"),
+            {"name": table.name},
+        ).scalar() or 0)
+
+    compiled = statement.compile(dialect=db.get_bind().dialect, compile_kwargs={"literal_binds": True})
+    plan = db.connection().exec_driver_sql(
+        f"EXPLAIN (FORMAT JSON) {compiled}",
+        execution_options={"no_parameters": True},
+    ).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def paginate(db: Session, query, sort_options: dict, sort: str, page: PageParams, response: Response) -> list:
+    """
+    Return one keyset page of `query`.
+
+    The cursor for the following page is sent in the X-Next-Cursor header and,
+    when requested, the planner's row estimate in X-Total-Count-Estimate.
+    """
+    columns, descending = resolve_sort(sort, sort_options)
+    if page.with_estimate:
+        response.headers["X-Total-Count-Estimate"] = str(estimate_count(db, query))
+
+    if page.cursor:
+        state = decode_cursor(page.cursor)
+        if state.get("sort") != sort:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor does not match sort order")
+        query = query.filter(keyset_after(columns, keyset_position(columns, state.get("after")), descending))
+
+    order_by = [column.desc() for column in columns] if descending else list(columns)
+    rows = query.order_by(*order_by).limit(page.limit + 1).all()
+    if len(rows) > page.limit:
+        rows = rows[:page.limit]
+        after = [getattr(rows[-1], column.key) for column in columns]
+        response.headers["X-Next-Cursor"] = encode_cursor({"sort": sort, "after": after})
+    return rows
@@ -0,0 +1,162 @@
+import threading
+import time
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+
+
+class PoolStats:
+    """Counters for one engine's connection pool and the statements it runs."""
+
+    def __init__(self, slow_checkout_seconds: float = 0.1):
+        self.slow_checkout_seconds = slow_checkout_seconds
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.pings = 0
+        self.timeouts = 0
+        self.slow_checkouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.statements = 0
+        self.statement_seconds_total = 0.0
+        self.statement_seconds_max = 0.0
+
+    def record_checkout(self, waited: float, timed_out: bool = False) -> None:
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_seconds_total += waited
+            self.wait_seconds_max = max(self.wait_seconds_max, waited)
+            if waited >= self.slow_checkout_seconds:
+                self.slow_checkouts += 1
+
+    def record_statement(self, elapsed: float) -> None:
+        with self._lock:
+            self.statements += 1
+            self.statement_seconds_total += elapsed
+            self.statement_seconds_max = max(self.statement_seconds_max, elapsed)
+
+    def increment(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "connects": self.connects,
+                "invalidations": self.invalidations,
+                "pings": self.pings,
+                "timeouts": self.timeouts,
+                "slow_checkouts": self.slow_checkouts,
+                "wait_ms_avg": self.wait_seconds_total / max(self.checkouts + self.timeouts, 1) * 1000,
+                "wait_ms_max": self.wait_seconds_max * 1000,
+                "statements": self.statements,
+                "statement_ms_avg": self.statement_seconds_total / max(self.statements, 1) * 1000,
+                "statement_ms_max": self.statement_seconds_max * 1000,
+            }
+
+
+def timed_pool_class(base, stats: PoolStats):
+    """
+    A subclass of the pool class `base` that times every checkout.
+
+    The wait covers queueing for a free connection and opening a new one;
+    checkouts that give up after pool_timeout are counted as timeouts. The
+    stats live on the class, so they survive the pool being recreated.
+    """
+
+    class TimedPool(base):
+        def connect(self):
+            started = time.perf_counter()
+            try:
+                connection = super().connect()
+            except exc.TimeoutError:
+                stats.record_checkout(time.perf_counter() - started, timed_out=True)
+                raise
+            stats.record_checkout(time.perf_counter() - started)
+            return connection
+
+    TimedPool.__name__ = f"Timed{base.__name__}"
+    return TimedPool
+
+
+def instrument_engine(
+    engine: Engine,
+    stats: PoolStats,
+    pre_ping_idle_seconds: float | None = None,
+    session_settings: dict | None = None,
+) -> None:
+    """
+    Count pool and statement events on a (sync) engine and apply per-connection settings.
+
+    Args:
+        engine: The engine, or an async engine's sync_engine
+        stats: Where the counters go
+        pre_ping_idle_seconds: Ping connections on checkout only when they sat
+            idle in the pool for longer than this (None: no idle pings)
+        session_settings: Postgres settings applied to every new connection,
+            in milliseconds, e.g. {"statement_timeout": 5000}
+    """
+
+    @event.listens_for(engine, "connect")
+    def _connect(dbapi_connection, connection_record):
+        stats.increment("connects")
+        if session_settings:
+            cursor = dbapi_connection.cursor()
+            for name, value in session_settings.items():
+                cursor.execute(f"SET {name} = '{int(value)}'")
+            cursor.close()
+            dbapi_connection.commit()
+
+    @event.listens_for(engine, "checkin")
+    def _checkin(dbapi_connection, connection_record):
+        connection_record.info["checked_in_at"] = time.monotonic()
+
+    @event.listens_for(engine, "checkout")
+    def _checkout(dbapi_connection, connection_record, connection_proxy):
+        checked_in_at = connection_record.info.pop("checked_in_at", None)
+        if pre_ping_idle_seconds is None or checked_in_at is None:
+            return
+        if time.monotonic() - checked_in_at < pre_ping_idle_seconds:
+            return
+        stats.increment("pings")
+        try:
+            cursor = dbapi_connection.cursor()
+            cursor.execute("SELECT 1")
+            cursor.close()
+        except Exception:
+            # The pool discards this connection and retries the checkout with a new one.
+            raise exc.DisconnectionError()
+
+    @event.listens_for(engine, "invalidate")
+    def _invalidate(dbapi_connection, connection_record, exception):
+        stats.increment("invalidations")
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info["statement_started"] = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_execute(conn, cursor, statement, parameters, context, executemany):
+        stats.record_statement(time.perf_counter() - conn.info.pop("statement_started"))
+
+
+def pool_status(engine: Engine, stats: PoolStats) -> dict:
+    """Live pool occupancy plus the accumulated counters."""
+    pool = engine.pool
+    status = {"pool_class": type(pool).__name__}
+    if hasattr(pool, "checkedout"):
+        status.update({
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": max(pool.overflow(), 0),
+            "max_overflow": pool._max_overflow,
+            "timeout_seconds": pool.timeout(),
+        })
+    status.update(stats.snapshot())
+    return status
@@ -0,0 +1,115 @@
+import threading
+import time
+from collections import OrderedDict
+from uuid import UUID
+from sqlalchemy.orm import Session
+from app.config import get_settings
+from app.schemas.product import ProductResponse
+from app.utils import cache_bus
+
+
+class ProductCache:
+    """
+    Bounded LRU cache of products with a TTL, addressable by id and by SKU.
+
+    Entries are keyed by id; a SKU index points at the same entries, so
+    evicting or invalidating a product drops both lookups at once. Values are
+    immutable ProductResponse snapshots, never session-bound ORM objects.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # id -> (expires_at, ProductResponse)
+        self._sku_index = {}
+        self._lock = threading.Lock()
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _lookup(self, product_id: UUID | None) -> ProductResponse | None:
+        with self._lock:
+            entry = self._entries.get(product_id)
+            if entry is not None and entry[0] <= time.monotonic():
+                self._remove(product_id)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(product_id)
+            self.hits += 1
+            return entry[1]
+
+    def get(self, product_id: UUID) -> ProductResponse | None:
+        return self._lookup(product_id)
+
+    def get_by_sku(self, sku: str) -> ProductResponse | None:
+        return self._lookup(self._sku_index.get(sku))
+
+    def fill_token(self) -> int:
+        """Take before reading the database; put() ignores fills that raced an invalidation."""
+        return self._generation
+
+    def put(self, product: ProductResponse, token: int) -> None:
+        with self._lock:
+            if token != self._generation:
+                return
+            self._remove(product.id)
+            self._entries[product.id] = (time.monotonic() + self.ttl_seconds, product)
+            self._sku_index[product.sku] = product.id
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, product_ids=None) -> None:
+        """Drop the given products, or everything when product_ids is None."""
+        with self._lock:
+            self._generation += 1
+            if product_ids is None:
+                self._entries.clear()
+                self._sku_index.clear()
+                return
+            for product_id in product_ids:
+                self._remove(product_id)
+
+    def _remove(self, product_id: UUID) -> None:
+        entry = self._entries.pop(product_id, None)
+        if entry is not None and self._sku_index.get(entry[1].sku) == product_id:
+            del self._sku_index[entry[1].sku]
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+settings = get_settings()
+product_cache = ProductCache(settings.product_cache_size, settings.product_cache_ttl_seconds)
+
+
+def invalidate_products(db: Session, product_ids) -> None:
+    """
+    Invalidate cached products written in the session's transaction.
+
+    Entries are dropped now and again after commit, when other workers are
+    notified too, so a read racing the write cannot leave a stale entry.
+    product_ids=None drops every product (bulk writes).
+    """
+    product_ids = None if product_ids is None else list(product_ids)
+    product_cache.invalidate(product_ids)
+    cache_bus.queue_invalidation(db, product_ids=product_ids)
+
+
+def _on_invalidation(message: dict) -> None:
+    product_ids = message["product_ids"]
+    product_cache.invalidate(None if product_ids is None else [UUID(product_id) for product_id in product_ids])
+
+
+cache_bus.subscribe(_on_invalidation)
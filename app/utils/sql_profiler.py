@@ -0,0 +1,143 @@
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+
+logger = logging.getLogger(__name__)
+
+_current = ContextVar("sql_profile", default=None)
+_installed = False
+_slow_seconds = None
+
+
+class QueryProfile:
+    """Statements run on behalf of one request (or one profile_queries() block)."""
+
+    def __init__(self):
+        self.queries = 0
+        self.commits = 0
+        self.seconds = 0.0
+        self.shapes = {}  # statement text -> executions
+
+    def repeated(self, threshold: int) -> dict:
+        """Statements executed at least `threshold` times: likely N+1 loops."""
+        return {statement: count for statement, count in self.shapes.items() if count >= threshold}
+
+
+def install(slow_query_ms: float | None = None) -> None:
+    """
+    Register the cursor events on every engine (idempotent).
+
+    Statements are attributed to the QueryProfile of the current context;
+    the profile travels into threadpool workers and run_sync greenlets with
+    the request's context. Statements slower than slow_query_ms are logged
+    without their parameters.
+    """
+    global _installed, _slow_seconds
+    if slow_query_ms:
+        _slow_seconds = slow_query_ms / 1000
+    if _installed:
+        return
+    _installed = True
+
+    @event.listens_for(Engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info["profiler_started"] = time.perf_counter()
+
+    @event.listens_for(Engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info.pop("profiler_started")
+        profile = _current.get()
+        if profile is not None:
+            profile.queries += 1
+            profile.seconds += elapsed
+            profile.shapes[statement] = profile.shapes.get(statement, 0) + 1
+        if _slow_seconds is not None and elapsed >= _slow_seconds:
+            rows = len(parameters) if executemany else 1
+            logger.warning(
+                "Slow query (%.1f ms, %d parameter set(s), values redacted): %s",
+                elapsed * 1000, rows, " ".join(statement.split()),
+            )
+
+    @event.listens_for(Engine, "commit")
+    def _commit(conn):
+        profile = _current.get()
+        if profile is not None:
+            profile.commits += 1
+
+
+@contextmanager
+def profile_queries():
+    """Collect the statements run inside the block, in this thread / task."""
+    install()
+    profile = QueryProfile()
+    token = _current.set(profile)
+    try:
+        yield profile
+    finally:
+        _current.reset(token)
+
+
+class SQLProfilerMiddleware:
+    """
+    Attribute statements to requests and report them in response headers.
+
+    Adds `X-DB-Queries` and a `Server-Timing` db entry to every response, and
+    warns about statements repeated `n_plus_one_threshold` times or more in
+    one request. Statements issued after the response has started (streamed
+    bodies) are not included in the headers.
+    """
+
+    def __init__(self, app, n_plus_one_threshold: int = 10, slow_query_ms: float | None = None):
+        self.app = app
+        self.n_plus_one_threshold = n_plus_one_threshold
+        install(slow_query_ms)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        profile = QueryProfile()
+        token = _current.set(profile)
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers["X-DB-Queries"] = str(profile.queries)
+                headers.append(
+                    "Server-Timing",
+                    f'db;dur={profile.seconds * 1000:.2f};desc="{profile.queries} queries, {profile.commits} commits"',
+                )
+                repeated = profile.repeated(self.n_plus_one_threshold)
+                if repeated:
+                    headers["X-DB-Repeated-Queries"] = str(sum(repeated.values()))
+                    for statement, count in repeated.items():
+                        logger.warning(
+                            "Possible N+1 in %s %s: %d× %s",
+                            scope["method"], scope["path"], count, " ".join(statement.split())[:300],
+                        )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            _current.reset(token)
+
+
+def assert_max_queries(response, limit: int) -> None:
+    """
+    Test helper: fail when a response reports more than `limit` queries.
+
+    Needs SQL_PROFILING enabled, which adds the X-DB-Queries header.
+    """
+    reported = response.headers.get("X-DB-Queries")
+    if reported is None:
+        raise AssertionError("No X-DB-Queries header; run with SQL_PROFILING=true")
+    if int(reported) > limit:
+        raise AssertionError(
+            f"{response.request.method} {response.request.url.path} ran {reported} queries, budget is {limit}"
+        )
@@ -0,0 +1,88 @@
+import json
+import logging
+from dataclasses import asdict, dataclass
+from uuid import UUID
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+# Postgres channel carrying every committed crossing, for consumers outside the API (LISTEN).
+CHANNEL = "stockmaster_stock_alerts"
+
+_handlers = []
+
+
+@dataclass(frozen=True)
+class StockThresholdCrossed:
+    """A stock move took a product below its min_stock_level (below=True) or back up to it."""
+    product_id: UUID
+    current_stock: int
+    min_stock_level: int
+    below: bool
+
+
+def subscribe(handler) -> None:
+    """Register a handler called with every StockThresholdCrossed after its transaction commits."""
+    _handlers.append(handler)
+
+
+def is_low(current_stock: int | None, min_stock_level: int | None) -> bool:
+    """Same test as GET /products/low-stock: current_stock < min_stock_level, false when either is NULL."""
+    return current_stock is not None and min_stock_level is not None and current_stock < min_stock_level
+
+
+def record_stock_levels(db: Session, levels) -> None:
+    """
+    Queue an event for every product a stock change moved across its threshold.
+
+    Args:
+        db: Session whose transaction made the change; events are dropped on rollback
+        levels: (product_id, new current_stock, min_stock_level, applied delta) per product
+    """
+    for product_id, current_stock, min_stock_level, delta in levels:
+        below = is_low(current_stock, min_stock_level)
+        if below != is_low(current_stock - delta, min_stock_level):
+            queue_crossing(db, StockThresholdCrossed(product_id, current_stock, min_stock_level, below))
+
+
+def queue_crossing(db: Session, crossing: StockThresholdCrossed) -> None:
+    db.info.setdefault("stock_alerts", []).append(crossing)
+
+
+def _payload(crossing: StockThresholdCrossed) -> str:
+    return json.dumps({**asdict(crossing), "product_id": str(crossing.product_id)})
+
+
+def log_crossing(crossing: StockThresholdCrossed) -> None:
+    if crossing.below:
+        logger.warning(
+            "Product %s fell below its minimum stock (%d < %d)",
+            crossing.product_id, crossing.current_stock, crossing.min_stock_level,
+        )
+    else:
+        logger.info("Product %s is back at or above its minimum stock", crossing.product_id)
+
+
+@event.listens_for(Session, "before_commit")
+def _notify_before_commit(session: Session) -> None:
+    for crossing in session.info.get("stock_alerts", ()):
+        session.execute(select(func.pg_notify(CHANNEL, _payload(crossing))))
+
+
+@event.listens_for(Session, "after_commit")
+def _dispatch_after_commit(session: Session) -> None:
+    for crossing in session.info.pop("stock_alerts", ()):
+        for handler in _handlers:
+            try:
+                handler(crossing)
+            except Exception:
+                logger.exception("Stock alert handler failed")
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_after_rollback(session: Session) -> None:
+    session.info.pop("stock_alerts", None)
+
+
+subscribe(log_crossing)
@@ -0,0 +1,250 @@
+from datetime import datetime, timedelta
+from fastapi import HTTPException, status
+from sqlalchemy import DateTime, Integer, String, cast, column, func, null, select, text, union_all, values
+from sqlalchemy.dialects.postgresql import UUID as PGUUID, insert
+from sqlalchemy.orm import Session
+from app.models.stock_checkpoint import StockCheckpoint
+from app.models.stock_move import StockMove
+from app.models.stock_move_archive import StockMoveArchive
+from uuid import UUID
+
+
+def archive_horizon(db: Session) -> datetime | None:
+    """Time before which stock moves were archived (None if nothing was archived)."""
+    return db.query(func.max(StockMoveArchive.range_end)).scalar()
+
+
+def latest_checkpoint(db: Session, as_of: datetime) -> datetime | None:
+    """Time of the most recent checkpoint taken at or before as_of."""
+    return db.query(func.max(StockCheckpoint.taken_at)).filter(StockCheckpoint.taken_at <= as_of).scalar()
+
+
+def _balance_entries(base: datetime | None, as_of: datetime, product_ids: list[UUID] | None, horizon: datetime | None):
+    """
+    Signed (product_id, location, quantity) entries whose sums are the balances at as_of:
+    the checkpoint taken at `base` plus every move created in (base, as_of].
+    A NULL location carries the product total.
+
+    Moves still stored with created_at before the archive horizon were written
+    after their month was archived, so the horizon checkpoint does not cover
+    them and they are replayed with the moves after it.
+    """
+    window = [StockMove.created_at <= as_of]
+    if base is not None and base == horizon:
+        window.append(StockMove.created_at != base)
+    elif base is not None:
+        window.append(StockMove.created_at > base)
+    if product_ids is not None:
+        window.append(StockMove.product_id.in_(product_ids))
+
+    parts = [
+        select(StockMove.product_id, cast(null(), String(100)).label("location"), StockMove.quantity.label("quantity"))
+        .where(*window),
+        select(StockMove.product_id, StockMove.location_dest.label("location"), StockMove.quantity.label("quantity"))
+        .where(*window, StockMove.location_dest.is_not(None)),
+        select(StockMove.product_id, StockMove.location_source.label("location"), (-StockMove.quantity).label("quantity"))
+        .where(*window, StockMove.location_source.is_not(None)),
+    ]
+    if base is not None:
+        checkpoint = select(StockCheckpoint.product_id, StockCheckpoint.location, StockCheckpoint.quantity).where(
+            StockCheckpoint.taken_at == base
+        )
+        if product_ids is not None:
+            checkpoint = checkpoint.where(StockCheckpoint.product_id.in_(product_ids))
+        parts.append(checkpoint)
+    return union_all(*parts).subquery()
+
+
+def balances_as_of(db: Session, as_of: datetime, product_ids: list[UUID] | None = None) -> dict[UUID, dict]:
+    """
+    Ledger balances at as_of, replayed from the nearest earlier checkpoint.
+
+    Returns:
+        {product_id: {"quantity": total, "locations": {location: quantity}}} for
+        products with any balance; products that are absent have a zero balance
+
+    Raises:
+        HTTPException: 410 if as_of falls in the archived stock move history
+    """
+    horizon = archive_horizon(db)
+    if horizon is not None and as_of < horizon:
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE,
+            detail=f"Stock moves before {horizon.isoformat()} are archived",
+        )
+    entries = _balance_entries(latest_checkpoint(db, as_of), as_of, product_ids, horizon)
+    rows = db.execute(
+        select(entries.c.product_id, entries.c.location, func.sum(entries.c.quantity))
+        .group_by(entries.c.product_id, entries.c.location)
+    ).all()
+
+    balances = {}
+    for product_id, location, quantity in rows:
+        balance = balances.setdefault(product_id, {"quantity": 0, "locations": {}})
+        if location is None:
+            balance["quantity"] = quantity
+        elif quantity:
+            balance["locations"][location] = quantity
+    return balances
+
+
+def create_checkpoint(db: Session, taken_at: datetime) -> int:
+    """
+    Snapshot every non-zero product and per-location balance at taken_at.
+
+    The snapshot is computed in one INSERT ... SELECT from the previous
+    checkpoint plus the moves since, so its cost does not grow with the ledger.
+
+    Returns:
+        Number of balance rows written
+    """
+    entries = _balance_entries(latest_checkpoint(db, taken_at), taken_at, None, archive_horizon(db))
+    total = func.sum(entries.c.quantity)
+    return db.execute(
+        insert(StockCheckpoint).from_select(
+            ["taken_at", "product_id", "location", "quantity"],
+            select(cast(taken_at, StockCheckpoint.taken_at.type), entries.c.product_id, entries.c.location, total)
+            .group_by(entries.c.product_id, entries.c.location)
+            .having(total != 0),
+        )
+    ).rowcount
+
+
+def create_checkpoint_if_due(db: Session, interval: timedelta, lag: timedelta, force: bool = False) -> datetime | None:
+    """
+    Take a checkpoint when the latest one is older than `interval`.
+
+    The checkpoint is placed `lag` in the past so that moves from transactions
+    still in flight are not missed.
+
+    Returns:
+        The checkpoint time, or None if no checkpoint was due
+    """
+    taken_at = db.scalar(select(func.now())) - lag
+    latest = latest_checkpoint(db, taken_at)
+    if not force and latest is not None and taken_at - latest < interval:
+        return None
+    create_checkpoint(db, taken_at)
+    return taken_at
+
+
+def _checkpoints_since(db: Session, since: datetime) -> list[datetime]:
+    """
+    Times of the checkpoints taken at or after `since`, skipping the one at the
+    archive horizon: it stands in for the archived moves and is never replayed over.
+    Walks the taken_at index one checkpoint at a time rather than scanning their rows.
+    """
+    return list(db.scalars(text("""
+        WITH RECURSIVE taken (taken_at) AS (
+            (SELECT taken_at FROM stock_checkpoints
+             WHERE taken_at >= :since
+               AND taken_at > coalesce((SELECT max(range_end) FROM stock_move_archives), '-infinity')
+             ORDER BY taken_at LIMIT 1)
+            UNION ALL
+            SELECT (SELECT c.taken_at FROM stock_checkpoints c WHERE c.taken_at > t.taken_at ORDER BY c.taken_at LIMIT 1)
+            FROM taken t WHERE t.taken_at IS NOT NULL
+        )
+        SELECT taken_at FROM taken WHERE taken_at IS NOT NULL
+    """), {"since": since}))
+
+
+def _upsert_checkpoint_rows(db: Session, rows, keys: list[str], index_where=None) -> None:
+    stmt = insert(StockCheckpoint).from_select(["taken_at", "product_id", "location", "quantity"], rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=keys,
+        index_where=index_where,
+        set_={"quantity": StockCheckpoint.quantity + stmt.excluded.quantity},
+    )
+    db.execute(stmt)
+
+
+def _shift_checkpoints(db: Session, moves, since: datetime | None) -> None:
+    """Add the signed quantities of `moves` to every checkpoint taken at or after each move."""
+    taken = _checkpoints_since(db, since) if since is not None else []
+    if not taken:
+        return
+    checkpoints = values(column("taken_at", DateTime(timezone=True)), name="checkpoints").data([(t,) for t in taken])
+
+    # Product totals (NULL location) and per-location balances are upserted
+    # separately, each against its own unique index. Rows go in key order, so
+    # concurrent writers lock checkpoint rows in the same order.
+    total = func.sum(moves.c.quantity)
+    _upsert_checkpoint_rows(
+        db,
+        select(checkpoints.c.taken_at, moves.c.product_id, cast(null(), String(100)), total)
+        .join_from(checkpoints, moves, checkpoints.c.taken_at >= moves.c.created_at)
+        .group_by(checkpoints.c.taken_at, moves.c.product_id)
+        .having(total != 0)
+        .order_by(checkpoints.c.taken_at, moves.c.product_id),
+        ["taken_at", "product_id"],
+        StockCheckpoint.location.is_(None),
+    )
+    entries = union_all(
+        select(moves.c.created_at, moves.c.product_id, moves.c.location_dest.label("location"), moves.c.quantity)
+        .where(moves.c.location_dest.is_not(None)),
+        select(moves.c.created_at, moves.c.product_id, moves.c.location_source.label("location"), -moves.c.quantity)
+        .where(moves.c.location_source.is_not(None)),
+    ).subquery()
+    keys = (checkpoints.c.taken_at, entries.c.product_id, entries.c.location)
+    total = func.sum(entries.c.quantity)
+    _upsert_checkpoint_rows(
+        db,
+        select(*keys, total)
+        .join_from(checkpoints, entries, checkpoints.c.taken_at >= entries.c.created_at)
+        .group_by(*keys)
+        .having(total != 0)
+        .order_by(*keys),
+        ["taken_at", "product_id", "location"],
+    )
+
+
+def adjust_checkpoints(db: Session, added=(), removed=()) -> None:
+    """
+    Carry stock moves inserted, edited or deleted after the fact into the
+    checkpoints taken since they were created, so those keep matching the
+    ledger and point-in-time queries still replay from the nearest one.
+    Only the moves' products and locations are touched. Runs in the caller's
+    transaction, after the products were locked.
+
+    Args:
+        db: Database session
+        added: Moves (objects or rows with product_id, quantity, location_source, location_dest and created_at) to add
+        removed: Moves to subtract
+    """
+    rows = [
+        (move.product_id, sign * move.quantity, move.location_source, move.location_dest, move.created_at)
+        for moves, sign in ((added, 1), (removed, -1))
+        for move in moves
+        if move.created_at is not None
+    ]
+    if not rows:
+        return
+    moves = values(
+        column("product_id", PGUUID(as_uuid=True)),
+        column("quantity", Integer),
+        column("location_source", String(100)),
+        column("location_dest", String(100)),
+        column("created_at", DateTime(timezone=True)),
+        name="moves",
+    ).data(rows)
+    _shift_checkpoints(db, moves, min(row[4] for row in rows))
+
+
+def adjust_checkpoints_from(db: Session, moves, sign: int = 1) -> None:
+    """
+    adjust_checkpoints for moves selected in the database, such as the moves
+    of an import or of a deleted operation.
+
+    Args:
+        db: Database session
+        moves: Subquery or table with product_id, quantity, location_source, location_dest and created_at
+        sign: 1 to add the moves, -1 to subtract them
+    """
+    signed = select(
+        moves.c.product_id,
+        (moves.c.quantity * sign).label("quantity"),
+        moves.c.location_source,
+        moves.c.location_dest,
+        moves.c.created_at,
+    ).subquery("moves")
+    _shift_checkpoints(db, signed, db.scalar(select(func.min(moves.c.created_at))))
@@ -0,0 +1,170 @@
+import gzip
+import logging
+import os
+import re
+from datetime import date, datetime, time, timezone
+from sqlalchemy import delete, exists, select, text
+from sqlalchemy.orm import Session
+from app.models.stock_checkpoint import StockCheckpoint
+from app.models.stock_move_archive import StockMoveArchive
+from app.utils.bulk_io import copy_out
+from app.utils.stock_checkpoints import archive_horizon, create_checkpoint
+
+logger = logging.getLogger(__name__)
+
+# stock_moves is range-partitioned by month on created_at, in UTC; rows outside
+# every monthly partition land in the default partition.
+DEFAULT_PARTITION = "stock_moves_default"
+PARTITION_NAME = re.compile(r"^stock_moves_p(\d{4})(\d{2})$")
+COLUMNS = "id, operation_id, product_id, quantity, location_source, location_dest, created_at"
+
+
+def month_of(moment: datetime | date) -> date:
+    """First day of the UTC month containing moment."""
+    if isinstance(moment, datetime):
+        moment = moment.astimezone(timezone.utc)
+    return date(moment.year, moment.month, 1)
+
+
+def add_months(month: date, count: int) -> date:
+    months = month.year * 12 + month.month - 1 + count
+    return date(months // 12, months % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"stock_moves_p{month:%Y%m}"
+
+
+def _bounds(month: date) -> tuple[datetime, datetime]:
+    return (
+        datetime.combine(month, time.min, tzinfo=timezone.utc),
+        datetime.combine(add_months(month, 1), time.min, tzinfo=timezone.utc),
+    )
+
+
+def partitions(db: Session) -> list[date]:
+    """Months that have a partition attached to stock_moves, oldest first."""
+    names = db.execute(text("""
+        SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'stock_moves'::regclass
+    """)).scalars()
+    matches = (PARTITION_NAME.match(name) for name in names)
+    return sorted(date(int(match[1]), int(match[2]), 1) for match in matches if match)
+
+
+def create_partition(db: Session, month: date) -> None:
+    """
+    Add the partition of a month to stock_moves.
+
+    Moves of that month already sitting in the default partition are moved
+    into the new table before it is attached. Deleting and inserting them
+    directly in the partitions does not fire the change log or rollup
+    triggers, which are defined on stock_moves itself.
+    """
+    name = partition_name(month)
+    start, end = _bounds(month)
+    bounds = f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    db.execute(text(f"LOCK TABLE {DEFAULT_PARTITION} IN SHARE ROW EXCLUSIVE MODE"))
+    in_month = f"created_at >= '{start.isoformat()}' AND created_at < '{end.isoformat()}'"
+    if not db.scalar(text(f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} WHERE {in_month})")):
+        db.execute(text(f"CREATE TABLE {name} PARTITION OF stock_moves {bounds}"))
+        return
+
+    db.execute(text(f"CREATE TABLE {name} (LIKE stock_moves INCLUDING DEFAULTS)"))
+    db.execute(text(f"""
+        WITH moved AS (
+            DELETE FROM {DEFAULT_PARTITION} WHERE {in_month} RETURNING {COLUMNS}
+        )
+        INSERT INTO {name} ({COLUMNS}) SELECT {COLUMNS} FROM moved
+    """))
+    db.execute(text(f"ALTER TABLE stock_moves ATTACH PARTITION {name} {bounds}"))
+
+
+def ensure_partitions(db: Session, first: date, last: date) -> list[str]:
+    """
+    Create the missing monthly partitions from `first` through `last`.
+    Months before the archive horizon are skipped, they stay archived.
+
+    Returns:
+        Names of the partitions created
+    """
+    horizon = archive_horizon(db)
+    if horizon is not None:
+        first = max(first, month_of(horizon))
+    existing = set(partitions(db))
+    created = []
+    month = month_of(first)
+    while month <= last:
+        if month not in existing:
+            create_partition(db, month)
+            created.append(partition_name(month))
+        month = add_months(month, 1)
+    return created
+
+
+def archive_partition(db: Session, month: date, archive_dir: str) -> StockMoveArchive:
+    """
+    Export a month of stock moves to a gzipped CSV file, then detach and drop its partition.
+
+    A checkpoint is taken at the end of the month first, so balances, quant
+    rebuilds and later checkpoints start from it instead of the dropped moves.
+    Moves of earlier months left in the default partition are archived along.
+    Daily rollups are kept, so movement reports still cover archived months.
+    Older checkpoints are deleted, they can no longer be replayed. Commit
+    right after the call: the detach locks stock_moves until then.
+
+    Args:
+        db: Database session
+        month: First day of the month to archive; earlier months must be archived already
+        archive_dir: Directory of the archive files
+
+    Returns:
+        The archive record, added to the session
+
+    Raises:
+        ValueError: The month has no partition, or older partitions are still attached
+    """
+    name = partition_name(month)
+    start, end = _bounds(month)
+    existing = partitions(db)
+    if month not in existing:
+        raise ValueError(f"stock_moves has no partition {name}")
+    if existing[0] != month:
+        raise ValueError(f"Archive the partitions before {name} first")
+    db.execute(text(f"LOCK TABLE {name}, {DEFAULT_PARTITION} IN SHARE MODE"))
+    if not db.scalar(select(exists().where(StockCheckpoint.taken_at == end))):
+        create_checkpoint(db, end)
+
+    before_end = f"created_at < '{end.isoformat()}'"
+    moves = f"""
+        SELECT {COLUMNS} FROM {name}
+        UNION ALL SELECT {COLUMNS} FROM {DEFAULT_PARTITION} WHERE {before_end}
+    """
+    count = db.scalar(text(f"SELECT count(*) FROM ({moves}) AS m"))
+    os.makedirs(archive_dir, exist_ok=True)
+    path = os.path.join(archive_dir, f"{name}.csv.gz")
+    partial = f"{path}.partial"
+    copy_sql = f"COPY ({moves} ORDER BY created_at, id) TO STDOUT WITH (FORMAT csv, HEADER)"
+    with open(partial, "wb") as raw:
+        with gzip.GzipFile(fileobj=raw, mode="wb") as file:
+            for chunk in copy_out(db, copy_sql):
+                file.write(chunk)
+        raw.flush()
+        os.fsync(raw.fileno())
+    os.replace(partial, path)
+
+    db.execute(text(f"DELETE FROM {DEFAULT_PARTITION} WHERE {before_end}"))
+    db.execute(text(f"ALTER TABLE stock_moves DETACH PARTITION {name}"))
+    db.execute(text(f"DROP TABLE {name}"))
+    db.execute(delete(StockCheckpoint).where(StockCheckpoint.taken_at < end))
+    archive = StockMoveArchive(partition_name=name, range_start=start, range_end=end, path=path, moves=count)
+    db.add(archive)
+    db.flush()
+    logger.info("Archived %d stock moves of %s to %s", count, f"{month:%Y-%m}", path)
+    return archive
+
+
+def archivable_partitions(db: Session, retention_months: int, now: datetime) -> list[date]:
+    """Monthly partitions older than the current month and the retention_months before it, oldest first."""
+    cutoff = add_months(month_of(now), -retention_months)
+    return [month for month in partitions(db) if month < cutoff]
@@ -0,0 +1,99 @@
+from collections import defaultdict
+from sqlalchemy import delete, func, insert as sql_insert, select, text, union_all
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from app.models.stock_checkpoint import StockCheckpoint
+from app.models.stock_move import StockMove
+from app.models.stock_quant import StockQuant
+from app.utils.stock_checkpoints import archive_horizon
+from uuid import UUID
+
+
+def quant_deltas(moves, sign: int = 1) -> dict[tuple[UUID, str], int]:
+    """
+    Per-(product, location) quantity changes caused by stock moves.
+
+    Args:
+        moves: Objects or rows with product_id, quantity, location_source and location_dest
+        sign: 1 to apply the moves, -1 to reverse them
+
+    Returns:
+        Delta keyed by (product_id, location); the source loses what the destination gains
+    """
+    deltas = defaultdict(int)
+    for move in moves:
+        quantity = sign * move.quantity
+        if move.location_source is not None:
+            deltas[(move.product_id, move.location_source)] -= quantity
+        if move.location_dest is not None:
+            deltas[(move.product_id, move.location_dest)] += quantity
+    return deltas
+
+
+def apply_quant_deltas(db: Session, deltas: dict[tuple[UUID, str], int]) -> None:
+    """
+    Add per-location deltas to stock_quants inside the caller's transaction.
+
+    Rows are upserted with one INSERT ... ON CONFLICT DO UPDATE in key order,
+    so concurrent writers lock quants in the same order.
+    """
+    rows = [
+        {"product_id": product_id, "location": location, "quantity": quantity}
+        for (product_id, location), quantity in sorted(deltas.items())
+        if quantity
+    ]
+    if not rows:
+        return
+
+    stmt = insert(StockQuant).values(rows)
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[StockQuant.product_id, StockQuant.location],
+        set_={
+            "quantity": StockQuant.quantity + stmt.excluded.quantity,
+            "last_updated": func.now(),
+        },
+    ))
+
+
+def rebuild_stock_quants(db: Session) -> int:
+    """
+    Regenerate stock_quants from the stock move ledger with one GROUP BY.
+
+    The table is locked against concurrent quant updates for the duration of
+    the caller's transaction; moves committed afterwards apply their own deltas.
+    Once moves were archived, the per-location balances of the checkpoint at
+    the archive horizon stand in for them.
+
+    Returns:
+        Number of quant rows written
+    """
+    db.execute(text("LOCK TABLE stock_quants IN EXCLUSIVE MODE"))
+    db.execute(delete(StockQuant))
+
+    horizon = archive_horizon(db)
+    window = [] if horizon is None else [StockMove.created_at != horizon]
+    parts = [
+        select(
+            StockMove.product_id,
+            StockMove.location_dest.label("location"),
+            StockMove.quantity.label("quantity"),
+        ).where(StockMove.location_dest.is_not(None), *window),
+        select(
+            StockMove.product_id,
+            StockMove.location_source.label("location"),
+            (-StockMove.quantity).label("quantity"),
+        ).where(StockMove.location_source.is_not(None), *window),
+    ]
+    if horizon is not None:
+        parts.append(
+            select(StockCheckpoint.product_id, StockCheckpoint.location, StockCheckpoint.quantity)
+            .where(StockCheckpoint.taken_at == horizon, StockCheckpoint.location.is_not(None))
+        )
+    ledger = union_all(*parts).subquery()
+    return db.execute(
+        sql_insert(StockQuant).from_select(
+            ["product_id", "location", "quantity"],
+            select(ledger.c.product_id, ledger.c.location, func.sum(ledger.c.quantity))
+            .group_by(ledger.c.product_id, ledger.c.location),
+        )
+    ).rowcount
@@ -1,18 +1,125 @@
+from sqlalchemy import Integer, column, func, select, update, values
+from sqlalchemy.dialects.postgresql import UUID as PGUUID
 from sqlalchemy.orm import Session
 from app.models.product import Product
+from app.utils.catalog import mark_catalog_changed
+from app.utils.product_cache import invalidate_products
+from app.utils.stock_alerts import record_stock_levels
+from app.utils.stock_quants import apply_quant_deltas, quant_deltas
 from uuid import UUID
 
 
-def update_stock_levels(db: Session, product_id: UUID, quantity: int) -> None:
+def update_stock_levels(db: Session, product_id: UUID, quantity: int) -> int | None:
     """
-    Update product stock levels after a stock move is created.
-    
+    Add a quantity to a product's stock inside the caller's transaction.
+
+    The increment runs in the database as a single UPDATE ... RETURNING, so
+    concurrent moves on the same product queue on the row lock instead of
+    overwriting each other. Crossing min_stock_level queues a stock alert.
+    The caller commits.
+
     Args:
         db: Database session
         product_id: UUID of the product
         quantity: Quantity to add/subtract
+
+    Returns:
+        The new stock level, or None if the product does not exist
+    """
+    mark_catalog_changed(db)
+    invalidate_products(db, [product_id])
+    row = db.execute(
+        update(Product)
+        .where(Product.id == product_id)
+        .values(current_stock=func.coalesce(Product.current_stock, 0) + quantity)
+        .returning(Product.current_stock, Product.min_stock_level)
+    ).one_or_none()
+    if row is None:
+        return None
+    record_stock_levels(db, [(product_id, row.current_stock, row.min_stock_level, quantity)])
+    return row.current_stock
+
+
+def lock_products(db: Session, product_ids) -> None:
+    """
+    Lock product rows in id order for the rest of the caller's transaction.
+
+    Take the locks before writing stock moves: the moves' rollup triggers lock
+    rollup rows, and every stock write path must lock products first.
+    """
+    db.execute(
+        select(Product.id).where(Product.id.in_(sorted(set(product_ids)))).order_by(Product.id).with_for_update()
+    )
+
+
+def apply_stock_deltas(db: Session, deltas: dict[UUID, int]) -> dict[UUID, int]:
+    """
+    Apply net stock deltas to many products inside the caller's transaction.
+
+    Product rows are locked in id order first, so concurrent callers touching
+    overlapping products always acquire the locks in the same order and cannot
+    deadlock. All deltas are then applied with one UPDATE ... FROM (VALUES ...).
+    Products crossing min_stock_level queue stock alerts.
+
+    Args:
+        db: Database session
+        deltas: Net quantity to add per product id
+
+    Returns:
+        New stock level per product id; products that do not exist are absent
+    """
+    if not deltas:
+        return {}
+
+    mark_catalog_changed(db)
+    invalidate_products(db, deltas)
+    product_ids = sorted(deltas)
+    lock_products(db, product_ids)
+    delta_rows = values(
+        column("product_id", PGUUID(as_uuid=True)),
+        column("delta", Integer),
+        name="deltas",
+    ).data([(product_id, deltas[product_id]) for product_id in product_ids])
+    rows = db.execute(
+        update(Product)
+        .where(Product.id == delta_rows.c.product_id)
+        .values(current_stock=func.coalesce(Product.current_stock, 0) + delta_rows.c.delta)
+        .returning(Product.id, Product.current_stock, Product.min_stock_level)
+    ).all()
+    record_stock_levels(db, [(product_id, current, minimum, deltas[product_id]) for product_id, current, minimum in rows])
+    return {product_id: current_stock for product_id, current_stock, _ in rows}
+
+
+def apply_stock_moves(db: Session, added=(), removed=()) -> dict[UUID, int]:
     """
-    product = db.query(Product).filter(Product.id == product_id).first()
-    if product:
-        product.current_stock += quantity
-        db.commit()
+    Apply the stock effect of stock moves to current_stock and stock_quants together.
+
+    Every path that writes stock moves goes through here, so the product
+    totals and the per-location quants cannot drift apart. Runs in the
+    caller's transaction; the caller commits.
+
+    Args:
+        db: Database session
+        added: Moves (objects or rows with product_id, quantity, location_source and location_dest) to apply
+        removed: Moves to reverse
+
+    Returns:
+        New stock level per product id; products that do not exist are absent
+    """
+    deltas = {}
+    for moves, sign in ((added, 1), (removed, -1)):
+        for move in moves:
+            deltas[move.product_id] = deltas.get(move.product_id, 0) + sign * move.quantity
+    if len(deltas) == 1:
+        [(product_id, quantity)] = deltas.items()
+        current_stock = update_stock_levels(db, product_id, quantity)
+        stock = {} if current_stock is None else {product_id: current_stock}
+    else:
+        stock = apply_stock_deltas(db, deltas)
+
+    quants = quant_deltas(added)
+    for key, quantity in quant_deltas(removed, sign=-1).items():
+        quants[key] += quantity
+    # Products that do not exist are left to the caller's 404.
+    apply_quant_deltas(db, {key: quantity for key, quantity in quants.items() if key[0] in stock})
+    return stock
@@ -0,0 +1,170 @@
+import enum
+from datetime import datetime
+from uuid import UUID
+from fastapi import HTTPException, status
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from app.models.product import Product
+from app.models.operation import Operation
+from app.models.stock_move import StockMove
+from app.models.stock_move_id import StockMoveId
+from app.utils.catalog import mark_catalog_changed
+from app.utils.product_cache import invalidate_products
+from app.utils.stock_checkpoints import adjust_checkpoints
+from app.utils.stock_update import apply_stock_moves, lock_products
+
+
+class ConflictPolicy(str, enum.Enum):
+    skip = "skip"
+    last_write_wins = "last_write_wins"
+
+
+# Entities in dependency order: stock moves reference both products and operations.
+SYNC_ENTITIES = (
+    ("products", Product),
+    ("operations", Operation),
+    ("stock_moves", StockMove),
+)
+
+
+def _parse_value(column, value):
+    """Parse JSON strings into the UUID/datetime values strict drivers (asyncpg) expect."""
+    if not isinstance(value, str):
+        return value
+    python_type = column.type.python_type
+    try:
+        if python_type is datetime:
+            return datetime.fromisoformat(value)
+        if python_type is UUID:
+            return UUID(value)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Invalid value for {column.table.name}.{column.key}",
+        )
+    return value
+
+
+def _clean_rows(model, rows: list[dict]) -> list[dict]:
+    """
+    Drop unknown keys, parse typed values and collapse duplicate ids (the last occurrence wins).
+    Null primary key parts with a server default (stock move created_at) are left to the default.
+    """
+    columns = model.__table__.columns
+    deduped = {}
+    anonymous = []
+    for row in rows:
+        clean = {
+            key: _parse_value(columns[key], value)
+            for key, value in row.items()
+            if key in columns and not (value is None and columns[key].primary_key and columns[key].server_default)
+        }
+        if clean.get("id") is None:
+            anonymous.append(clean)
+        else:
+            deduped[str(clean["id"])] = clean
+    return list(deduped.values()) + anonymous
+
+
+def _batches(rows: list[dict], batch_size: int):
+    """Yield row groups of at most batch_size that share the same set of keys."""
+    for start in range(0, len(rows), batch_size):
+        shapes = {}
+        for row in rows[start:start + batch_size]:
+            shapes.setdefault(tuple(sorted(row)), []).append(row)
+        yield from shapes.values()
+
+
+def _claim_stock_move_ids(db: Session, rows: list[dict]) -> list[dict]:
+    """
+    Drop stock moves whose id is already stored. The stock_moves primary key
+    also holds the partition key, so ON CONFLICT alone would not catch a resent
+    move whose created_at was left to the server. Claiming the ids in
+    stock_move_ids instead is atomic: a concurrent push of the same move waits
+    for this transaction and then finds the id taken.
+    """
+    ids = sorted({row["id"] for row in rows if row.get("id") is not None})
+    if not ids:
+        return rows
+    claimed = set(db.scalars(
+        insert(StockMoveId).values([{"id": id} for id in ids]).on_conflict_do_nothing().returning(StockMoveId.id)
+    ))
+    return [row for row in rows if row.get("id") is None or row["id"] in claimed]
+
+
+def _upsert_statement(model, keys: tuple, policy: ConflictPolicy):
+    stmt = insert(model)
+    table = model.__table__
+    if policy is ConflictPolicy.last_write_wins and "last_updated" in table.c:
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(table.primary_key),
+            set_={key: stmt.excluded[key] for key in keys if key != "id"},
+            where=table.c.last_updated < stmt.excluded.last_updated,
+        )
+    else:
+        stmt = stmt.on_conflict_do_nothing(index_elements=list(table.primary_key))
+    return stmt.returning(*table.c)
+
+
+def upsert_rows(
+    db: Session,
+    model,
+    rows: list[dict],
+    policy: ConflictPolicy = ConflictPolicy.skip,
+    batch_size: int = 500,
+) -> list:
+    """
+    Insert or update rows with one multi-row INSERT ... ON CONFLICT per batch.
+
+    Args:
+        db: Database session
+        model: Mapped model class the rows belong to
+        rows: Raw row dictionaries sent by the client
+        policy: What to do when a row with the same id already exists
+        batch_size: Maximum number of rows per statement
+
+    Returns:
+        The rows that were inserted or overwritten, as stored
+    """
+    rows = _clean_rows(model, rows)
+    if model is StockMove:
+        rows = _claim_stock_move_ids(db, rows)
+    synced = []
+    for batch in _batches(rows, batch_size):
+        stmt = _upsert_statement(model, tuple(batch[0]), policy)
+        synced.extend(db.execute(stmt, batch).all())
+    return synced
+
+
+def ingest_payload(
+    db: Session,
+    payload: dict,
+    policy: ConflictPolicy = ConflictPolicy.skip,
+    batch_size: int = 500,
+) -> dict:
+    """
+    Upsert every entity list of a sync payload in dependency order.
+
+    Tables without a last_updated column (stock moves) are append-only,
+    so they always use the skip policy. Newly inserted stock moves update
+    current_stock, the per-location stock quants and the stock checkpoints they
+    predate (offline moves usually arrive late) in the same transaction.
+
+    Returns:
+        Synced ids keyed by entity name
+    """
+    synced_ids = {}
+    for name, model in SYNC_ENTITIES:
+        if model is StockMove and payload.get(name):
+            # Products are locked before the moves are written, in the same order as the other stock write paths.
+            column = StockMove.__table__.c.product_id
+            lock_products(db, [_parse_value(column, row["product_id"]) for row in payload[name] if row.get("product_id")])
+        rows = upsert_rows(db, model, payload.get(name) or [], policy, batch_size)
+        if model is Product and rows:
+            mark_catalog_changed(db)
+            invalidate_products(db, [row.id for row in rows])
+        if model is StockMove and rows:
+            apply_stock_moves(db, added=rows)
+            adjust_checkpoints(db, added=rows)
+        synced_ids[name] = [str(row.id) for row in rows]
+    return synced_ids
@@ -0,0 +1,155 @@
+from datetime import datetime
+from uuid import UUID
+import json
+import msgpack
+from fastapi import HTTPException, Request, Response, status
+from pydantic import BaseModel
+from app.config import get_settings
+from app.utils.compression import read_body
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+COLUMNAR = "application/vnd.stockmaster.columnar+msgpack"
+MEDIA_TYPES = (JSON, MSGPACK, COLUMNAR)
+_ALIASES = {"application/x-msgpack": MSGPACK, "*/*": JSON, "application/*": JSON}
+
+# msgpack extension type carrying a UUID as its 16 raw bytes.
+UUID_EXT = 1
+
+
+def _pack_default(value):
+    if isinstance(value, UUID):
+        return msgpack.ExtType(UUID_EXT, value.bytes)
+    if isinstance(value, datetime):
+        # Only naive datetimes get here; aware ones use the msgpack timestamp type.
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def _ext_hook(code: int, data: bytes):
+    if code == UUID_EXT:
+        return UUID(bytes=data)
+    return msgpack.ExtType(code, data)
+
+
+def _is_table(value) -> bool:
+    return isinstance(value, list) and all(isinstance(row, dict) for row in value)
+
+
+def _to_columns(rows: list[dict], uuids: dict) -> dict:
+    """Column-major table; columns holding only UUIDs store indexes into the shared dictionary."""
+    columns = list(dict.fromkeys(key for row in rows for key in row))
+    values = []
+    uuid_columns = []
+    for column in columns:
+        column_values = [row.get(column) for row in rows]
+        if any(value is not None for value in column_values) and all(
+            value is None or isinstance(value, UUID) for value in column_values
+        ):
+            column_values = [None if value is None else uuids.setdefault(value, len(uuids)) for value in column_values]
+            uuid_columns.append(column)
+        values.append(column_values)
+    return {"count": len(rows), "columns": columns, "uuid_columns": uuid_columns, "values": values}
+
+
+def _uuid_at(uuids: list[UUID], index) -> UUID | None:
+    if index is None:
+        return None
+    if not isinstance(index, int) or not 0 <= index < len(uuids):
+        raise ValueError(f"UUID index {index!r} out of range")
+    return uuids[index]
+
+
+def _from_columns(table: dict, uuids: list[UUID]) -> list[dict]:
+    columns = table["columns"]
+    values = table["values"]
+    for position, column in enumerate(columns):
+        if column in table["uuid_columns"]:
+            values[position] = [_uuid_at(uuids, index) for index in values[position]]
+    return [dict(zip(columns, row)) for row in zip(*values)] if columns else [{} for _ in range(table["count"])]
+
+
+def encode(payload: dict, media_type: str) -> bytes:
+    """
+    Serialize a sync payload (entity name -> list of row dicts, plus scalar fields).
+
+    Args:
+        payload: Payload with UUID and datetime values left as Python objects
+        media_type: JSON, MSGPACK or COLUMNAR
+
+    Returns:
+        The encoded body
+    """
+    if media_type == JSON:
+        return json.dumps(payload, default=str, separators=(",", ":")).encode()
+    if media_type == COLUMNAR:
+        uuids = {}
+        tables = {name: _to_columns(value, uuids) for name, value in payload.items() if _is_table(value)}
+        scalars = {name: value for name, value in payload.items() if name not in tables}
+        payload = {"uuids": [uuid.bytes for uuid in uuids], "tables": tables, "fields": scalars}
+    return msgpack.packb(payload, default=_pack_default, datetime=True)
+
+
+def decode(body: bytes, media_type: str) -> dict:
+    """Inverse of encode; UUIDs and timestamps come back as Python objects (JSON keeps strings)."""
+    if media_type == JSON:
+        return json.loads(body)
+    payload = msgpack.unpackb(body, ext_hook=_ext_hook, timestamp=3)
+    if media_type == COLUMNAR:
+        uuids = [UUID(bytes=value) for value in payload["uuids"]]
+        tables = {name: _from_columns(table, uuids) for name, table in payload["tables"].items()}
+        payload = {**payload["fields"], **tables}
+    return payload
+
+
+def _media_type(value: str) -> str | None:
+    media_type = value.split(";")[0].strip().lower()
+    media_type = _ALIASES.get(media_type, media_type)
+    return media_type if media_type in MEDIA_TYPES else None
+
+
+def negotiate(request: Request) -> str:
+    """Pick the response format from the Accept header (highest q wins, JSON by default)."""
+    best, best_q = JSON, -1.0
+    for part in request.headers.get("accept", "").split(","):
+        media_type = _media_type(part)
+        if media_type is None:
+            continue
+        q = 1.0
+        for param in part.split(";")[1:]:
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if q > best_q:
+            best, best_q = media_type, q
+    return best
+
+
+async def read_payload(request: Request) -> tuple[dict, int]:
+    """
+    Decode a request body according to its Content-Type and Content-Encoding.
+
+    Returns:
+        The payload and the size of the body once decompressed
+    """
+    media_type = _media_type(request.headers.get("content-type", JSON))
+    if media_type is None:
+        raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail="Unsupported content type")
+    body = await read_body(request, get_settings().sync_push_max_body_bytes)
+    try:
+        payload = decode(body, media_type)
+    except (ValueError, KeyError, TypeError, msgpack.UnpackException):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Malformed request body")
+    if not isinstance(payload, dict):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Malformed request body")
+    return payload, len(body)
+
+
+def wire_response(model: BaseModel, media_type: str) -> Response:
+    """Encode the model as a JSON, msgpack or columnar msgpack Response."""
+    if media_type == JSON:
+        return Response(model.model_dump_json(), media_type=JSON, headers={"Vary": "Accept"})
+    return Response(encode(model.model_dump(), media_type), media_type=media_type, headers={"Vary": "Accept"})
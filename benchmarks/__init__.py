@@ -0,0 +1 @@
+"""Benchmarks for StockMaster hot paths. Run modules with ``python -m benchmarks.<name>``."""
@@ -0,0 +1,78 @@
+"""
+Per-request overhead of authenticating with a signed access token.
+
+Times, per call:
+  - token:    validating a bearer token (signature, expiry, denylist) as get_current_user does
+  - db:       the alternative it replaces, looking the user up by email
+  - /health:  an unauthenticated request through the ASGI app, as a baseline
+  - /auth/me: the same request going through the auth dependency
+
+Needs one user in the configured database.
+
+    python -m benchmarks.auth_overhead --iterations 20000
+"""
+import argparse
+import asyncio
+import time
+import httpx
+from app.database import SessionLocal
+from app.main import app
+from app.models.user import User
+from app.utils.auth import create_tokens, decode_token, token_denylist
+
+
+def _per_call(label: str, elapsed: float, iterations: int) -> None:
+    print(f"{label:<10} {elapsed / iterations * 1e6:9.1f} µs/call")
+
+
+async def _requests(path: str, headers: dict, iterations: int) -> float:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        assert (await client.get(path, headers=headers)).status_code == 200
+        started = time.perf_counter()
+        for _ in range(iterations):
+            await client.get(path, headers=headers)
+        return time.perf_counter() - started
+
+
+def run(iterations: int, denylist_size: int) -> None:
+    db = SessionLocal()
+    try:
+        user = db.query(User).first()
+        if user is None:
+            raise SystemExit("Create a user first (POST /users/)")
+        for i in range(denylist_size):
+            token_denylist.add(f"bench-{i}", time.time() + 3600)
+        token = create_tokens(user)["access_token"]
+
+        started = time.perf_counter()
+        for _ in range(iterations):
+            decode_token(token)
+        _per_call("token", time.perf_counter() - started, iterations)
+
+        started = time.perf_counter()
+        for _ in range(iterations):
+            db.query(User).filter(User.email == user.email).first()
+            db.rollback()
+        _per_call("db", time.perf_counter() - started, iterations)
+    finally:
+        db.close()
+
+    headers = {"Authorization": f"Bearer {token}"}
+    health = asyncio.run(_requests("/health", {}, iterations))
+    me = asyncio.run(_requests("/auth/me", headers, iterations))
+    _per_call("/health", health, iterations)
+    _per_call("/auth/me", me, iterations)
+    print(f"auth dependency adds {(me - health) / iterations * 1e6:.1f} µs per request")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--denylist-size", type=int, default=10000, help="Revoked tokens in the denylist")
+    args = parser.parse_args()
+    run(args.iterations, args.denylist_size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Product onboarding throughput: COPY import vs one POST /products/ per row.
+
+Imports --rows generated SKUs through import_products and creates --api-rows
+more through the POST /products/ handler, one transaction each, then reports
+rows/sec for both. The rows are deleted afterwards.
+
+    python -m benchmarks.bulk_import --rows 200000 --api-rows 2000
+"""
+import argparse
+import io
+import time
+import uuid
+from app.database import SessionLocal
+from app.models.product import Product
+from app.routers.products import _create_product
+from app.schemas.product import ProductCreate
+from app.utils.bulk_io import BulkFormat, import_products
+
+
+def _csv(prefix: str, rows: int) -> io.BytesIO:
+    lines = ["sku,name,category,min_stock_level\n"]
+    lines.extend(f"{prefix}{i},Onboarded item {i},Bulk,{i % 25}\n" for i in range(rows))
+    return io.BytesIO("".join(lines).encode())
+
+
+def run(rows: int, api_rows: int) -> None:
+    prefix = f"ONBOARD-{uuid.uuid4().hex[:8]}-"
+    db = SessionLocal()
+    try:
+        file = _csv(prefix, rows)
+        started = time.perf_counter()
+        result = import_products(db, file, BulkFormat.csv)
+        db.commit()
+        copy_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for i in range(api_rows):
+            _create_product(db, ProductCreate(name=f"Posted item {i}", sku=f"{prefix}api-{i}"))
+        api_seconds = time.perf_counter() - started
+
+        print(f"{'path':<16} {'rows':>8} {'seconds':>9} {'rows/s':>9}")
+        print(f"{'COPY import':<16} {result['inserted']:>8} {copy_seconds:>9.2f} {result['inserted'] / copy_seconds:>9.0f}")
+        print(f"{'POST /products/':<16} {api_rows:>8} {api_seconds:>9.2f} {api_rows / api_seconds:>9.0f}")
+    finally:
+        db.rollback()
+        db.query(Product).filter(Product.sku.startswith(prefix)).delete(synchronize_session=False)
+        db.commit()
+        db.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--api-rows", type=int, default=2000)
+    args = parser.parse_args()
+    run(args.rows, args.api_rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Load-test comparison of the sync and async database modes.
+
+Starts the API under uvicorn once with DB_ASYNC=false and once with
+DB_ASYNC=true, drives both with the same concurrent mix of product reads,
+product list pages and stock move writes, and reports requests/sec and
+p50/p99 latency for each mode.
+
+    python -m benchmarks.db_modes --concurrency 64 --requests 5000
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+import httpx
+
+
+def _start_server(db_async: bool, port: int) -> subprocess.Popen:
+    env = dict(os.environ, DB_ASYNC="true" if db_async else "false")
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        env=env,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/health").status_code == 200:
+                return server
+        except httpx.TransportError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError("uvicorn did not start")
+
+
+async def _setup(client: httpx.AsyncClient) -> tuple[str, str]:
+    product = await client.post("/products/", json={"name": "Mode bench", "sku": f"BENCH-{uuid.uuid4().hex[:12]}"})
+    operation = await client.post("/operations/", json={"type": "adjustment", "reference_code": "BENCH/DB-MODES"})
+    return product.json()["id"], operation.json()["id"]
+
+
+async def _load(port: int, concurrency: int, requests: int) -> tuple[float, list[float]]:
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=60) as client:
+        product_id, operation_id = await _setup(client)
+        calls = [
+            lambda: client.get(f"/products/{product_id}"),
+            lambda: client.get("/products/", params={"limit": 50}),
+            lambda: client.post(
+                "/stock-moves/",
+                json={"operation_id": operation_id, "product_id": product_id, "quantity": 1},
+            ),
+        ]
+        latencies = []
+        remaining = iter(range(requests))
+
+        async def worker():
+            for i in remaining:
+                started = time.perf_counter()
+                response = await calls[i % len(calls)]()
+                latencies.append(time.perf_counter() - started)
+                response.raise_for_status()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+        await client.delete(f"/operations/{operation_id}")
+        await client.delete(f"/products/{product_id}")
+    return elapsed, latencies
+
+
+def run(concurrency: int, requests: int, port: int) -> None:
+    print(f"{'mode':>6} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8}")
+    for db_async in (False, True):
+        server = _start_server(db_async, port)
+        try:
+            elapsed, latencies = asyncio.run(_load(port, concurrency, requests))
+        finally:
+            server.terminate()
+            server.wait()
+        quantiles = statistics.quantiles(latencies, n=100)
+        mode = "async" if db_async else "sync"
+        print(f"{mode:>6} {len(latencies) / elapsed:>9.0f} {quantiles[49] * 1000:>8.1f} {quantiles[98] * 1000:>8.1f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    run(args.concurrency, args.requests, args.port)
+
+
+if __name__ == "__main__":
+    main()
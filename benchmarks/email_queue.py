@@ -0,0 +1,73 @@
+"""
+Latency of OTP email delivery: inline provider calls vs the background queue.
+
+Uses the fake provider with a simulated provider round-trip, so no network
+or SendGrid account is needed. Reports how long a login waits for the email
+step, and how long the queue takes to drain with its worker pool. Some
+sends fail to exercise retries.
+
+    python -m benchmarks.email_queue --messages 500 --latency 0.2 --workers 8
+"""
+import argparse
+import statistics
+import time
+from app.utils.email import EmailMessage, EmailQueue, FakeEmailProvider
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+def report(label: str, waits: list[float]) -> None:
+    print(
+        f"{label:<8} mean {statistics.mean(waits) * 1000:8.2f} ms"
+        f"  p95 {percentile(waits, 0.95) * 1000:8.2f} ms"
+        f"  max {max(waits) * 1000:8.2f} ms"
+    )
+
+
+def run(messages: int, latency: float, workers: int, failure_rate: float, inline_sample: int) -> None:
+    provider = FakeEmailProvider(latency=latency)
+    waits = []
+    for i in range(min(inline_sample, messages)):
+        started = time.perf_counter()
+        provider.send(EmailMessage(to=f"user{i}@example.com", subject="OTP", html="123456"))
+        waits.append(time.perf_counter() - started)
+    report("inline", waits)
+
+    email_queue = EmailQueue(
+        lambda: FakeEmailProvider(latency=latency, failure_rate=failure_rate),
+        workers=workers,
+        max_size=messages,
+        retry_base_seconds=latency,
+    )
+    email_queue.start()
+    waits = []
+    started_all = time.perf_counter()
+    for i in range(messages):
+        started = time.perf_counter()
+        email_queue.enqueue(EmailMessage(to=f"user{i}@example.com", subject="OTP", html="123456"))
+        waits.append(time.perf_counter() - started)
+    report("queued", waits)
+
+    email_queue.join()
+    elapsed = time.perf_counter() - started_all
+    email_queue.stop()
+    print(f"drained {messages} messages in {elapsed:.2f}s with {workers} workers ({messages / elapsed:.0f}/s)")
+    print(f"stats: {email_queue.stats()}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.2, help="Simulated provider round-trip in seconds")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--failure-rate", type=float, default=0.05)
+    parser.add_argument("--inline-sample", type=int, default=20, help="Inline sends to time (they are slow)")
+    args = parser.parse_args()
+    run(args.messages, args.latency, args.workers, args.failure_rate, args.inline_sample)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+EXPLAIN regression check for the hot queries.
+
+Builds the queries the API actually sends (sync pull pages, keyset list
+pages, per-product move history, the operation cascade lookup, movement
+reports) and EXPLAINs them with enable_seqscan off. The planner only picks
+a sequential scan then when no index can serve the query, so any Seq Scan in
+a plan means an index is missing or no longer matches. Exits with status 1 in that case;
+tests/test_explain_plans.py runs the same check under pytest.
+
+    python -m benchmarks.explain_plans
+"""
+import argparse
+import json
+import sys
+import uuid
+from datetime import datetime, timezone
+from sqlalchemy import text
+from app.database import SessionLocal
+from app.models.change_log import ChangeLog
+from app.models.operation import Operation
+from app.models.product import Product
+from app.models.stock_move import StockMove
+from app.models.stock_move_rollup import StockMoveRollup
+from app.models.user import User
+from app.routers.operations import OPERATION_SORTS
+from app.routers.products import LOW_STOCK_SORTS, PRODUCT_SORTS
+from app.routers.reports import MOVEMENT_SORTS
+from app.routers.stock_moves import STOCK_MOVE_SORTS
+from app.routers.sync import PULL_ENTITIES, _pull_query
+from app.routers.users import USER_SORTS
+from app.utils.pagination import keyset_after
+
+SAMPLE_ID = uuid.UUID(int=0)
+SAMPLE_TIME = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def _keyset_page(query, columns, descending: bool = False):
+    values = [SAMPLE_ID if column.key == "id" else SAMPLE_TIME for column in columns]
+    order_by = [column.desc() for column in columns] if descending else list(columns)
+    return query.filter(keyset_after(columns, values, descending)).order_by(*order_by).limit(101)
+
+
+def hot_queries(db) -> dict:
+    """Name -> query for every statement that must be served by an index."""
+    queries = {}
+    for name, model, order_column, _ in PULL_ENTITIES:
+        cursor = {name: [SAMPLE_TIME.isoformat(), str(SAMPLE_ID)]}
+        queries[f"sync pull {name}"] = _pull_query(db, model, order_column, cursor, name).limit(1001)
+        since = {"since": SAMPLE_TIME.isoformat()}
+        queries[f"sync pull {name} since"] = _pull_query(db, model, order_column, since, name).limit(1001)
+
+    active_products = db.query(Product).filter(Product.is_deleted == False)
+    queries["list products by name"] = _keyset_page(active_products, PRODUCT_SORTS["name"])
+    queries["list products by last_updated"] = _keyset_page(active_products, PRODUCT_SORTS["last_updated"])
+    queries["low stock products"] = _keyset_page(
+        active_products.filter(Product.current_stock < Product.min_stock_level), LOW_STOCK_SORTS["name"]
+    )
+    queries["list operations by created_at"] = _keyset_page(
+        db.query(Operation), OPERATION_SORTS["created_at"], descending=True
+    )
+    queries["list users by created_at"] = _keyset_page(db.query(User), USER_SORTS["created_at"], descending=True)
+    queries["list stock moves"] = _keyset_page(db.query(StockMove), STOCK_MOVE_SORTS["created_at"], descending=True)
+    queries["product move history"] = _keyset_page(
+        db.query(StockMove).filter(StockMove.product_id == SAMPLE_ID),
+        STOCK_MOVE_SORTS["created_at"],
+        descending=True,
+    )
+    queries["moves since checkpoint"] = db.query(StockMove).filter(
+        StockMove.product_id.in_([SAMPLE_ID]),
+        StockMove.created_at > SAMPLE_TIME,
+    )
+    report_days = db.query(StockMoveRollup).filter(
+        StockMoveRollup.day >= SAMPLE_TIME.date(), StockMoveRollup.day <= SAMPLE_TIME.date()
+    )
+    queries["movement report"] = report_days.order_by(*MOVEMENT_SORTS["day"]).limit(101)
+    queries["product movement report"] = report_days.filter(StockMoveRollup.product_id == SAMPLE_ID).order_by(
+        *MOVEMENT_SORTS["day"]
+    ).limit(101)
+    queries["change log since seq"] = db.query(ChangeLog).filter(ChangeLog.seq > 0).order_by(ChangeLog.seq).limit(1001)
+    queries["change log pending"] = db.query(ChangeLog.id).filter(ChangeLog.seq.is_(None)).order_by(ChangeLog.id)
+    queries["operation cascade"] = db.query(StockMove).filter(StockMove.operation_id == SAMPLE_ID)
+    return queries
+
+
+def _seq_scans(plan: dict) -> list[str]:
+    found = [plan["Relation Name"]] if plan["Node Type"] == "Seq Scan" else []
+    for child in plan.get("Plans", []):
+        found.extend(_seq_scans(child))
+    return found
+
+
+def plan_seq_scans(db) -> dict[str, list[str]]:
+    """Name -> tables read by a Seq Scan in the plan of every hot query (empty when indexed)."""
+    db.execute(text("SET LOCAL enable_seqscan = off"))
+    dialect = db.get_bind().dialect
+    scans = {}
+    for name, query in hot_queries(db).items():
+        compiled = query.statement.compile(dialect=dialect, compile_kwargs={"literal_binds": True})
+        plan = db.connection().exec_driver_sql(
+            f"EXPLAIN (FORMAT JSON) {compiled}",
+            execution_options={"no_parameters": True},
+        ).scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        scans[name] = _seq_scans(plan[0]["Plan"])
+    return scans
+
+
+def run() -> bool:
+    db = SessionLocal()
+    try:
+        scans = plan_seq_scans(db)
+    finally:
+        db.rollback()
+        db.close()
+    for name, seq_scans in scans.items():
+        status = f"SEQ SCAN on {', '.join(seq_scans)}" if seq_scans else "ok"
+        print(f"{name:<40} {status}")
+    return not any(scans.values())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.parse_args()
+    sys.exit(0 if run() else 1)
+
+
+if __name__ == "__main__":
+    main()
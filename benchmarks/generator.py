@@ -0,0 +1,203 @@
+"""
+Seeded synthetic warehouse for benchmarks and load tests.
+
+Inserts N products, M operations and K stock moves whose products follow a
+Zipf distribution, so a handful of SKUs take most of the traffic as in a
+real warehouse. The same seed and sizes always produce the same SKUs,
+quantities and timestamps (row ids are random). Generated rows are tagged
+with the seed (SKU and reference prefix GEN-<seed>-), so several data sets
+can coexist and --reset removes exactly one of them.
+
+    python -m benchmarks.generator --products 5000 --operations 20000 --moves 200000 --seed 42
+    python -m benchmarks.generator --seed 42 --reset
+"""
+import argparse
+import random
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from itertools import accumulate
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.orm import Session
+from app.database import SessionLocal
+from app.models.operation import Operation, OperationStatus, OperationType
+from app.models.product import Product
+from app.models.stock_checkpoint import StockCheckpoint
+from app.models.stock_move import StockMove
+from app.models.stock_quant import StockQuant
+from app.utils.stock_checkpoints import adjust_checkpoints_from
+from app.utils.stock_quants import rebuild_stock_quants
+
+CATEGORIES = ("Hardware", "Electrical", "Plumbing", "Packaging", "Safety", "Tools", "Fasteners", "Paint")
+
+# Share of operations per type, and the sign of their stock moves.
+OPERATION_MIX = (
+    (OperationType.receipt, 0.40, 1),
+    (OperationType.delivery, 0.45, -1),
+    (OperationType.internal, 0.10, 1),
+    (OperationType.adjustment, 0.05, -1),
+)
+
+
+def prefix(seed: int) -> str:
+    """SKU and reference code prefix of the data set generated with `seed`."""
+    return f"GEN-{seed}-"
+
+
+def zipf_weights(count: int, skew: float) -> list[float]:
+    """Cumulative weights for random.choices: rank r is picked with probability ~ 1 / r**skew."""
+    return list(accumulate(1 / rank**skew for rank in range(1, count + 1)))
+
+
+def _insert(db: Session, model, rows: list[dict], batch_size: int) -> None:
+    for start in range(0, len(rows), batch_size):
+        db.execute(insert(model), rows[start:start + batch_size])
+
+
+def generate(
+    db: Session,
+    products: int,
+    operations: int,
+    moves: int,
+    seed: int = 42,
+    skew: float = 1.1,
+    days: int = 90,
+    batch_size: int = 5000,
+) -> dict:
+    """
+    Insert a synthetic data set and derive current_stock and stock_quants from it.
+
+    Args:
+        db: Database session; committed on success
+        products: Number of products; SKU rank 1 is the hottest
+        operations: Number of operations, spread over the last `days` days
+        moves: Number of stock moves, spread over the operations
+        seed: Seed of every random choice
+        skew: Zipf exponent of the SKU popularity (0: uniform)
+        days: Age of the oldest operation
+        batch_size: Rows per INSERT
+
+    Returns:
+        Row counts per table
+    """
+    rng = random.Random(seed)
+    tag = prefix(seed)
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+
+    product_rows = [
+        {
+            "id": uuid.uuid4(),
+            "name": f"Generated item {rank}",
+            "sku": f"{tag}{rank:07d}",
+            "category": rng.choice(CATEGORIES),
+            "min_stock_level": rng.choice((0, 5, 10, 20, 50)),
+        }
+        for rank in range(1, products + 1)
+    ]
+    _insert(db, Product, product_rows, batch_size)
+
+    types = [kind for kind, _, _ in OPERATION_MIX]
+    type_weights = [share for _, share, _ in OPERATION_MIX]
+    sign = {kind: direction for kind, _, direction in OPERATION_MIX}
+    operation_rows = []
+    for number in range(operations):
+        created_at = now - timedelta(seconds=rng.randrange(days * 86400))
+        operation_rows.append({
+            "id": uuid.uuid4(),
+            "reference_code": f"{tag}{number:08d}",
+            "type": rng.choices(types, type_weights)[0],
+            "status": OperationStatus.done,
+            "created_at": created_at,
+            "last_updated": created_at,
+        })
+    _insert(db, Operation, operation_rows, batch_size)
+
+    picked = rng.choices(product_rows, cum_weights=zipf_weights(products, skew), k=moves)
+    move_rows = []
+    for product in picked:
+        operation = operation_rows[rng.randrange(operations)]
+        move_rows.append({
+            "id": uuid.uuid4(),
+            "operation_id": operation["id"],
+            "product_id": product["id"],
+            "quantity": sign[operation["type"]] * rng.randint(1, 24),
+            "location_source": "partner",
+            "location_dest": "warehouse",
+            "created_at": operation["created_at"],
+        })
+    _insert(db, StockMove, move_rows, batch_size)
+    # The moves are back-dated: carry them into checkpoints already taken.
+    seeded = select(StockMove).where(StockMove.product_id.in_(select(Product.id).where(Product.sku.startswith(tag))))
+    adjust_checkpoints_from(db, seeded.subquery())
+
+    totals = (
+        select(StockMove.product_id, func.sum(StockMove.quantity).label("total"))
+        .group_by(StockMove.product_id)
+        .subquery()
+    )
+    db.execute(
+        update(Product)
+        .where(Product.id == totals.c.product_id, Product.sku.startswith(tag))
+        .values(current_stock=totals.c.total)
+    )
+    rebuild_stock_quants(db)
+    db.commit()
+    return {"products": products, "operations": operations, "stock_moves": moves}
+
+
+def reset(db: Session, seed: int) -> int:
+    """Delete the data set generated with `seed`, including benchmark rows tagged with it. Returns products removed."""
+    tag = prefix(seed)
+    product_ids = select(Product.id).where(Product.sku.startswith(tag))
+    operation_ids = select(Operation.id).where(Operation.reference_code.startswith(tag))
+    # Moves first, in one statement: left to the ON DELETE CASCADE, each operation would
+    # subtract its own moves from the rollups separately.
+    db.execute(StockMove.__table__.delete().where(StockMove.operation_id.in_(operation_ids)))
+    db.execute(Operation.__table__.delete().where(Operation.reference_code.startswith(tag)))
+    db.execute(StockMove.__table__.delete().where(StockMove.product_id.in_(product_ids)))
+    db.execute(StockQuant.__table__.delete().where(StockQuant.product_id.in_(product_ids)))
+    db.execute(StockCheckpoint.__table__.delete().where(StockCheckpoint.product_id.in_(product_ids)))
+    removed = db.execute(Product.__table__.delete().where(Product.sku.startswith(tag))).rowcount
+    db.commit()
+    return removed
+
+
+def hot_products(db: Session, seed: int, count: int) -> list[uuid.UUID]:
+    """Ids of the `count` most popular generated products, hottest first."""
+    return list(db.scalars(
+        select(Product.id).where(Product.sku.startswith(prefix(seed))).order_by(Product.sku).limit(count)
+    ))
+
+
+def dataset_size(db: Session, seed: int) -> int:
+    """Number of products generated with `seed` (0 when the data set is absent)."""
+    return db.scalar(select(func.count()).select_from(Product).where(Product.sku.startswith(prefix(seed))))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=5000)
+    parser.add_argument("--operations", type=int, default=20000)
+    parser.add_argument("--moves", type=int, default=200000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--skew", type=float, default=1.1, help="Zipf exponent of SKU popularity")
+    parser.add_argument("--days", type=int, default=90, help="History covered by the operations")
+    parser.add_argument("--reset", action="store_true", help="Only delete the data set of --seed")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        removed = reset(db, args.seed)
+        if removed:
+            print(f"removed {removed} products of seed {args.seed}")
+        if args.reset:
+            return
+        started = time.perf_counter()
+        counts = generate(db, args.products, args.operations, args.moves, args.seed, args.skew, args.days)
+        print(f"generated {counts} in {time.perf_counter() - started:.1f}s")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
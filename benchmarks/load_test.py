@@ -0,0 +1,182 @@
+"""
+Load-test runner: throughput and p50/p95/p99 latency per scenario.
+
+Generates the synthetic warehouse of --seed unless it already exists with
+--products products, runs the scenarios of benchmarks.scenarios and prints
+one line per scenario. Requests go in-process through the ASGI app (client
+and server share one event loop) or, with --url, to a running server.
+--out stores the run as JSON; --compare prints the change against earlier
+runs.
+
+    python -m benchmarks.load_test --out results/base.json
+    python -m benchmarks.load_test --url http://127.0.0.1:8000 --concurrency 64 --out results/new.json
+    python -m benchmarks.load_test --compare results/base.json results/new.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+import httpx
+from sqlalchemy import func, select
+from app.database import SessionLocal, settings
+from app.models.change_log import ChangeLog
+from app.utils.change_log import sequence_changes
+from benchmarks import generator
+from benchmarks.scenarios import SCENARIOS, Context
+
+# Figures compared between runs, and whether higher is better.
+COMPARED = (("throughput", True), ("p50_ms", False), ("p95_ms", False), ("p99_ms", False))
+
+
+def _prepare(args) -> tuple[list, int]:
+    """Generate the data set if needed; returns the hot products and the change log head."""
+    db = SessionLocal()
+    try:
+        if generator.dataset_size(db, args.seed) != args.products:
+            generator.reset(db, args.seed)
+            print(f"generating {args.products} products, {args.operations} operations, {args.moves} moves")
+            generator.generate(db, args.products, args.operations, args.moves, args.seed, args.skew)
+        hot = generator.hot_products(db, args.seed, args.hot_products)
+        sequence_changes(db)
+        db.commit()
+        head_seq = db.scalar(select(func.max(ChangeLog.seq))) or 0
+        return hot, head_seq
+    finally:
+        db.close()
+
+
+@asynccontextmanager
+async def _client(url: str | None, concurrency: int):
+    # Drop idle connections before uvicorn's 5 s keep-alive timeout closes them under us.
+    limits = httpx.Limits(max_connections=concurrency, keepalive_expiry=2)
+    if url:
+        async with httpx.AsyncClient(base_url=url, limits=limits, timeout=120) as client:
+            yield client
+        return
+    from app.main import app
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+            yield client
+
+
+def summarize(latencies: list[float], elapsed: float) -> dict:
+    """Request count, requests/sec and latency percentiles in milliseconds."""
+    if len(latencies) < 2:
+        latencies = latencies * 2 or [0.0, 0.0]
+    quantiles = statistics.quantiles(latencies, n=100, method="inclusive")
+    return {
+        "requests": len(latencies),
+        "seconds": round(elapsed, 3),
+        "throughput": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(quantiles[49] * 1000, 2),
+        "p95_ms": round(quantiles[94] * 1000, 2),
+        "p99_ms": round(quantiles[98] * 1000, 2),
+        "max_ms": round(max(latencies) * 1000, 2),
+    }
+
+
+async def _run(args, hot: list, head_seq: int) -> dict:
+    results = {}
+    async with _client(args.url, args.concurrency) as client:
+        for name in args.scenarios:
+            ctx = Context(client, args.seed, args.concurrency, args.requests, hot, head_seq, args.page_size)
+            started = time.perf_counter()
+            result = await SCENARIOS[name](ctx)
+            summary = summarize(result.latencies, time.perf_counter() - started)
+            summary.update(errors=result.errors, rows=result.rows, **result.extra)
+            results[name] = summary
+            print(
+                f"{name:<18} {summary['requests']:>7} {summary['throughput']:>9.1f} {summary['p50_ms']:>8.2f} "
+                f"{summary['p95_ms']:>8.2f} {summary['p99_ms']:>8.2f} {summary['errors']:>6}"
+            )
+    return results
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args) -> dict:
+    hot, head_seq = _prepare(args)
+    started_at = datetime.now(timezone.utc).isoformat()
+    print(f"{'scenario':<18} {'reqs':>7} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>6}")
+    results = asyncio.run(_run(args, hot, head_seq))
+    return {
+        "started_at": started_at,
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "target": args.url or "in-process",
+        "db_async": settings.db_async if not args.url else None,
+        "parameters": {
+            "seed": args.seed, "products": args.products, "operations": args.operations, "moves": args.moves,
+            "skew": args.skew, "concurrency": args.concurrency, "requests": args.requests,
+            "page_size": args.page_size,
+        },
+        "scenarios": results,
+    }
+
+
+def compare(paths: list[str]) -> None:
+    """Print each run's figures next to the first one's, with the relative change."""
+    runs = [json.loads(Path(path).read_text()) for path in paths]
+    base = runs[0]
+    for path, other in zip(paths[1:], runs[1:]):
+        print(f"{paths[0]} -> {path}")
+        for name, figures in other["scenarios"].items():
+            before = base["scenarios"].get(name)
+            if before is None:
+                continue
+            changes = []
+            for key, higher_is_better in COMPARED:
+                old, new = before[key], figures[key]
+                change = (new - old) / old * 100 if old else 0.0
+                verdict = ""
+                if abs(change) >= 5:
+                    verdict = " better" if (change > 0) == higher_is_better else " worse"
+                changes.append(f"{key} {old:g} -> {new:g} ({change:+.1f}%{verdict})")
+            print(f"  {name:<18} " + ", ".join(changes))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Base URL of a running server (default: in-process)")
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per scenario (approximate for multi-call steps)")
+    parser.add_argument("--page-size", type=int, default=500, help="limit of the sync pulls")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--products", type=int, default=5000)
+    parser.add_argument("--operations", type=int, default=20000)
+    parser.add_argument("--moves", type=int, default=200000)
+    parser.add_argument("--skew", type=float, default=1.1)
+    parser.add_argument("--hot-products", type=int, default=200, help="Most popular SKUs the write scenarios use")
+    parser.add_argument("--out", help="Write the results to this JSON file")
+    parser.add_argument("--compare", nargs="+", metavar="RESULTS", help="Compare result files instead of running")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(args.compare)
+        return
+    results = run(args)
+    if args.out:
+        os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+        Path(args.out).write_text(json.dumps(results, indent=2) + "\n")
+        print(f"results written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
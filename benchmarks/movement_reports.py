@@ -0,0 +1,84 @@
+"""
+Movement report latency: the daily rollups vs aggregating the ledger.
+
+Runs the per-category daily report of GET /reports/movements/categories over
+the last --days days from stock_move_rollups, and the same totals computed by
+joining stock_moves to operations, --repeat times each. Reports the median
+milliseconds of both and fails if their rows differ.
+
+    python -m benchmarks.generator --moves 2000000
+    python -m benchmarks.movement_reports --days 90
+"""
+import argparse
+import statistics
+import sys
+import time
+from datetime import timedelta
+from sqlalchemy import func, select
+from app.database import SessionLocal
+from app.models.operation import Operation
+from app.models.product import Product
+from app.models.stock_move import StockMove
+from app.utils.move_rollups import MOVE_DAY, category_report, ledger_days
+
+
+def ledger_report(db, date_from, date_to) -> list:
+    """The category report computed from the ledger, as it had to be without rollups."""
+    keys = (MOVE_DAY, Product.category, Operation.type)
+    return db.execute(
+        select(
+            *keys,
+            func.sum(func.greatest(StockMove.quantity, 0)),
+            func.sum(func.greatest(-StockMove.quantity, 0)),
+            func.count(),
+        )
+        .join(Operation, Operation.id == StockMove.operation_id)
+        .join(Product, Product.id == StockMove.product_id)
+        .where(MOVE_DAY >= date_from, MOVE_DAY <= date_to)
+        .group_by(*keys)
+        .order_by(*keys)
+    ).all()
+
+
+def _median_ms(report, repeat: int) -> tuple[float, list]:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        rows = report()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), rows
+
+
+def run(days: int, repeat: int) -> bool:
+    db = SessionLocal()
+    try:
+        _, last = ledger_days(db)
+        if last is None:
+            print("no stock moves; generate some with benchmarks.generator")
+            return False
+        date_from = last - timedelta(days=days - 1)
+        rollup_ms, rollup_rows = _median_ms(lambda: category_report(db, date_from, last, []), repeat)
+        ledger_ms, ledger_rows = _median_ms(lambda: ledger_report(db, date_from, last), repeat)
+        print(f"{date_from} .. {last}: {len(rollup_rows)} report rows")
+        print(f"{'source':<10} {'median ms':>10}")
+        print(f"{'rollups':<10} {rollup_ms:>10.1f}")
+        print(f"{'ledger':<10} {ledger_ms:>10.1f}")
+        if [tuple(row) for row in rollup_rows] != [tuple(row) for row in ledger_rows]:
+            print("MISMATCH: rollups differ from the ledger; run `python -m app.cli backfill-rollups`")
+            return False
+        return True
+    finally:
+        db.rollback()
+        db.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    sys.exit(0 if run(args.days, args.repeat) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Memory load test of the in-memory OTP store under login spam.
+
+Saves OTPs for millions of distinct emails (only some of them ever verify)
+and samples the process RSS and the store's entry count along the way.
+With the size cap and the expiry sweeper both must stay flat once the cap
+is reached. Exits with status 1 if RSS grows by more than --max-growth
+over the second half of the run (the first half is warm-up).
+
+    python -m benchmarks.otp_memory --logins 3000000 --max-entries 100000
+"""
+import argparse
+import gc
+import resource
+import sys
+import time
+from app.utils.otp import MemoryOTPStore, generate_otp
+
+
+def rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * resource.getpagesize() / 2**20
+    except OSError:  # not Linux: peak RSS is the best available figure
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run(logins: int, max_entries: int, ttl_seconds: float, verify_every: int, samples: int, max_growth: float) -> bool:
+    store = MemoryOTPStore(max_entries=max_entries)
+    step = max(logins // samples, 1)
+    baseline = None
+    peak = 0.0
+    started = time.perf_counter()
+    print(f"{'logins':>10} {'entries':>9} {'heap':>9} {'rss MB':>8}")
+    for i in range(logins):
+        email = f"user{i}@example.com"
+        otp = generate_otp()
+        store.save(None, email, otp, expires_in_minutes=ttl_seconds / 60)
+        if verify_every and i % verify_every == 0:
+            store.verify(None, email, otp)
+        if (i + 1) % step == 0:
+            gc.collect()
+            rss = rss_mb()
+            # The store is full long before half-way; from there on memory must not grow.
+            if baseline is None and i + 1 >= max(logins // 2, 2 * max_entries):
+                baseline = rss
+            if baseline is not None:
+                peak = max(peak, rss)
+            print(f"{i + 1:>10} {len(store):>9} {len(store._expiry_heap):>9} {rss:>8.1f}")
+
+    elapsed = time.perf_counter() - started
+    print(f"{logins} logins in {elapsed:.1f}s ({logins / elapsed:.0f}/s)")
+    if baseline is None:
+        print("Too few logins to fill the store; raise --logins")
+        return True
+    growth = (peak - baseline) / baseline
+    print(f"RSS at half-way: {baseline:.1f} MB, peak: {peak:.1f} MB ({growth:+.1%})")
+    return growth <= max_growth
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=3000000)
+    parser.add_argument("--max-entries", type=int, default=100000)
+    parser.add_argument("--ttl-seconds", type=float, default=600)
+    parser.add_argument("--verify-every", type=int, default=10, help="Verify one login in N (0: never)")
+    parser.add_argument("--samples", type=int, default=20)
+    parser.add_argument("--max-growth", type=float, default=0.05, help="Allowed RSS growth after warm-up")
+    args = parser.parse_args()
+    ok = run(args.logins, args.max_entries, args.ttl_seconds, args.verify_every, args.samples, args.max_growth)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Query budget check: fails when an endpoint runs more SQL statements than allowed.
+
+Calls each endpoint in-process with SQL_PROFILING enabled and compares its
+X-DB-Queries header with the budget below. Batched endpoints are called
+with many rows, so a per-row query (N+1) blows the budget. The products,
+operation and moves it creates are deleted again afterwards. Exits with
+status 1 on any overrun; raise a budget only together with the change
+that needs it. tests/test_query_budgets.py runs the same check under pytest.
+
+    python -m benchmarks.query_budget --rows 50
+"""
+import argparse
+import os
+import sys
+import uuid
+
+os.environ["SQL_PROFILING"] = "true"
+
+from fastapi.testclient import TestClient  # noqa: E402
+from app.database import SessionLocal  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models.operation import Operation  # noqa: E402
+from app.models.product import Product  # noqa: E402
+from app.models.stock_checkpoint import StockCheckpoint  # noqa: E402
+from app.models.stock_move import StockMove  # noqa: E402
+from app.models.stock_quant import StockQuant  # noqa: E402
+from app.utils.sql_profiler import assert_max_queries  # noqa: E402
+
+# endpoint label -> maximum statements per request
+BUDGETS = {
+    "POST /products/": 3,
+    "GET /products/{id}": 1,
+    "GET /products/{id} (cached)": 0,
+    "GET /products/": 1,
+    "POST /operations/": 2,
+    "POST /stock-moves/": 4,
+    "POST /stock-moves/bulk": 4,
+    "GET /stock-moves/": 1,
+    "GET /reports/movements": 1,
+    "GET /reports/movements/categories": 1,
+    "POST /sync/push": 1,
+    "GET /sync/pull": 3,
+    "GET /sync/pull?since_seq": 6,
+    "GET /users/": 1,
+}
+
+
+def _teardown(tag: str) -> None:
+    """Delete the rows a run tagged with `tag` created."""
+    db = SessionLocal()
+    try:
+        product_ids = db.query(Product.id).filter(Product.sku.startswith(f"BUDGET-{tag}"))
+        db.query(StockMove).filter(StockMove.product_id.in_(product_ids)).delete(synchronize_session=False)
+        db.query(Operation).filter(Operation.reference_code == f"BUDGET/{tag}").delete(synchronize_session=False)
+        db.query(StockQuant).filter(StockQuant.product_id.in_(product_ids)).delete(synchronize_session=False)
+        db.query(StockCheckpoint).filter(StockCheckpoint.product_id.in_(product_ids)).delete(synchronize_session=False)
+        db.query(Product).filter(Product.sku.startswith(f"BUDGET-{tag}")).delete(synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+def run(rows: int) -> list[str]:
+    failures = []
+    client = TestClient(app).__enter__()
+
+    def check(label: str, response) -> dict | list | None:
+        if response.status_code >= 400:
+            failures.append(f"{label}: HTTP {response.status_code} {response.text[:200]}")
+            return None
+        print(f"{label:<30} {response.headers.get('X-DB-Queries', '?'):>3} queries (budget {BUDGETS[label]})")
+        try:
+            assert_max_queries(response, BUDGETS[label])
+        except AssertionError as exc:
+            failures.append(f"{label}: {exc}")
+        return response.json() if response.headers.get("content-type", "").startswith("application/json") else None
+
+    tag = uuid.uuid4().hex[:8]
+    try:
+        product = check("POST /products/", client.post("/products/", json={"name": "Budget", "sku": f"BUDGET-{tag}"}))
+        check("GET /products/{id}", client.get(f"/products/{product['id']}"))
+        check("GET /products/{id} (cached)", client.get(f"/products/{product['id']}"))
+        check("GET /products/", client.get("/products/", params={"limit": rows}))
+        new_operation = {"type": "adjustment", "reference_code": f"BUDGET/{tag}"}
+        operation = check("POST /operations/", client.post("/operations/", json=new_operation))
+        move = {"operation_id": operation["id"], "product_id": product["id"], "quantity": 1}
+        check("POST /stock-moves/", client.post("/stock-moves/", json=move))
+        check("POST /stock-moves/bulk", client.post("/stock-moves/bulk", json=[move] * rows))
+        check("GET /stock-moves/", client.get("/stock-moves/", params={"product_id": product["id"], "limit": rows}))
+        check("GET /reports/movements", client.get("/reports/movements", params={"limit": rows}))
+        check("GET /reports/movements/categories", client.get("/reports/movements/categories"))
+        pushed = [{"id": str(uuid.uuid4()), "name": f"Pushed {i}", "sku": f"BUDGET-{tag}-{i}"} for i in range(rows)]
+        check("POST /sync/push", client.post("/sync/push", json={"products": pushed}))
+        check("GET /sync/pull", client.get("/sync/pull", params={"limit": rows}))
+        check("GET /sync/pull?since_seq", client.get("/sync/pull", params={"since_seq": 0, "limit": rows}))
+        check("GET /users/", client.get("/users/", params={"limit": rows}))
+    finally:
+        client.__exit__(None, None, None)
+        _teardown(tag)
+    return failures
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=50, help="Rows per batched request")
+    args = parser.parse_args()
+    failures = run(args.rows)
+    for failure in failures:
+        print(f"OVER BUDGET {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""
+Scripted load-test scenarios over a generated warehouse (see benchmarks.generator).
+
+Each scenario is an async function taking a Context and returning a Result
+with one latency per HTTP request. Run them with benchmarks.load_test.
+"""
+import asyncio
+import random
+import time
+import uuid
+from dataclasses import dataclass, field
+import httpx
+
+
+@dataclass
+class Context:
+    client: httpx.AsyncClient
+    seed: int
+    concurrency: int
+    requests: int
+    hot_products: list  # product ids, hottest first (Zipf rank order)
+    head_seq: int  # change log position to start incremental syncs from
+    page_size: int = 500
+
+
+@dataclass
+class Result:
+    latencies: list = field(default_factory=list)
+    errors: int = 0
+    rows: int = 0  # rows transferred, for the sync scenarios
+    extra: dict = field(default_factory=dict)
+
+    async def call(self, request) -> httpx.Response:
+        """Await one request, timing it and counting 4xx/5xx answers as errors."""
+        started = time.perf_counter()
+        response = await request
+        self.latencies.append(time.perf_counter() - started)
+        if response.status_code >= 400:
+            self.errors += 1
+        return response
+
+
+async def _workers(ctx: Context, requests: int, work) -> None:
+    """Run work(i) for i in range(requests) on ctx.concurrency concurrent workers."""
+    remaining = iter(range(requests))
+
+    async def worker():
+        for i in remaining:
+            await work(i)
+
+    await asyncio.gather(*(worker() for _ in range(min(ctx.concurrency, requests))))
+
+
+def _reference(ctx: Context, name: str) -> str:
+    # Tagged with the data set prefix, so `benchmarks.generator --reset` removes it.
+    return f"GEN-{ctx.seed}-BENCH/{name}/{uuid.uuid4().hex[:8]}"
+
+
+async def _operation(ctx: Context, result: Result, kind: str, name: str) -> str:
+    response = await result.call(
+        ctx.client.post("/operations/", json={"type": kind, "reference_code": _reference(ctx, name)})
+    )
+    response.raise_for_status()
+    return response.json()["id"]
+
+
+async def cold_full_sync(ctx: Context) -> Result:
+    """Devices syncing from scratch: page GET /sync/pull with the keyset cursor until has_more is false."""
+    result = Result()
+    devices = max(1, min(ctx.concurrency, ctx.requests // 100))
+
+    async def device(_):
+        cursor = None
+        while True:
+            params = {"limit": ctx.page_size}
+            if cursor:
+                params["cursor"] = cursor
+            response = await result.call(ctx.client.get("/sync/pull", params=params))
+            response.raise_for_status()
+            page = response.json()
+            result.rows += len(page["products"]) + len(page["operations"]) + len(page["stock_moves"])
+            cursor = page["next_cursor"]
+            if not page["has_more"]:
+                return
+
+    await _workers(ctx, devices, device)
+    result.extra["devices"] = devices
+    return result
+
+
+async def incremental_sync(ctx: Context) -> Result:
+    """Devices pushing a few offline moves, then pulling the change log since their last position."""
+    result = Result()
+    operation_id = await _operation(ctx, Result(), "receipt", "incremental")
+    rng = random.Random(ctx.seed)
+    positions = {}
+
+    async def device(i):
+        worker = i % ctx.concurrency
+        moves = [
+            {
+                "id": str(uuid.uuid4()),
+                "operation_id": operation_id,
+                "product_id": str(rng.choice(ctx.hot_products)),
+                "quantity": rng.randint(1, 5),
+            }
+            for _ in range(3)
+        ]
+        await result.call(ctx.client.post("/sync/push", json={"stock_moves": moves}))
+        since_seq = positions.get(worker, ctx.head_seq)
+        while True:
+            response = await result.call(
+                ctx.client.get("/sync/pull", params={"since_seq": since_seq, "limit": ctx.page_size})
+            )
+            response.raise_for_status()
+            page = response.json()
+            result.rows += len(page["stock_moves"]) + len(page["deleted"])
+            since_seq = page["next_seq"]
+            if not page["has_more"]:
+                break
+        positions[worker] = since_seq
+
+    await _workers(ctx, ctx.requests // 2, device)
+    return result
+
+
+async def receipt_burst(ctx: Context) -> Result:
+    """A truck unloading: receipts created and their lines posted through POST /stock-moves/bulk."""
+    result = Result()
+    rng = random.Random(ctx.seed)
+    lines = 20
+
+    async def receipt(i):
+        operation_id = await _operation(ctx, result, "receipt", "receipt")
+        moves = [
+            {"operation_id": operation_id, "product_id": str(product_id), "quantity": rng.randint(1, 48)}
+            for product_id in rng.sample(ctx.hot_products, min(lines, len(ctx.hot_products)))
+        ]
+        await result.call(ctx.client.post("/stock-moves/bulk", json=moves))
+        result.rows += len(moves)
+
+    await _workers(ctx, ctx.requests // 2, receipt)
+    return result
+
+
+async def hot_scanners(ctx: Context) -> Result:
+    """Handheld scanners posting single POST /stock-moves/ on the ten hottest SKUs."""
+    result = Result()
+    operation_id = await _operation(ctx, Result(), "adjustment", "scanners")
+    hottest = ctx.hot_products[:10]
+
+    async def scan(i):
+        move = {"operation_id": operation_id, "product_id": str(hottest[i % len(hottest)]), "quantity": 1 - 2 * (i % 2)}
+        await result.call(ctx.client.post("/stock-moves/", json=move))
+
+    await _workers(ctx, ctx.requests, scan)
+    return result
+
+
+async def catalog_polling(ctx: Context) -> Result:
+    """Clients polling GET /products/catalog with If-None-Match while 1% of requests edit a product."""
+    result = Result()
+    etags = {}
+    not_modified = 0
+
+    async def poll(i):
+        nonlocal not_modified
+        worker = i % ctx.concurrency
+        if i % 100 == 99:
+            product_id = ctx.hot_products[i % len(ctx.hot_products)]
+            await result.call(ctx.client.put(f"/products/{product_id}", json={"min_stock_level": i % 50}))
+            return
+        headers = {"Accept-Encoding": "gzip"}
+        if worker in etags:
+            headers["If-None-Match"] = etags[worker]
+        response = await result.call(ctx.client.get("/products/catalog", headers=headers))
+        if response.status_code == 304:
+            not_modified += 1
+        etags[worker] = response.headers.get("etag", etags.get(worker))
+
+    await _workers(ctx, ctx.requests, poll)
+    result.extra["not_modified"] = not_modified
+    return result
+
+
+SCENARIOS = {
+    "cold_full_sync": cold_full_sync,
+    "incremental_sync": incremental_sync,
+    "receipt_burst": receipt_burst,
+    "hot_scanners": hot_scanners,
+    "catalog_polling": catalog_polling,
+}
@@ -0,0 +1,68 @@
+"""
+Worker startup cost: importing app.main, and spawning uvicorn until /health answers.
+
+Each measurement runs in a fresh interpreter, so module caches do not help.
+Importing the app should not touch the database; the time to ready includes
+the lifespan startup (schema check and pool warm-up).
+
+    python -m benchmarks.startup_time --runs 5
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+import httpx
+
+IMPORT_SCRIPT = """
+import time
+started = time.perf_counter()
+import app.main
+print(time.perf_counter() - started)
+"""
+
+
+def measure_import() -> float:
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_SCRIPT], check=True, capture_output=True, text=True, env=os.environ
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def measure_ready(port: int) -> float:
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+    )
+    try:
+        deadline = started + 60
+        while time.perf_counter() < deadline:
+            if server.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with status {server.returncode}")
+            try:
+                if httpx.get(f"http://127.0.0.1:{port}/health").status_code == 200:
+                    return time.perf_counter() - started
+            except httpx.TransportError:
+                time.sleep(0.01)
+        raise RuntimeError("uvicorn did not start")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def report(label: str, samples: list[float]) -> None:
+    print(f"{label:<16} median {statistics.median(samples) * 1000:8.1f} ms  min {min(samples) * 1000:8.1f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    report("import app.main", [measure_import() for _ in range(args.runs)])
+    report("spawn to ready", [measure_ready(args.port) for _ in range(args.runs)])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Concurrency stress test for stock moves on a single SKU.
+
+Fires parallel POST /stock-moves/ handlers at one product from separate
+sessions and checks that the final current_stock equals the sum of all moves
+and the ledger balance. With --sync, half of the workers push their moves
+through POST /sync/push ingestion instead. Exits with status 1 when an
+update was lost.
+
+    python -m benchmarks.stock_contention --workers 16 --moves 200 [--sync]
+"""
+import argparse
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from app.database import SessionLocal
+from app.models.operation import Operation, OperationType
+from app.models.product import Product
+from app.models.stock_quant import StockQuant
+from app.routers.stock_moves import _create_stock_move
+from app.schemas.stock_move import StockMoveCreate
+from app.utils.stock_checkpoints import balances_as_of
+from app.utils.sync_ingest import ingest_payload
+
+
+def _setup() -> tuple[uuid.UUID, uuid.UUID]:
+    db = SessionLocal()
+    try:
+        product = Product(name="Contention bench", sku=f"BENCH-{uuid.uuid4().hex[:12]}", current_stock=0)
+        operation = Operation(type=OperationType.adjustment, reference_code="BENCH/CONTENTION")
+        db.add_all([product, operation])
+        db.commit()
+        return product.id, operation.id
+    finally:
+        db.close()
+
+
+def _teardown(product_id: uuid.UUID, operation_id: uuid.UUID) -> None:
+    db = SessionLocal()
+    try:
+        db.query(Operation).filter(Operation.id == operation_id).delete()
+        db.query(StockQuant).filter(StockQuant.product_id == product_id).delete()
+        db.query(Product).filter(Product.id == product_id).delete()
+        db.commit()
+    finally:
+        db.close()
+
+
+def _worker(product_id: uuid.UUID, operation_id: uuid.UUID, moves: int, quantity: int) -> None:
+    move = StockMoveCreate(operation_id=operation_id, product_id=product_id, quantity=quantity)
+    for _ in range(moves):
+        db = SessionLocal()
+        try:
+            _create_stock_move(db, move)
+        finally:
+            db.close()
+
+
+def _sync_worker(product_id: uuid.UUID, operation_id: uuid.UUID, moves: int, quantity: int) -> None:
+    move = {"operation_id": str(operation_id), "product_id": str(product_id), "quantity": quantity}
+    for _ in range(moves):
+        db = SessionLocal()
+        try:
+            ingest_payload(db, {"stock_moves": [{**move, "id": str(uuid.uuid4())}]})
+            db.commit()
+        finally:
+            db.close()
+
+
+def run(workers: int, moves: int, quantity: int, sync: bool = False) -> bool:
+    product_id, operation_id = _setup()
+    try:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(_sync_worker if sync and i % 2 else _worker, product_id, operation_id, moves, quantity)
+                for i in range(workers)
+            ]
+            for future in futures:
+                future.result()
+        elapsed = time.perf_counter() - started
+
+        db = SessionLocal()
+        try:
+            actual = db.query(Product.current_stock).filter(Product.id == product_id).scalar()
+            ledger = balances_as_of(db, datetime.now(timezone.utc), [product_id]).get(product_id, {}).get("quantity", 0)
+        finally:
+            db.close()
+        expected = workers * moves * quantity
+        total = workers * moves
+        print(f"{total} moves in {elapsed:.2f}s ({total / elapsed:.0f} moves/s)")
+        print(f"expected current_stock={expected} actual={actual} ledger={ledger}")
+        return actual == expected == ledger
+    finally:
+        _teardown(product_id, operation_id)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--moves", type=int, default=200, help="Moves posted by each worker")
+    parser.add_argument("--quantity", type=int, default=1)
+    parser.add_argument("--sync", action="store_true", help="Push half of the moves through sync ingestion")
+    args = parser.parse_args()
+    sys.exit(0 if run(args.workers, args.moves, args.quantity, args.sync) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Round-trip count of POST /sync/push ingestion as the payload grows.
+
+Runs ingest_payload against the configured database inside a transaction
+that is rolled back, counting every statement sent to Postgres. Before the
+rollback, the pushed products' current_stock is checked against the ledger;
+the run exits with status 1 on a mismatch.
+
+    python -m benchmarks.sync_push --sizes 100 1000 10000 --batch-size 500
+"""
+import argparse
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+from sqlalchemy import event
+from app.database import SessionLocal, engine
+from app.models.product import Product
+from app.utils.stock_checkpoints import balances_as_of
+from app.utils.sync_ingest import ConflictPolicy, ingest_payload
+
+
+def build_payload(size: int) -> dict:
+    """Build a payload with `size` products, size // 10 operations and `size` stock moves."""
+    products = [
+        {"id": str(uuid.uuid4()), "name": f"Bench product {i}", "sku": f"BENCH-{uuid.uuid4().hex[:12]}"}
+        for i in range(size)
+    ]
+    operations = [
+        {"id": str(uuid.uuid4()), "type": "receipt", "reference_code": f"BENCH/{i}"}
+        for i in range(max(size // 10, 1))
+    ]
+    stock_moves = [
+        {
+            "id": str(uuid.uuid4()),
+            "operation_id": operations[i % len(operations)]["id"],
+            "product_id": products[i]["id"],
+            "quantity": 1,
+        }
+        for i in range(size)
+    ]
+    return {"products": products, "operations": operations, "stock_moves": stock_moves}
+
+
+def stock_mismatches(db, product_ids: list[uuid.UUID]) -> int:
+    """Number of products whose current_stock differs from their ledger balance."""
+    ledger = balances_as_of(db, datetime.now(timezone.utc), product_ids)
+    stored = db.query(Product.id, Product.current_stock).filter(Product.id.in_(product_ids)).all()
+    return sum(1 for product_id, current_stock in stored if (current_stock or 0) != ledger.get(product_id, {}).get("quantity", 0))
+
+
+def run(sizes: list[int], batch_size: int, policy: ConflictPolicy) -> bool:
+    statements = 0
+    consistent = True
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        nonlocal statements
+        statements += 1
+
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        print(f"{'rows':>10} {'statements':>12} {'seconds':>10}")
+        for size in sizes:
+            payload = build_payload(size)
+            db = SessionLocal()
+            try:
+                statements = 0
+                started = time.perf_counter()
+                ingest_payload(db, payload, policy=policy, batch_size=batch_size)
+                elapsed = time.perf_counter() - started
+                sent = statements
+                mismatched = stock_mismatches(db, [uuid.UUID(product["id"]) for product in payload["products"]])
+            finally:
+                db.rollback()
+                db.close()
+            total_rows = sum(len(rows) for rows in payload.values())
+            print(f"{total_rows:>10} {sent:>12} {elapsed:>10.3f}")
+            if mismatched:
+                print(f"{mismatched} products' current_stock differs from the ledger")
+                consistent = False
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+    return consistent
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--policy", choices=[p.value for p in ConflictPolicy], default=ConflictPolicy.skip.value)
+    args = parser.parse_args()
+    sys.exit(0 if run(args.sizes, args.batch_size, ConflictPolicy(args.policy)) else 1)
+
+
+if __name__ == "__main__":
+    main()
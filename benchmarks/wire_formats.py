@@ -0,0 +1,118 @@
+"""
+Bytes on the wire and CPU time of the sync wire formats.
+
+Builds a pull-shaped payload (products, operations and stock moves that
+reference them) in memory and, for JSON, msgpack and columnar msgpack, each
+uncompressed and with gzip and zstd, reports the body size and the
+encode+compress / decompress+decode times.
+
+    python -m benchmarks.wire_formats --sizes 10000 100000 1000000
+"""
+import argparse
+import gzip
+import random
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+import zstandard
+from app.utils.wire_format import COLUMNAR, JSON, MSGPACK, decode, encode
+
+FORMATS = {"json": JSON, "msgpack": MSGPACK, "columnar": COLUMNAR}
+COMPRESSIONS = {
+    "none": (lambda body: body, lambda body: body),
+    "gzip": (lambda body: gzip.compress(body, compresslevel=6), gzip.decompress),
+    "zstd": (zstandard.ZstdCompressor(level=3).compress, lambda body: zstandard.ZstdDecompressor().decompress(body)),
+}
+
+
+def build_payload(rows: int, seed: int = 7) -> dict:
+    """A pull response of `rows` rows: 10% products, 5% operations, the rest stock moves."""
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+    def stamp():
+        return start + timedelta(seconds=rng.randrange(86400 * 365), microseconds=rng.randrange(10**6))
+
+    products = [
+        {
+            "id": uuid.UUID(int=rng.getrandbits(128)),
+            "name": f"Product {i}",
+            "sku": f"SKU-{i:08d}",
+            "category": rng.choice(["raw", "finished", "packaging", None]),
+            "min_stock_level": rng.randrange(50),
+            "current_stock": rng.randrange(1000),
+            "last_updated": stamp(),
+            "is_deleted": False,
+        }
+        for i in range(max(rows // 10, 1))
+    ]
+    operations = [
+        {
+            "id": uuid.UUID(int=rng.getrandbits(128)),
+            "reference_code": f"WH/{i:08d}",
+            "type": rng.choice(["receipt", "delivery", "internal", "adjustment"]),
+            "status": "done",
+            "created_by": None,
+            "created_at": stamp(),
+            "last_updated": stamp(),
+        }
+        for i in range(max(rows // 20, 1))
+    ]
+    stock_moves = [
+        {
+            "id": uuid.UUID(int=rng.getrandbits(128)),
+            "operation_id": rng.choice(operations)["id"],
+            "product_id": rng.choice(products)["id"],
+            "quantity": rng.randrange(-100, 100),
+            "location_source": "partner",
+            "location_dest": "warehouse",
+            "created_at": stamp(),
+        }
+        for _ in range(max(rows - len(products) - len(operations), 1))
+    ]
+    return {
+        "products": products,
+        "operations": operations,
+        "stock_moves": stock_moves,
+        "deleted": [],
+        "next_cursor": None,
+        "next_seq": rows,
+        "has_more": False,
+    }
+
+
+def run(sizes: list[int]) -> None:
+    print(f"{'rows':>9} {'format':>9} {'encoding':>8} {'bytes':>12} {'vs json':>8} {'encode ms':>10} {'decode ms':>10}")
+    for rows in sizes:
+        payload = build_payload(rows)
+        baseline = None
+        for format_name, media_type in FORMATS.items():
+            started = time.perf_counter()
+            body = encode(payload, media_type)
+            encoded_in = time.perf_counter() - started
+            for compression_name, (compress, decompress) in COMPRESSIONS.items():
+                started = time.perf_counter()
+                wire = compress(body)
+                encode_ms = (encoded_in + time.perf_counter() - started) * 1000
+
+                started = time.perf_counter()
+                decode(decompress(wire), media_type)
+                decode_ms = (time.perf_counter() - started) * 1000
+
+                if baseline is None:
+                    baseline = len(wire)
+                print(
+                    f"{rows:>9} {format_name:>9} {compression_name:>8} {len(wire):>12} "
+                    f"{len(wire) / baseline:>7.0%} {encode_ms:>10.0f} {decode_ms:>10.0f}"
+                )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    args = parser.parse_args()
+    run(args.sizes)
+
+
+if __name__ == "__main__":
+    main()
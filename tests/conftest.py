@@ -0,0 +1,30 @@
+"""
+Shared fixtures. The tests run against the database in DATABASE_URL, which must
+be migrated to head (`alembic upgrade head`); they are skipped when it is unreachable.
+"""
+import os
+
+# Set before the app is imported: settings are read once, and the query
+# budget test needs the X-DB-Queries header from the profiling middleware.
+os.environ["SQL_PROFILING"] = "true"
+os.environ.setdefault("JWT_SECRET_KEY", "test-secret")
+
+import pytest  # noqa: E402
+from sqlalchemy import text  # noqa: E402
+from sqlalchemy.exc import OperationalError  # noqa: E402
+from app.database import SessionLocal  # noqa: E402
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        session.execute(text("SELECT 1"))
+    except OperationalError as exc:
+        session.close()
+        pytest.skip(f"database unavailable: {exc.orig}")
+    try:
+        yield session
+    finally:
+        session.rollback()
+        session.close()
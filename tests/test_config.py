@@ -0,0 +1,11 @@
+import pytest
+from pydantic import ValidationError
+from app.config import Settings
+
+
+def test_db_pool_pre_ping_rejects_unknown_mode(monkeypatch):
+    monkeypatch.setenv("DB_POOL_PRE_PING", "always")
+    assert Settings().db_pool_pre_ping == "always"
+    monkeypatch.setenv("DB_POOL_PRE_PING", "alwyas")
+    with pytest.raises(ValidationError):
+        Settings()
@@ -0,0 +1,6 @@
+from benchmarks.explain_plans import plan_seq_scans
+
+
+def test_hot_queries_use_indexes(db):
+    seq_scans = {name: tables for name, tables in plan_seq_scans(db).items() if tables}
+    assert seq_scans == {}, f"hot queries planned a sequential scan: {seq_scans}"
@@ -0,0 +1,10 @@
+from fastapi.testclient import TestClient
+from app.main import app
+
+
+def test_list_operations_filters_by_type_and_status(db):
+    with TestClient(app) as client:
+        response = client.get("/operations/", params={"type": "receipt", "status": "done", "limit": 20})
+        assert response.status_code == 200
+        assert {(row["type"], row["status"]) for row in response.json()} <= {("receipt", "done")}
+        assert client.get("/operations/", params={"status": "bogus"}).status_code == 422
@@ -0,0 +1,24 @@
+import pytest
+from app.utils.otp import DatabaseOTPStore, MemoryOTPStore, OTPStore
+
+
+def test_otp_store_is_abstract():
+    with pytest.raises(TypeError):
+        OTPStore()
+    MemoryOTPStore()
+    DatabaseOTPStore()
+
+
+def test_memory_otp_verifies_once():
+    store = MemoryOTPStore()
+    store.save(None, "user@example.com", "123456")
+    assert not store.verify(None, "user@example.com", "654321")
+    assert store.verify(None, "user@example.com", "123456")
+    assert not store.verify(None, "user@example.com", "123456")
+
+
+def test_memory_otp_expires():
+    store = MemoryOTPStore()
+    store.save(None, "user@example.com", "123456", expires_in_minutes=-1)
+    assert store.cleanup(None) == 1
+    assert not store.verify(None, "user@example.com", "123456")
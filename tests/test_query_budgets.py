@@ -0,0 +1,5 @@
+from benchmarks.query_budget import run
+
+
+def test_endpoints_stay_within_query_budgets(db):
+    assert run(rows=50) == []
@@ -0,0 +1,37 @@
+import asyncio
+import uuid
+import msgpack
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+from app.utils.wire_format import COLUMNAR, decode, encode, read_payload
+
+
+def _request(body: bytes, media_type: str) -> Request:
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "path": "/sync/push",
+        "headers": [(b"content-type", media_type.encode()), (b"content-length", str(len(body)).encode())],
+    }
+    return Request(scope, receive)
+
+
+def _columnar(index) -> bytes:
+    table = {"count": 1, "columns": ["id"], "uuid_columns": ["id"], "values": [[index]]}
+    return msgpack.packb({"uuids": [uuid.uuid4().bytes], "tables": {"products": table}, "fields": {}})
+
+
+def test_columnar_round_trip():
+    rows = [{"id": uuid.uuid4(), "name": "a"}, {"id": None, "name": "b"}]
+    assert decode(encode({"products": rows, "limit": 5}, COLUMNAR), COLUMNAR) == {"products": rows, "limit": 5}
+
+
+@pytest.mark.parametrize("index", [1, -1, "0"])
+def test_columnar_uuid_index_out_of_range_is_bad_request(index):
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(read_payload(_request(_columnar(index), COLUMNAR)))
+    assert error.value.status_code == 400